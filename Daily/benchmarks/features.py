@@ -0,0 +1,148 @@
+"""
+Compares the previous per-game loop of `Predictor._get_data` against
+`src.features.assemble_features`, which joins the latest lags of all games
+at once, for days with more and more games. Both read the lag rows of the
+last matches from the lag history, like the loop did.
+
+Run from the Daily directory: `python -m benchmarks.features`
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features import assemble_features, sided_lag_columns
+
+GAMES = [10, 100, 500]
+MATCHES_PER_TEAM = 40
+WINDOW_SIZE = 4
+REPEAT = 3
+
+
+def make_day(games: int, seed: int = 0) -> tuple[list[dict], pd.DataFrame, dict]:
+    # `games` games between distinct teams, each with a history of lag rows
+    rng = np.random.default_rng(seed)
+    teams = [f"Team {i}" for i in range(2 * games)]
+    day = [
+        {
+            "date": "2024-12-14T15:00:00+00:00",
+            "home": teams[2 * i],
+            "away": teams[2 * i + 1],
+            "home_odds": f"{rng.uniform(1.2, 5):.2f}",
+            "draw_odds": f"{rng.uniform(2.5, 5):.2f}",
+            "away_odds": f"{rng.uniform(1.2, 5):.2f}",
+            "over25": f"{rng.uniform(1.4, 3):.2f}",
+            "under25": f"{rng.uniform(1.4, 3):.2f}",
+        }
+        for i in range(games)
+    ]
+
+    rows = len(teams) * MATCHES_PER_TEAM
+    lags_df = pd.DataFrame(
+        {
+            "datetime": pd.Timestamp("2015-08-01")
+            + pd.to_timedelta(rng.permutation(rows), unit="h"),
+            "hometeam": rng.choice(teams, rows),
+            "awayteam": rng.choice(teams, rows),
+        }
+    )
+    for prefix in ["hs", "fthg", "hthg", "hst", "as", "ftag", "htag", "ast"]:
+        for i in range(WINDOW_SIZE):
+            lags_df[f"{prefix}_lags_{i + 1}"] = rng.integers(0, 20, rows)
+
+    return (
+        day,
+        lags_df,
+        {"league_over_percentage": 0.55, "league_under_percentage": 0.45},
+    )
+
+
+def legacy_get_data(
+    games: list[dict], lags_df: pd.DataFrame, league_percentages: dict
+) -> pd.DataFrame:
+    # The loop of Predictor._get_data before the batch assembly
+    main_df = pd.DataFrame([league_percentages])
+    data = pd.DataFrame()
+    for game in games:
+        home_lags = lags_df[lags_df["hometeam"] == game["home"]]
+        home_lags = home_lags[home_lags["datetime"] == home_lags["datetime"].max()]
+
+        away_lags = lags_df[lags_df["awayteam"] == game["away"]]
+        away_lags = away_lags[away_lags["datetime"] == away_lags["datetime"].max()]
+        df = pd.DataFrame()
+        df["league_over_percentage"] = main_df["league_over_percentage"]
+        df["league_under_percentage"] = main_df["league_under_percentage"]
+        df["datetime"] = pd.to_datetime(game["date"])
+        df["hometeam"] = game["home"]
+        df["awayteam"] = game["away"]
+        df["avgh"] = float(game["home_odds"])
+        df["avgd"] = float(game["draw_odds"])
+        df["avga"] = float(game["away_odds"])
+        df["avg_gt_2_5"] = float(game["over25"])
+        df["avg_lt_2_5"] = float(game["under25"])
+        df = pd.concat(
+            [
+                df,
+                home_lags[sided_lag_columns(WINDOW_SIZE, True)].reset_index(drop=True),
+            ],
+            axis=1,
+        )
+        df = pd.concat(
+            [
+                df,
+                away_lags[sided_lag_columns(WINDOW_SIZE, False)].reset_index(drop=True),
+            ],
+            axis=1,
+        )
+
+        data = pd.concat([data, df])
+
+    return data
+
+
+def latest_lags(lags_df: pd.DataFrame, home: bool) -> pd.DataFrame:
+    # The lags of the newest row of every team on the side, like the loop reads
+    team = "hometeam" if home else "awayteam"
+    return (
+        lags_df.sort_values("datetime", kind="stable")
+        .drop_duplicates(team, keep="last")[
+            [team, *sided_lag_columns(WINDOW_SIZE, home)]
+        ]
+        .reset_index(drop=True)
+    )
+
+
+def batch_get_data(
+    games: list[dict], lags_df: pd.DataFrame, league_percentages: dict
+) -> pd.DataFrame:
+    home_lags, away_lags = latest_lags(lags_df, True), latest_lags(lags_df, False)
+    return assemble_features(games, home_lags, away_lags, league_percentages)
+
+
+def best_time(fn, *args) -> float:
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    print(f"{'games':>6} {'loop (s)':>10} {'batch (s)':>10} {'speedup':>8}")
+    for games in GAMES:
+        day = make_day(games)
+        pd.testing.assert_frame_equal(
+            legacy_get_data(*day).reset_index(drop=True),
+            batch_get_data(*day),
+            check_dtype=False,
+        )
+
+        loop = best_time(legacy_get_data, *day)
+        batch = best_time(batch_get_data, *day)
+        print(f"{games:>6} {loop:>10.3f} {batch:>10.4f} {loop / batch:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
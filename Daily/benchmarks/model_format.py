@@ -0,0 +1,138 @@
+"""
+Compares loading the classifier from a joblib pickle against the native
+XGBoost format read by `src.model.NativeModel`, with and without the trees
+exported for the numpy evaluator: file size, the time to load the model and
+predict a day of matches with the libraries already imported, and the same
+in a fresh interpreter, the way the daily job starts.
+
+Run from the Daily directory: `python -m benchmarks.model_format`
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from football_shared.trees import TREES_FILE, export_trees
+
+from src.model import META_FILE, MODEL_FILE, PICKLE_FILE, NativeModel
+
+ROWS = 4000
+FEATURES = 40
+MATCHES = 10
+REPEAT = 3
+
+PICKLE_LOAD = f"""
+import joblib, pandas as pd
+X = pd.read_parquet("{{dir}}/X.parquet")
+model = joblib.load("{{dir}}/{PICKLE_FILE}")
+model.predict(X[model.feature_names_in_])
+"""
+
+NATIVE_LOAD = """
+import pandas as pd
+from src.model import load_model
+X = pd.read_parquet("{dir}/X.parquet")
+model = load_model("{dir}")
+model.predict(X[model.feature_names_in_])
+"""
+
+
+def make_model(
+    model_dir: str, trees_dir: str
+) -> tuple[xgb.XGBClassifier, pd.DataFrame]:
+    # `trees_dir` holds the same native model with its trees exported
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        rng.normal(size=(ROWS, FEATURES)), columns=[f"f{i}" for i in range(FEATURES)]
+    )
+    y = (X["f0"] + rng.normal(size=ROWS) > 0).astype(int)
+    clf = xgb.XGBClassifier().fit(X, y)
+
+    joblib.dump(clf, os.path.join(model_dir, PICKLE_FILE))
+    clf.save_model(os.path.join(model_dir, MODEL_FILE))
+    with open(os.path.join(model_dir, META_FILE), "w") as f:
+        json.dump({"features": list(X.columns), "watermark": "2024-01-01"}, f)
+
+    X.head(MATCHES).to_parquet(os.path.join(model_dir, "X.parquet"))
+
+    shutil.copytree(model_dir, trees_dir)
+    export_trees(clf.get_booster(), os.path.join(trees_dir, TREES_FILE))
+    return clf, X
+
+
+def load_and_predict(load, X: pd.DataFrame) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        model = load()
+        model.predict(X[model.feature_names_in_])
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def cold_start(script: str) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], check=True)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        model_dir, trees_dir = os.path.join(root, "model"), os.path.join(root, "trees")
+        os.makedirs(model_dir)
+        clf, X = make_model(model_dir, trees_dir)
+
+        # All formats predict the same probabilities
+        for path in [model_dir, trees_dir]:
+            np.testing.assert_allclose(
+                NativeModel(path).predict_proba(X), clf.predict_proba(X), atol=1e-6
+            )
+
+        print(
+            f"{'format':>8} {'size (kB)':>10} {'load + predict (ms)':>20} {'cold start (s)':>15}"
+        )
+        for name, path, file, load, script in [
+            (
+                "pickle",
+                model_dir,
+                PICKLE_FILE,
+                lambda: joblib.load(os.path.join(model_dir, PICKLE_FILE)),
+                PICKLE_LOAD,
+            ),
+            (
+                "native",
+                model_dir,
+                MODEL_FILE,
+                lambda: NativeModel(model_dir),
+                NATIVE_LOAD,
+            ),
+            (
+                "trees",
+                trees_dir,
+                TREES_FILE,
+                lambda: NativeModel(trees_dir),
+                NATIVE_LOAD,
+            ),
+        ]:
+            size = os.path.getsize(os.path.join(path, file)) / 1000
+            warm = load_and_predict(load, X.head(MATCHES)) * 1000
+            cold = cold_start(script.format(dir=path))
+            print(f"{name:>8} {size:>10.1f} {warm:>20.2f} {cold:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
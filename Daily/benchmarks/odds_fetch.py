@@ -0,0 +1,87 @@
+"""
+Compares fetching the schedules of the next days one at a time with a new
+connection per request, like `daily_odds.get_odds` did, against
+`daily_odds.get_odds_days`, which fetches them concurrently over the pooled
+connections of its HTTP client. The schedules are served from `daily2.json`
+by a local server that answers after `LATENCY` seconds, and the odds cache
+is empty for every run.
+
+Run from the Daily directory: `python -m benchmarks.odds_fetch`
+"""
+
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src import daily_odds
+from src.daily_odds import FIXTURE_PATH, get_odds_days, parse_schedule
+
+DAYS = [1, 3, 7]
+LATENCY = 0.2
+START = datetime(2025, 1, 6)
+
+
+def serve_fixture() -> ThreadingHTTPServer:
+    with open(FIXTURE_PATH, "rb") as f:
+        body = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(LATENCY)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def legacy_get_odds_days(days: int) -> dict[str, list[dict]]:
+    # One bare request after the other
+    odds = dict()
+    for i in range(days):
+        date = (START + timedelta(days=i)).strftime("%Y-%m-%d")
+        url = daily_odds.SCHEDULE_URL.format(date=date)
+        with requests.get(url, stream=True) as response:
+            odds[date] = parse_schedule(response.iter_content(1024 * 64), date)
+    return odds
+
+
+def timed(fn, days: int) -> tuple[float, dict]:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        daily_odds.CACHE_DIR = cache_dir
+        start = time.perf_counter()
+        odds = fn(days)
+        return time.perf_counter() - start, odds
+
+
+def main():
+    server = serve_fixture()
+    daily_odds.SCHEDULE_URL = (
+        f"http://127.0.0.1:{server.server_port}/{{date}}/schedule.json"
+    )
+
+    print(f"{'days':>5} {'sequential (s)':>15} {'concurrent (s)':>15}")
+    for days in DAYS:
+        sequential, legacy = timed(legacy_get_odds_days, days)
+        concurrent, odds = timed(lambda days: get_odds_days(days, START), days)
+        if legacy != odds:
+            raise AssertionError("The fetches returned different odds")
+        print(f"{days:>5} {sequential:>15.2f} {concurrent:>15.2f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares loading the whole Sportradar schedule with `json.load` and then
+filtering it, like `daily_odds` did, against streaming the sport events
+with `daily_odds.parse_schedule`, on the bundled `daily2.json`: the peak
+memory allocated by Python while parsing and the parse time.
+
+Run from the Daily directory: `python -m benchmarks.schedule_parser`
+"""
+
+import json
+import tempfile
+import time
+import tracemalloc
+
+from src import daily_odds
+from src.daily_odds import CHUNK_BYTES, FIXTURE_PATH, parse_schedule
+
+REPEAT = 5
+DATE = "2025-01-06"
+
+
+def legacy_parse(path: str) -> list[dict]:
+    # The previous get_odds_local and filter_odds
+    with open(path, "r") as handle:
+        parsed = json.load(handle)
+
+    return list(
+        filter(
+            lambda x: x["season"]["id"] == "sr:season:118689", parsed["sport_events"]
+        )
+    )
+
+
+def streaming_parse(path: str) -> list[dict]:
+    with open(path, "rb") as handle:
+        return parse_schedule(iter(lambda: handle.read(CHUNK_BYTES), b""), DATE)
+
+
+def measure(fn) -> tuple[float, float, list[dict]]:
+    # Peak traced memory in MB of one run and the best time of REPEAT runs
+    tracemalloc.start()
+    events = fn(FIXTURE_PATH)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(FIXTURE_PATH)
+        times.append(time.perf_counter() - start)
+    return peak, min(times), events
+
+
+def main():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # The season cache is filled by the first run, like on every day but the first
+        daily_odds.CACHE_DIR = cache_dir
+        legacy = measure(legacy_parse)
+        streaming = measure(streaming_parse)
+
+    if [event["id"] for event in legacy[2]] != [event["id"] for event in streaming[2]]:
+        raise AssertionError("The parsers kept different events")
+
+    print(f"{len(legacy[2])} events kept")
+    print(f"{'parser':>10} {'peak (MB)':>10} {'time (ms)':>10}")
+    for name, (peak, seconds, _) in [("json.load", legacy), ("streaming", streaming)]:
+        print(f"{name:>10} {peak:>10.1f} {seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,95 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime
 import requests
 import os
 
+from football_shared.http_client import HttpClient
+
+from src.odds_cache import OddsCache
+from src.schedule_parser import SeasonCache, filter_events, iter_array_items
+
+# Competitions to predict, sr:tournament:17 = Premier League. Their current
+# season ids are read from the schedule and cached in CACHE_DIR
+COMPETITION_IDS = {"sr:tournament:17"}
+# Seasons to predict besides the current seasons of the competitions
+SEASON_IDS = set()
+CACHE_DIR = os.environ.get("ODDS_CACHE_DIR", "odds_cache")
+# Seconds until a cached schedule of a day that has not ended is fetched again
+CACHE_TTL = float(os.environ.get("ODDS_CACHE_TTL", 3 * 60 * 60))
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "..", "daily2.json")
+CHUNK_BYTES = 64 * 1024
+SCHEDULE_URL = "https://api.sportradar.com/oddscomparison-ust1/en/eu/sports/sr%3Asport%3A1/{date}/schedule.json"
+# Days whose schedules are fetched at the same time by get_odds_days
+FETCH_WORKERS = 4
+HTTP_CLIENT = HttpClient(pool_size=FETCH_WORKERS)
+
+
+def parse_schedule(
+    chunks, date: str, competition_ids=COMPETITION_IDS, season_ids=SEASON_IDS
+) -> list[dict]:
+    """
+    Streams the sport events of a schedule payload and keeps the ones of our
+    competitions and seasons, without loading the whole schedule.
+    """
+    seasons = SeasonCache(os.path.join(CACHE_DIR, "seasons.json"))
+    cached_ids, unresolved = seasons.resolve(competition_ids, date)
+
+    events = list(
+        filter_events(
+            iter_array_items(chunks, "sport_events"),
+            season_ids | cached_ids,
+            unresolved,
+        )
+    )
+    seasons.update(events, unresolved, date)
+    return events
+
+
+def odds_cache() -> OddsCache:
+    return OddsCache(CACHE_DIR, CACHE_TTL)
 
-# Local testing
-def get_odds_local():
-    with open("../daily/daily2.json", "r") as handle:
-        parsed = json.load(handle)
 
-        return parsed
+# Local testing, the fixture is cached like a response of the API
+def get_odds_local(date=None):
+    date = date or datetime.today().strftime("%Y-%m-%d")
+
+    def fetch():
+        with open(FIXTURE_PATH, "rb") as handle:
+            yield from iter(lambda: handle.read(CHUNK_BYTES), b"")
+
+    chunks = odds_cache().chunks("fixture", date, fetch, CHUNK_BYTES)
+    return parse_schedule(chunks, date)
 
 
 def get_odds(date):
     api_key = os.getenv("FOOTBALL_API_KEY", "")
-    url = f"https://api.sportradar.com/oddscomparison-ust1/en/eu/sports/sr%3Asport%3A1/{date}/schedule.json?api_key={api_key}"
+    url = f"{SCHEDULE_URL.format(date=date)}?api_key={api_key}"
 
     headers = {"accept": "application/json"}
+    cache = odds_cache()
+
+    def fetch():
+        # Send a GET request, the body is parsed while it is downloaded
+        with HTTP_CLIENT.get(url, headers=headers, stream=True) as response:
+            cache.count_request(response.headers)
+            # Check if the request was successful
+            response.raise_for_status()
+            yield from response.iter_content(CHUNK_BYTES)
 
     try:
-        # Send a GET request
-        response = requests.get(url, headers=headers)
-
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Parse the JSON response
-            data = response.json()
-            # print("Fetched Data:", json.dumps(data, indent=4))
-            return data
-        else:
-            print(f"Failed to fetch data. Status code: {response.status_code}")
-            return []
+        chunks = cache.chunks("schedule", date, fetch, CHUNK_BYTES)
+        return parse_schedule(chunks, date)
 
     except requests.exceptions.RequestException as e:
         print(f"An error occurred: {e}")
+        return []
 
-
-# Get only our selected league
-def filter_odds(odds):
-    # sr:season:118689 = Premier league Season 24/25
-    return list(
-        filter(lambda x: x["season"]["id"] == "sr:season:118689", odds["sport_events"])
-    )
+    # A truncated or malformed schedule fails to parse after it was cached
+    except ValueError as e:
+        print(f"Could not parse the schedule of {date}: {e}")
+        cache.discard("schedule", date)
+        return []
 
 
 def extract_features(odds):
@@ -136,39 +184,46 @@ translate_table = {
 }
 
 
-def get_games_today():
-    today = datetime.today().strftime("%Y-%m-%d")
+def get_odds_days(days: int, start: datetime = None) -> dict[str, list[dict]]:
+    # The odds of `days` days from `start` (today) by date, fetched concurrently
+    start = start or datetime.today()
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, days)) as pool:
+        return dict(zip(dates, pool.map(get_odds, dates)))
 
-    # Get odds for all games today
-    odds = get_odds(today)
 
-    # Filter to only premier league
-    premier_odds = filter_odds(odds)
+def get_games(days: int = 1):
+    # Get odds for the games of our competitions today and the next days
+    odds = get_odds_days(days)
+    odds_cache().report()
 
     # Get neede features for inference
-    games = extract_features(premier_odds)
+    games = list()
+    for day_odds in odds.values():
+        games += extract_features(day_odds)
 
     return games
 
 
+def get_games_today():
+    return get_games(days=1)
+
+
 def main():
     today = datetime.today().strftime("%Y-%m-%d")
     # tomorrow = (datetime.today() + timedelta(1)).strftime('%Y-%m-%d')
 
-    # Get odds for all games today
+    # Get odds for the games of our competitions today
     # odds = get_odds(today)
-    odds = get_odds_local()
-
-    # Filter to only premier league
-    premier_odds = filter_odds(odds)
+    odds = get_odds_local(today)
 
     # Quit if there are no games today
-    if len(premier_odds) == 0:
+    if len(odds) == 0:
         print("No Games found in Premier League today")
         quit()
 
     # Get neede features for inference
-    games = extract_features(premier_odds)
+    games = extract_features(odds)
 
     print("Games:", json.dumps(games, indent=4))
 
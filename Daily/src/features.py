@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+from football_shared.lag_features import (
+    AWAY_LAG_FEATURES,
+    HOME_LAG_FEATURES,
+    lag_columns,
+    window_features,
+)
+
+LEAGUE_COLUMNS = ["league_over_percentage", "league_under_percentage"]
+# Odds of a game from `extract_features` -> feature column
+ODDS_COLUMNS = {
+    "home_odds": "avgh",
+    "draw_odds": "avgd",
+    "away_odds": "avga",
+    "over25": "avg_gt_2_5",
+    "under25": "avg_lt_2_5",
+}
+
+
+def games_frame(games: list[dict]) -> pd.DataFrame:
+    # One row per game, odds that are missing or not numbers become NaN
+    games = pd.DataFrame(games, columns=["date", "home", "away", *ODDS_COLUMNS])
+
+    df = pd.DataFrame(
+        {
+            "datetime": pd.to_datetime(games["date"]),
+            "hometeam": games["home"],
+            "awayteam": games["away"],
+        }
+    )
+    for key, col in ODDS_COLUMNS.items():
+        df[col] = pd.to_numeric(games[key], errors="coerce").astype(np.float64)
+
+    return df
+
+
+def sided_lag_columns(
+    window_size: int,
+    home: bool,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> list[str]:
+    # The lag and aggregate columns of the side the model of `window_size` was
+    # trained on, out of the ones of the lag settings of the ingestor
+    return lag_columns(
+        lag_windows or [window_size],
+        lag_aggregates,
+        window=window_size,
+        sides=["hometeam" if home else "awayteam"],
+    )
+
+
+def next_match_lags(
+    matches: pd.DataFrame,
+    window_size: int,
+    home: bool,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> pd.DataFrame:
+    """
+    The lag columns the next match of every team on the side gets, from the
+    stats of its last matches on that side in `matches` (rows of the main
+    feature group). The columns are computed like the ones of the DataIngestor
+    for its `lag_windows` and `lag_aggregates`, so the rows equal the ones of
+    the current form feature group.
+    """
+    team, stats = (
+        ("hometeam", HOME_LAG_FEATURES) if home else ("awayteam", AWAY_LAG_FEATURES)
+    )
+    windows = sorted(lag_windows or [window_size])
+    widest = windows[-1]
+    last = (
+        matches.sort_values("datetime", kind="stable")
+        .groupby(team, sort=False)
+        .tail(widest)
+    )
+
+    # The widest window of every team, oldest match first, slots without a match are NaN
+    groups = last.groupby(team, sort=False)
+    teams = list(groups.groups)
+    windows_array = np.full((len(teams), len(stats), widest), np.nan)
+    for i, (_, group) in enumerate(groups):
+        values = group[list(stats.values())].to_numpy(dtype=np.float64)
+        windows_array[i, :, widest - len(values) :] = values.T
+
+    columns = sided_lag_columns(window_size, home, windows, lag_aggregates)
+    features = window_features(windows_array, list(stats), windows, lag_aggregates)
+    df = pd.DataFrame({team: teams} | {col: features[col] for col in columns})
+    return df.astype({col: np.float64 for col in columns})
+
+
+def form_lags(
+    form: pd.DataFrame,
+    window_size: int,
+    home: bool,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> pd.DataFrame:
+    # The rows of the side from the current form feature group, like `next_match_lags`
+    side, team = ("home", "hometeam") if home else ("away", "awayteam")
+    rows = form[form["side"] == side].rename(columns={"team": team})
+    columns = sided_lag_columns(window_size, home, lag_windows, lag_aggregates)
+    return rows[[team, *columns]].reset_index(drop=True)
+
+
+def assemble_features(
+    games: list[dict],
+    home_lags: pd.DataFrame,
+    away_lags: pd.DataFrame,
+    league_percentages: dict,
+) -> pd.DataFrame:
+    """
+    The inference rows of the games: the league percentages, the odds and the
+    home lags of the home team and away lags of the away team, one row per
+    team in `home_lags` and `away_lags`, joined for all games at once. Teams
+    without lags get NaN lags.
+    """
+    df = games_frame(games)
+    for col in reversed(LEAGUE_COLUMNS):
+        df.insert(0, col, league_percentages.get(col, np.nan))
+
+    df = df.merge(home_lags, on="hometeam", how="left")
+    return df.merge(away_lags, on="awayteam", how="left")
@@ -0,0 +1,62 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from football_shared.trees import TREES_FILE, TreeEnsemble
+
+# Written by the trainer, models saved before the native format are pickled classifiers
+MODEL_FILE = "xgboost_model.ubj"
+PICKLE_FILE = "xgboost_model.pkl"
+META_FILE = "training_meta.json"
+
+
+class NativeModel:
+    """
+    A classifier saved in the native XGBoost format. The feature names and
+    watermark are read from the metadata next to it, the trees are only read
+    when the first prediction runs. Models with exported trees are scored
+    with numpy, without importing xgboost. Predicts like XGBClassifier.
+    """
+
+    def __init__(self, model_path: str):
+        self.model_file = os.path.join(model_path, MODEL_FILE)
+        self.trees_file = os.path.join(model_path, TREES_FILE)
+        with open(os.path.join(model_path, META_FILE), "r") as f:
+            meta = json.load(f)
+
+        # Column order the booster was trained with
+        self.feature_names_in_ = meta["features"]
+        self.watermark = pd.Timestamp(meta["watermark"])
+        self._trees = None
+        self._booster = None
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        X = X[self.feature_names_in_]
+        if self._trees is None and os.path.exists(self.trees_file):
+            self._trees = TreeEnsemble(self.trees_file)
+
+        if self._trees is not None:
+            over = self._trees.predict_proba(X.to_numpy(dtype=np.float32))
+        else:
+            if self._booster is None:
+                # Imported here so models with exported trees never need it
+                import xgboost as xgb
+
+                self._booster = xgb.Booster(model_file=self.model_file)
+            over = self._booster.inplace_predict(X)
+
+        return np.column_stack([1 - over, over])
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+
+def load_model(model_path: str):
+    if os.path.exists(os.path.join(model_path, MODEL_FILE)):
+        return NativeModel(model_path)
+
+    import joblib
+
+    return joblib.load(os.path.join(model_path, PICKLE_FILE))
@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator
+
+# Quota headers of the Sportradar API
+QUOTA_ALLOTTED = "X-Plan-Quota-Allotted"
+QUOTA_CURRENT = "X-Plan-Quota-Current"
+# Days fetched at the same time count their requests one at a time
+_quota_lock = threading.Lock()
+
+
+class OddsCache:
+    """
+    Responses of the odds API stored as files under `cache_dir`, keyed by
+    endpoint and date. A response is fetched again once it is older than
+    `ttl` seconds, unless it was fetched after its day ended, then it never
+    changes. Requests sent to the API are counted in `quota.json`.
+    """
+
+    def __init__(self, cache_dir: str, ttl: float):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def path(self, endpoint: str, date: str) -> str:
+        return os.path.join(self.cache_dir, endpoint, f"{date}.json")
+
+    def is_fresh(self, endpoint: str, date: str) -> bool:
+        path = self.path(endpoint, date)
+        if not os.path.exists(path):
+            return False
+
+        written = os.path.getmtime(path)
+        day_end = datetime.fromisoformat(date).replace(tzinfo=timezone.utc)
+        finished = written >= (day_end + timedelta(days=1)).timestamp()
+        return finished or time.time() - written < self.ttl
+
+    def chunks(
+        self,
+        endpoint: str,
+        date: str,
+        fetch: Callable[[], Iterable[bytes]],
+        chunk_bytes: int,
+    ) -> Iterator[bytes]:
+        """
+        The response of `endpoint` on `date` in chunks, read from the cache
+        when it is fresh. Otherwise the chunks of `fetch()` are passed on while
+        they are written to the cache, which is only replaced when all of the
+        response was read.
+        """
+        path = self.path(endpoint, date)
+        if self.is_fresh(endpoint, date):
+            print(f"Reading {endpoint} of {date} from the odds cache")
+            with open(path, "rb") as f:
+                yield from iter(lambda: f.read(chunk_bytes), b"")
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in fetch():
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def discard(self, endpoint: str, date: str):
+        # Drops a cached response that turned out to be unusable
+        path = self.path(endpoint, date)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def count_request(self, headers: dict | None = None):
+        with _quota_lock:
+            self._count_request(headers)
+
+    def _count_request(self, headers: dict | None):
+        # Counts a request to the API per month, with the quota it reported
+        quota = self.quota()
+        month = datetime.now(timezone.utc).strftime("%Y-%m")
+        quota["requests"][month] = quota["requests"].get(month, 0) + 1
+        if headers and QUOTA_ALLOTTED in headers and QUOTA_CURRENT in headers:
+            quota["allotted"] = int(headers[QUOTA_ALLOTTED])
+            quota["used"] = int(headers[QUOTA_CURRENT])
+            quota["checked"] = datetime.now(timezone.utc).isoformat()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, "quota.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(quota, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def quota(self) -> dict:
+        path = os.path.join(self.cache_dir, "quota.json")
+        if not os.path.exists(path):
+            return {"requests": dict()}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def report(self):
+        quota = self.quota()
+        month = datetime.now(timezone.utc).strftime("%Y-%m")
+        print(f"Odds API requests this month: {quota['requests'].get(month, 0)}")
+        if "allotted" in quota:
+            print(
+                f"Odds API quota left: {quota['allotted'] - quota['used']} of "
+                f"{quota['allotted']} (checked {quota['checked']})"
+            )
@@ -1,13 +1,23 @@
-import joblib
-import os
 import pandas as pd
-import time
-import xgboost as xgb
 
 from datetime import datetime, timedelta
 from hsml.model_registry import ModelRegistry
 
-from src.daily_odds import get_games_today
+from football_shared.lag_features import (
+    AWAY_LAG_FEATURES,
+    HOME_LAG_FEATURES,
+    current_form_feature_group_name,
+    legacy_training_name,
+    training_name,
+)
+
+from src.daily_odds import get_games
+from src.features import (
+    assemble_features,
+    form_lags,
+    next_match_lags,
+)
+from src.model import NativeModel, load_model
 from src.utils import login, logout
 
 
@@ -16,23 +26,24 @@ class Predictor:
         self,
         league,
         window_size,
+        days=1,
+        lag_windows=None,
+        lag_aggregates=(),
     ):
         self.league = league
         self.window_size = window_size
+        # Days of games to predict, starting today
+        self.days = days
+        # The lag settings of the ingestor and the trainer, the model was
+        # trained on the lags of `window_size` out of the `lag_windows`
+        self.lag_windows = sorted(lag_windows or [window_size])
+        self.lag_aggregates = list(lag_aggregates)
 
     def predict_and_save(self):
         self._login()
 
-        attemps = 0
-        data = None
-        while attemps < 3:
-            try:
-                data = self._get_data()
-                break
-            except Exception:
-                attemps += 1
-                time.sleep(0.25)
-
+        # Failed requests to the odds API are retried by its client
+        data = self._get_data()
         if data is None:
             print("No matches today!")
             return
@@ -60,13 +71,12 @@ class Predictor:
         fg.insert(data)
 
     def _get_data(self) -> None | pd.DataFrame:
-        data = pd.DataFrame()
-        games = get_games_today()
+        games = get_games(self.days)
 
         if len(games) <= 0:
             return None
 
-        main_fg, lags_fg = self._get_football_fgs()
+        main_fg = self._get_football_fg()
 
         # Get league percentages
         # Query the latest row from main_fg based
@@ -80,66 +90,87 @@ class Predictor:
             main_fg.datetime
             >= (datetime.today() - timedelta(weeks=1)).strftime("%Y-%m-%d")
         )
-        main_df = main_fg_query.read()
-        main_df = main_df[main_df["datetime"] == main_df["datetime"].max()].reset_index(
-            drop=True
-        )
+        main_df = main_fg_query.read().sort_values("datetime", kind="stable")
+        league_percentages = main_df.iloc[-1].to_dict() if len(main_df) else dict()
+
+        # One row per game with the latest lags of both teams
+        home_lags, away_lags = self._get_team_lags(games, main_fg)
+        return assemble_features(games, home_lags, away_lags, league_percentages)
 
-        # Query lags_fg for the row where "hometeam" or "awayteam" matches
+    def _get_team_lags(
+        self, games: list[dict], main_fg
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+        # Looks up the current form of the teams by key, the ingestor keeps it up to date
         home_teams, away_teams = [g["home"] for g in games], [g["away"] for g in games]
-        lags_home_query = lags_fg.select_all().filter(
-            lags_fg.hometeam.isin(home_teams) | lags_fg.awayteam.isin(away_teams)
-        )
-        lags_df = lags_home_query.read()
-
-        for game in games:
-            home_lags = lags_df[lags_df["hometeam"] == game["home"]]
-            home_lags = home_lags[home_lags["datetime"] == home_lags["datetime"].max()]
-
-            away_lags = lags_df[lags_df["awayteam"] == game["away"]]
-            away_lags = away_lags[away_lags["datetime"] == away_lags["datetime"].max()]
-            df = pd.DataFrame()
-            df["league_over_percentage"] = main_df["league_over_percentage"]
-            df["league_under_percentage"] = main_df["league_under_percentage"]
-            df["datetime"] = pd.to_datetime(game["date"])
-            df["hometeam"] = game["home"]
-            df["awayteam"] = game["away"]
-            df["avgh"] = float(game["home_odds"])
-            df["avgd"] = float(game["draw_odds"])
-            df["avga"] = float(game["away_odds"])
-            df["avg_gt_2_5"] = float(game["over25"])
-            df["avg_lt_2_5"] = float(game["under25"])
-            df = pd.concat(
-                [df, self._get_sided_lags(home_lags, home=True).reset_index(drop=True)],
-                axis=1,
+        home_lags = pd.DataFrame({"hometeam": []})
+        away_lags = pd.DataFrame({"awayteam": []})
+        try:
+            form_fg = self.fs.get_feature_group(
+                name=current_form_feature_group_name(
+                    self.league, self.lag_windows, self.lag_aggregates
+                ),
+                version=1,
             )
-            df = pd.concat(
-                [
-                    df,
-                    self._get_sided_lags(away_lags, home=False).reset_index(drop=True),
-                ],
-                axis=1,
+            form = (
+                form_fg.select_all()
+                .filter(
+                    (form_fg.team.isin(home_teams) & (form_fg.side == "home"))
+                    | (form_fg.team.isin(away_teams) & (form_fg.side == "away"))
+                )
+                .read(online=form_fg.online_enabled)
             )
+            home_lags = self._form_lags(form, home=True)
+            away_lags = self._form_lags(form, home=False)
+        except Exception as e:
+            print(f"Could not read the current form: {e!r}")
+
+        # Teams missing from the table get the lags from their last matches
+        missing_home = sorted(set(home_teams) - set(home_lags["hometeam"]))
+        missing_away = sorted(set(away_teams) - set(away_lags["awayteam"]))
+        if not missing_home and not missing_away:
+            return home_lags, away_lags
+
+        print(f"Computing the form of {missing_home} and {missing_away} from matches")
+        matches = self._read_matches(main_fg, missing_home, missing_away)
+        home_matches = matches[matches["hometeam"].isin(missing_home)]
+        away_matches = matches[matches["awayteam"].isin(missing_away)]
+        return (
+            pd.concat(
+                [home_lags, self._next_match_lags(home_matches, home=True)],
+                ignore_index=True,
+            ),
+            pd.concat(
+                [away_lags, self._next_match_lags(away_matches, home=False)],
+                ignore_index=True,
+            ),
+        )
 
-            data = pd.concat([data, df])
-
-        return data
-
-    def _get_sided_lags(self, df: pd.DataFrame, home: bool):
-        # Identify columns with lists
-        if home:
-            lag_columns = ["hs_lags", "fthg_lags", "hthg_lags", "hst_lags"]
-        else:
-            lag_columns = ["as_lags", "ftag_lags", "htag_lags", "ast_lags"]
+    def _form_lags(self, form: pd.DataFrame, home: bool) -> pd.DataFrame:
+        return form_lags(
+            form, self.window_size, home, self.lag_windows, self.lag_aggregates
+        )
 
-        # Get actual lag columns (*_lags_<window_size>)
-        lag_columns = [
-            col
-            for col in df.columns
-            if any(col.startswith(prefix) for prefix in lag_columns)
-        ]
+    def _next_match_lags(self, matches: pd.DataFrame, home: bool) -> pd.DataFrame:
+        return next_match_lags(
+            matches, self.window_size, home, self.lag_windows, self.lag_aggregates
+        )
 
-        return df[lag_columns]
+    def _read_matches(
+        self, main_fg, home_teams: list[str], away_teams: list[str]
+    ) -> pd.DataFrame:
+        # The match stats of the home matches of `home_teams` and away matches of `away_teams`
+        conditions = []
+        if home_teams:
+            conditions.append(main_fg.hometeam.isin(home_teams))
+        if away_teams:
+            conditions.append(main_fg.awayteam.isin(away_teams))
+
+        columns = ["datetime", "hometeam", "awayteam"]
+        columns += [*HOME_LAG_FEATURES.values(), *AWAY_LAG_FEATURES.values()]
+        condition = (
+            conditions[0] if len(conditions) == 1 else conditions[0] | conditions[1]
+        )
+        return main_fg.select(columns).filter(condition).read()
 
     def _login(self):
         # connect with Hopsworks
@@ -148,24 +179,26 @@ class Predictor:
         # get Hopsworks Model Registry
         self.mr: ModelRegistry = self.project.get_model_registry()
 
-    def _get_football_fgs(self):
+    def _get_football_fg(self):
         main_fg = self.fs.get_feature_group(
             name=f"football_{self.league.lower()}",
             version=1,
         )
 
-        lags_fg = self.fs.get_feature_group(
-            name=f"football_{self.league.lower()}_lags_{self.window_size}",
-            version=1,
-        )
-
-        return main_fg, lags_fg
+        return main_fg
 
-    def _load_model(self) -> xgb.XGBClassifier:
+    def _load_model(self) -> NativeModel:
         # Loads the model with highest f1_score
         EVALUATION_METRIC = "f1_score"
         SORT_METRICS_BY = "max"  # your sorting criteria
-        MODEL_NAME = "football_xgboost"
+        # The trainer registers a model for every league, window size and lag settings
+        settings = (
+            self.league,
+            self.window_size,
+            self.lag_windows,
+            self.lag_aggregates,
+        )
+        MODEL_NAME = training_name("football_xgboost", *settings)
 
         # get best model based on custom metrics
         best_model = self.mr.get_best_model(
@@ -173,9 +206,23 @@ class Predictor:
             EVALUATION_METRIC,
             SORT_METRICS_BY,
         )
+
+        # Until the trainer registered the first model under the new name
+        legacy_name = legacy_training_name("football_xgboost", *settings)
+        if best_model is None and legacy_name is not None:
+            print(f"No model {MODEL_NAME} yet, loading the legacy model {legacy_name}")
+            best_model = self.mr.get_best_model(
+                legacy_name,
+                EVALUATION_METRIC,
+                SORT_METRICS_BY,
+            )
+
+        if best_model is None:
+            raise ValueError(
+                f"No model {MODEL_NAME} with a {EVALUATION_METRIC} in the model "
+                "registry, run the trainer for this league and window size first"
+            )
         model_path = best_model.download("./model")
-        xgb_model: xgb.XGBClassifier = joblib.load(
-            os.path.join(model_path, "xgboost_model.pkl")
-        )
 
-        return xgb_model
+        # The booster is read on the first prediction
+        return load_model(model_path)
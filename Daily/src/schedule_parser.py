@@ -0,0 +1,173 @@
+import codecs
+import json
+import os
+import threading
+from typing import Iterable, Iterator
+
+WHITESPACE = " \t\n\r"
+
+
+class _Stream:
+    # A text buffer over chunks of a JSON document, consumed from `pos`
+    def __init__(self, chunks: Iterable[bytes | str]):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+
+    def fill(self, size: int = 1) -> bool:
+        # Appends chunks until at least `size` characters, False at the end
+        pieces, read = [], 0
+        for chunk in self.chunks:
+            text = self.utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            pieces.append(text)
+            read += len(text)
+            if read >= size:
+                break
+
+        if not pieces:
+            return False
+        self.buffer = self.buffer[self.pos :] + "".join(pieces)
+        self.pos = 0
+        return True
+
+    def grow(self) -> bool:
+        # Doubles the unread text, so decoding a value again stays linear
+        return self.fill(len(self.buffer) - self.pos)
+
+    def peek(self) -> str:
+        # The next character that is not whitespace, "" at the end
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at {self.buffer[self.pos:][:40]!r}")
+        self.pos += 1
+
+    def value(self):
+        """
+        Decodes the next value. A value that is cut off by the end of the
+        buffer, or ends exactly there like a number might continue, is
+        decoded again with more chunks appended.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                if end < len(self.buffer) or not self.grow():
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self.grow():
+                    raise
+
+
+def iter_array_items(chunks: Iterable[bytes | str], key: str) -> Iterator:
+    """
+    Yields the items of the array under `key` in the top level object of a
+    JSON document read from `chunks`, one at a time, so only one item and
+    one chunk are held in memory instead of the whole document. The other
+    top level values are decoded and dropped.
+    """
+    stream = _Stream(chunks)
+    stream.expect("{")
+    while stream.peek() != "}":
+        name = stream.value()
+        stream.expect(":")
+        if name != key:
+            stream.value()
+        else:
+            stream.expect("[")
+            while stream.peek() != "]":
+                yield stream.value()
+                _separator(stream, "]")
+            stream.pos += 1
+
+        _separator(stream, "}")
+
+    # Reads to the end, so a response that is cached while it is read is complete
+    stream.pos += 1
+    if stream.peek():
+        raise ValueError("Expected the end of the document")
+
+
+def _separator(stream: _Stream, end: str):
+    # Values are followed by a comma or the end of their array or object
+    if stream.peek() == ",":
+        stream.pos += 1
+    elif stream.peek() != end:
+        raise ValueError(
+            f"Expected ',' or {end!r} at {stream.buffer[stream.pos:][:40]!r}"
+        )
+
+
+def competition_id(event: dict) -> str:
+    # Sportradar calls the competition a tournament
+    return event["season"].get("tournament_id") or event["tournament"]["id"]
+
+
+def filter_events(
+    events: Iterable[dict], season_ids: set[str], competition_ids: set[str]
+) -> Iterator[dict]:
+    # Keeps the events of the seasons or competitions
+    for event in events:
+        if (
+            event["season"]["id"] in season_ids
+            or competition_id(event) in competition_ids
+        ):
+            yield event
+
+
+class SeasonCache:
+    """
+    The current season of competitions, taken from the season metadata of
+    their events and kept in a JSON file until the season ends, so only
+    competitions without a known season are matched by competition id.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.seasons = dict()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.seasons = json.load(f)
+
+    def resolve(self, competition_ids: set[str], day: str) -> tuple[set, set]:
+        # The cached season ids running on `day` and the competitions without one
+        season_ids, unresolved = set(), set()
+        for competition in competition_ids:
+            season = self.seasons.get(competition)
+            if season and _runs_on(season, day):
+                season_ids.add(season["id"])
+            else:
+                unresolved.add(competition)
+
+        return season_ids, unresolved
+
+    def update(self, events: list[dict], competition_ids: set[str], day: str):
+        # Caches the seasons of the competitions that run on `day`
+        updated = False
+        for event in events:
+            season = event["season"]
+            competition = competition_id(event)
+            if competition in competition_ids and _runs_on(season, day):
+                updated |= self.seasons.get(competition) != season
+                self.seasons[competition] = season
+
+        if updated:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Days parsed at the same time each write their own temporary file
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.seasons, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def _runs_on(season: dict, day: str) -> bool:
+    # Seasons without an end date are never cached
+    return season.get("start_date", day) <= day <= season.get("end_date", "")
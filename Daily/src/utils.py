@@ -2,8 +2,19 @@ import os
 import hopsworks
 from hsfs.feature_store import FeatureStore
 
+from football_shared import local_store
+
+
+def store_backend() -> str:
+    # "hopsworks" or "local", the local store lives in FOOTBALL_STORE_DIR
+    return local_store.backend()
+
 
 def login(project="ID2223_Project") -> tuple[hopsworks.project.Project, FeatureStore]:
+    if store_backend() == "local":
+        project = local_store.login()
+        return project, project.get_feature_store()
+
     project = hopsworks.login(
         api_key_value=os.environ["HOPSWORKS_API_KEY"],
         project=project,
@@ -14,4 +25,5 @@ def login(project="ID2223_Project") -> tuple[hopsworks.project.Project, FeatureS
 
 
 def logout():
-    hopsworks.logout()
+    if store_backend() == "hopsworks":
+        hopsworks.logout()
@@ -7,9 +7,17 @@ image = (
     .apt_install("git")
     .apt_install("build-essential")
     .pip_install_from_requirements(requirements_txt="modal_container_requirements.txt")
-    .add_local_python_source("src")
+    .add_local_python_source("src", "football_shared")
 )
 app = modal.App(name="Football XGBoost Model Trainer")
+# Cached odds responses and the API quota, in the default ODDS_CACHE_DIR
+volume = modal.Volume.from_name("football-odds-cache", create_if_missing=True)
+# Today and the next days are predicted, each day is a request to the odds API
+DAYS = 3
+# The lag_windows and lag_aggregates of the DataIngestor config, the model of
+# the window size is the one the trainer registered for these settings
+LAG_WINDOWS = [4]
+LAG_AGGREGATES = []
 
 
 @app.function(
@@ -19,7 +27,17 @@ app = modal.App(name="Football XGBoost Model Trainer")
         modal.Secret.from_name("FOOTBALL_API_KEY"),
     ],
     schedule=modal.Cron("0 3 * * *"),  # Every day at 3 am
+    volumes={"/root/odds_cache": volume},
 )
 def entry():
-    trainer = Predictor(league="E0", window_size=4)
-    trainer.predict_and_save()
+    trainer = Predictor(
+        league="E0",
+        window_size=4,
+        days=DAYS,
+        lag_windows=LAG_WINDOWS,
+        lag_aggregates=LAG_AGGREGATES,
+    )
+    try:
+        trainer.predict_and_save()
+    finally:
+        volume.commit()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from football_shared.lag_features import AWAY_LAG_FEATURES, HOME_LAG_FEATURES
+from src.features import assemble_features, form_lags, next_match_lags
+
+
+def matches(rows: int = 60, seed: int = 0) -> pd.DataFrame:
+    # Rows of the main feature group between four teams, with missing stats
+    rng = np.random.default_rng(seed)
+    teams = np.array(["a", "b", "c", "d"])
+    home = rng.integers(0, 4, rows)
+    df = pd.DataFrame(
+        {
+            "datetime": pd.Timestamp("2024-08-01")
+            + pd.to_timedelta(np.arange(rows), unit="D"),
+            "hometeam": teams[home],
+            "awayteam": teams[(home + rng.integers(1, 4, rows)) % 4],
+        }
+    )
+    for col in [*HOME_LAG_FEATURES.values(), *AWAY_LAG_FEATURES.values()]:
+        df[col] = rng.integers(0, 10, rows).astype(np.float64)
+        df.loc[rng.random(rows) < 0.2, col] = np.nan
+    return df
+
+
+def reference_lags(df: pd.DataFrame, window_size: int, home: bool) -> pd.DataFrame:
+    # Lag i is the i-th oldest stat that is not missing in the last matches
+    team, stats = (
+        ("hometeam", HOME_LAG_FEATURES) if home else ("awayteam", AWAY_LAG_FEATURES)
+    )
+    rows = []
+    for name, group in df.groupby(team):
+        row = {team: name}
+        for prefix, col in stats.items():
+            values = group[col].tail(window_size).dropna().tolist()
+            values += [np.nan] * (window_size - len(values))
+            row |= {f"{prefix}_lags_{i + 1}": v for i, v in enumerate(values)}
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("home", [True, False])
+def test_next_match_lags_of_one_window(home):
+    df = matches()
+    team = "hometeam" if home else "awayteam"
+    lags = next_match_lags(df, 4, home).sort_values(team, ignore_index=True)
+    pd.testing.assert_frame_equal(lags, reference_lags(df, 4, home))
+
+
+@pytest.mark.parametrize("window_size", [2, 5])
+def test_next_match_lags_of_several_windows(window_size):
+    df = matches()
+    lags = next_match_lags(df, window_size, True, [2, 5], ["mean"])
+    lags = lags.sort_values("hometeam", ignore_index=True)
+
+    # The lags of the window equal the ones computed for that window alone
+    reference = reference_lags(df, window_size, True)
+    for prefix in HOME_LAG_FEATURES:
+        for i in range(window_size):
+            np.testing.assert_array_equal(
+                lags[f"{prefix}_w{window_size}_lags_{i + 1}"],
+                reference[f"{prefix}_lags_{i + 1}"],
+            )
+    lag_names = [f"hs_w{window_size}_lags_{i + 1}" for i in range(window_size)]
+    np.testing.assert_allclose(
+        lags[f"hs_w{window_size}_mean"], lags[lag_names].mean(axis=1)
+    )
+    assert all(f"_w{window_size}_" in col for col in lags.columns[1:])
+
+
+def test_form_lags_select_the_window_and_side():
+    lags = next_match_lags(matches(), 2, True, [2, 5], ["mean"])
+    form = lags.rename(columns={"hometeam": "team"}).assign(side="home", extra=1.0)
+    form = pd.concat([form, form.assign(side="away")], ignore_index=True)
+
+    selected = form_lags(form, 2, True, [2, 5], ["mean"])
+    pd.testing.assert_frame_equal(selected, lags)
+
+
+def test_assemble_features_joins_the_lags_of_both_sides():
+    df = matches()
+    games = [
+        {"date": "2024-10-01T15:00:00+00:00", "home": "a", "away": "b", "over25": "x"},
+        {"date": "2024-10-01T17:00:00+00:00", "home": "new", "away": "a"},
+    ]
+    features = assemble_features(
+        games,
+        next_match_lags(df, 4, True),
+        next_match_lags(df, 4, False),
+        {"league_over_percentage": 0.5},
+    )
+
+    assert features["hometeam"].tolist() == ["a", "new"]
+    assert np.isnan(features["avg_gt_2_5"]).all()
+    assert np.isnan(features.loc[1, "hs_lags_1"])
+    assert (
+        features.loc[0, "as_lags_1"]
+        == reference_lags(df, 4, False).set_index("awayteam").loc["b", "as_lags_1"]
+    )
@@ -0,0 +1,117 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src import daily_odds
+from src.odds_cache import QUOTA_ALLOTTED, QUOTA_CURRENT, OddsCache
+
+TTL = 60
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def read(cache: OddsCache, date: str, body: bytes = b"{}") -> tuple[bytes, int]:
+    # The cached or fetched response and the number of fetches
+    fetches = []
+
+    def fetch():
+        fetches.append(date)
+        yield body
+
+    return b"".join(cache.chunks("schedule", date, fetch, 4)), len(fetches)
+
+
+def age(cache: OddsCache, date: str, written: float):
+    os.utime(cache.path("schedule", date), (written, written))
+
+
+def test_fresh_until_the_ttl(tmp_path):
+    cache = OddsCache(str(tmp_path), TTL)
+    assert read(cache, today(), b'{"a": 1}') == (b'{"a": 1}', 1)
+    assert read(cache, today(), b'{"a": 2}') == (b'{"a": 1}', 0)
+
+    age(cache, today(), time.time() - TTL - 1)
+    assert read(cache, today(), b'{"a": 2}') == (b'{"a": 2}', 1)
+
+
+def test_fetched_after_the_day_ended_never_expires(tmp_path):
+    cache = OddsCache(str(tmp_path), TTL)
+    read(cache, "2025-01-03")
+    day_end = datetime(2025, 1, 4, tzinfo=timezone.utc).timestamp()
+
+    age(cache, "2025-01-03", day_end + 1)
+    assert read(cache, "2025-01-03")[1] == 0
+
+    # Fetched while the day was running, so it may have changed since
+    age(cache, "2025-01-03", day_end - 1)
+    assert read(cache, "2025-01-03")[1] == 1
+
+
+def test_interrupted_fetch_is_not_cached(tmp_path):
+    cache = OddsCache(str(tmp_path), TTL)
+
+    def fetch():
+        yield b'{"a": '
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        list(cache.chunks("schedule", today(), fetch, 4))
+    assert not cache.is_fresh("schedule", today())
+    assert os.listdir(os.path.dirname(cache.path("schedule", today()))) == []
+
+
+def test_counts_requests_and_quota(tmp_path):
+    cache = OddsCache(str(tmp_path), TTL)
+    cache.count_request()
+    cache.count_request({QUOTA_ALLOTTED: "1000", QUOTA_CURRENT: "12"})
+
+    quota = cache.quota()
+    month = datetime.now(timezone.utc).strftime("%Y-%m")
+    assert quota["requests"] == {month: 2}
+    assert (quota["allotted"], quota["used"]) == (1000, 12)
+
+
+class Response:
+    headers = {QUOTA_ALLOTTED: "1000", QUOTA_CURRENT: "1"}
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_bytes: int):
+        return [self.body]
+
+
+class Client:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def get(self, url, headers=None, stream=False):
+        return Response(self.body)
+
+
+def test_truncated_schedule_is_discarded(monkeypatch, tmp_path):
+    monkeypatch.setattr(daily_odds, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(daily_odds, "HTTP_CLIENT", Client(b'{"sport_events": [{'))
+    date = (datetime.now(timezone.utc) + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    assert daily_odds.get_odds(date) == []
+    assert not os.path.exists(daily_odds.odds_cache().path("schedule", date))
+
+    # The next call fetches the schedule again
+    monkeypatch.setattr(daily_odds, "HTTP_CLIENT", Client(b'{"sport_events": []}'))
+    assert daily_odds.get_odds(date) == []
+    assert daily_odds.odds_cache().is_fresh("schedule", date)
+    assert sum(daily_odds.odds_cache().quota()["requests"].values()) == 2
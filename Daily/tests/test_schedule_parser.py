@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from src import daily_odds
+from src.schedule_parser import iter_array_items
+
+
+def event(match: int, season: str, tournament: str) -> dict:
+    return {
+        "id": f"sr:match:{match}",
+        "season": {
+            "id": season,
+            "name": "Süper Lig 24/25",
+            "start_date": "2024-08-09",
+            "end_date": "2025-06-02",
+            "tournament_id": tournament,
+        },
+        "tournament": {"id": tournament},
+        "competitors": [{"name": "Fenerbahçe"}, {"name": "Beşiktaş"}],
+    }
+
+
+EVENTS = [
+    event(1, "sr:season:1", "sr:tournament:17"),
+    event(2, "sr:season:2", "sr:tournament:52"),
+    event(3, "sr:season:1", "sr:tournament:17"),
+]
+SCHEDULE = json.dumps(
+    {"generated_at": "2025-01-03", "sport": {"id": 1}, "sport_events": EVENTS},
+    ensure_ascii=False,
+    indent=1,
+).encode()
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, len(SCHEDULE)])
+def test_items_of_every_chunk_size(size):
+    # Chunks of one byte also split the multi-byte characters
+    assert list(iter_array_items(chunked(SCHEDULE, size), "sport_events")) == EVENTS
+
+
+def test_missing_key_and_empty_array():
+    assert list(iter_array_items([b'{"a": [1, 2], "b": {}}'], "sport_events")) == []
+    assert list(iter_array_items([b'{"sport_events": []}'], "sport_events")) == []
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        SCHEDULE[: len(SCHEDULE) // 2],
+        SCHEDULE[:-1],
+        SCHEDULE + b"{}",
+        b"",
+        b"[]",
+        b'{"sport_events": [1 2]}',
+        b"<html>Bad gateway</html>",
+    ],
+    ids=["half", "last brace", "trailing", "empty", "array", "no comma", "html"],
+)
+def test_truncated_or_invalid_schedule(data):
+    with pytest.raises(ValueError):
+        list(iter_array_items(chunked(data, 16), "sport_events"))
+
+
+def test_parse_schedule_keeps_our_competitions(monkeypatch, tmp_path):
+    monkeypatch.setattr(daily_odds, "CACHE_DIR", str(tmp_path))
+    events = daily_odds.parse_schedule(
+        chunked(SCHEDULE, 64), "2025-01-03", competition_ids={"sr:tournament:17"}
+    )
+    assert [e["id"] for e in events] == ["sr:match:1", "sr:match:3"]
+
+    # The season of the competition is cached and matched by id next time
+    with open(tmp_path / "seasons.json", "r") as f:
+        assert json.load(f)["sr:tournament:17"]["id"] == "sr:season:1"
+    events = daily_odds.parse_schedule(
+        chunked(SCHEDULE, 64), "2025-01-04", competition_ids={"sr:tournament:17"}
+    )
+    assert len(events) == 2
+
+
+def test_parse_schedule_of_a_truncated_payload(monkeypatch, tmp_path):
+    monkeypatch.setattr(daily_odds, "CACHE_DIR", str(tmp_path))
+    with pytest.raises(ValueError):
+        daily_odds.parse_schedule([SCHEDULE[:-10]], "2025-01-03")
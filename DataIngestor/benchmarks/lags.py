@@ -0,0 +1,133 @@
+"""
+Compares the previous groupby/apply lag pipeline against `src.lags.create_lag_df`,
+and one pass per window against the single pass of `src.lags.create_window_lag_df`.
+
+Run from the DataIngestor directory: `python -m benchmarks.lags`
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.lags import create_lag_df, create_window_lag_df
+
+SEASONS = [1, 10, 30]
+TEAMS = 20
+WINDOW_SIZE = 4
+WINDOWS = [3, 5, 10, 20]
+AGGREGATES = ["mean", "sum"]
+
+
+def make_seasons(seasons: int, teams: int = TEAMS, seed: int = 0) -> pd.DataFrame:
+    # Double round robin per season, in kick-off order like the football-data sheets
+    rng = np.random.default_rng(seed)
+    names = [f"Team {i}" for i in range(teams)]
+    fixtures = [(h, a) for h in names for a in names if h != a]
+
+    rows = []
+    kickoff = pd.Timestamp("1995-08-01 15:00")
+    for _ in range(seasons):
+        for i in rng.permutation(len(fixtures)):
+            rows.append((kickoff, *fixtures[i]))
+            kickoff += pd.Timedelta(hours=6)
+
+    df = pd.DataFrame(rows, columns=["datetime", "hometeam", "awayteam"])
+    for col in ["fthg", "ftag", "hthg", "htag", "homeshots", "awayshots", "hst", "ast"]:
+        df[col] = rng.integers(0, 20, len(df))
+
+    return df
+
+
+def legacy_create_lag_df(df: pd.DataFrame, window_size):
+    # The implementation `create_lag_df` replaced, kept as reference
+    df_lags = df[["datetime", "hometeam", "awayteam"]].copy()
+
+    def get_lag_features(series, window_size):
+        return pd.Series(
+            series.shift().rolling(window=window_size, min_periods=1)
+        ).apply(lambda x: list(x.dropna()))
+
+    home_lags = [
+        ("hs_lags", "homeshots"),
+        ("fthg_lags", "fthg"),
+        ("hthg_lags", "hthg"),
+        ("hst_lags", "hst"),
+    ]
+    away_lags = [
+        ("as_lags", "awayshots"),
+        ("ftag_lags", "ftag"),
+        ("htag_lags", "htag"),
+        ("ast_lags", "ast"),
+    ]
+
+    for side, lags in [("hometeam", home_lags), ("awayteam", away_lags)]:
+        for name, col in lags:
+            data = df.groupby(side)[col].apply(
+                lambda x: get_lag_features(x, window_size)
+            )
+            for team in df_lags[side].unique():
+                team_data = data[team]
+                team_data.index = df_lags.loc[df_lags[side] == team].index
+                df_lags.loc[df_lags[side] == team, name] = team_data
+
+    lag_columns = [col for col in df_lags.columns if col.endswith("_lags")]
+    for col in lag_columns:
+        expanded_cols = pd.DataFrame(df_lags[col].tolist(), index=df_lags.index)
+        expanded_cols.columns = [f"{col}_{i+1}" for i in expanded_cols.columns]
+        df_lags = pd.concat([df_lags.drop(columns=[col]), expanded_cols], axis=1)
+
+    return df_lags
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def main():
+    print(
+        f"{'seasons':>8} {'rows':>8} {'legacy (s)':>12} {'columnar (s)':>14} {'speedup':>9}"
+    )
+    for seasons in SEASONS:
+        df = make_seasons(seasons)
+        legacy_time, expected = timed(legacy_create_lag_df, df, WINDOW_SIZE, repeat=1)
+        new_time, result = timed(create_lag_df, df, WINDOW_SIZE)
+
+        pd.testing.assert_frame_equal(result, expected)
+        print(
+            f"{seasons:>8} {len(df):>8} {legacy_time:>12.3f} {new_time:>14.4f} {legacy_time / new_time:>8.0f}x"
+        )
+
+    print(f"\nWindows {WINDOWS} with {AGGREGATES}")
+    print(
+        f"{'seasons':>8} {'rows':>8} {'per window (s)':>15} {'single pass (s)':>16} {'speedup':>9}"
+    )
+    for seasons in SEASONS:
+        df = make_seasons(seasons)
+        per_window_time, per_window = timed(
+            lambda: [create_window_lag_df(df, [w], AGGREGATES) for w in WINDOWS]
+        )
+        single_time, result = timed(create_window_lag_df, df, WINDOWS, AGGREGATES)
+
+        # The single pass holds the same values as the separate windows
+        for window, expected in zip(WINDOWS, per_window):
+            np.testing.assert_array_equal(
+                result[[f"fthg_w{window}_lags_{i + 1}" for i in range(window)]],
+                expected[[f"fthg_lags_{i + 1}" for i in range(window)]],
+            )
+            np.testing.assert_array_equal(
+                result[f"ast_w{window}_mean"], expected[f"ast_w{window}_mean"]
+            )
+        print(
+            f"{seasons:>8} {len(df):>8} {per_window_time:>15.4f} {single_time:>16.4f} {per_window_time / single_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
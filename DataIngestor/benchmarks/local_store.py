@@ -0,0 +1,60 @@
+"""
+Times inserts into the local feature store and compares reads whose filters
+are evaluated on the primary key/event time index against full scans.
+
+Run from the DataIngestor directory: `python -m benchmarks.local_store`
+"""
+
+import tempfile
+import time
+
+from benchmarks.lags import make_seasons
+from football_shared import local_store
+
+SEASONS = 200
+INSERTS = 100
+
+
+def main():
+    df = make_seasons(SEASONS)
+    df["ftour"] = (df["fthg"] + df["ftag"] > 2.5).map({True: "O", False: "U"})
+
+    with tempfile.TemporaryDirectory() as root:
+        fs = local_store.login(root).get_feature_store()
+        fg = fs.get_or_create_feature_group(
+            name="football_bench",
+            version=1,
+            primary_key=["datetime", "hometeam", "awayteam"],
+            event_time="datetime",
+        )
+
+        start = time.perf_counter()
+        for batch in range(INSERTS):
+            fg.insert(df.iloc[batch::INSERTS])
+        insert_time = time.perf_counter() - start
+        print(f"{INSERTS} inserts of {len(df)} rows in total: {insert_time:.2f}s")
+
+        since = df["datetime"].iloc[-len(df) // 50]
+        teams = ["Team 1", "Team 2"]
+        queries = {
+            "datetime range (index)": fg.select_all().filter(fg.datetime >= since),
+            "datetime range (scan)": fg.select_all().filter(
+                (fg.datetime >= since) & (fg.fthg >= 0)
+            ),
+            "team isin (index)": fg.select_all().filter(
+                fg.hometeam.isin(teams) | fg.awayteam.isin(teams)
+            ),
+            "team isin (scan)": fg.select_all().filter(
+                (fg.hometeam.isin(teams) | fg.awayteam.isin(teams)) & (fg.fthg >= 0)
+            ),
+        }
+
+        print(f"{'query':>24} {'rows':>7} {'time (s)':>9}")
+        for name, query in queries.items():
+            start = time.perf_counter()
+            result = query.read()
+            print(f"{name:>24} {len(result):>7} {time.perf_counter() - start:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
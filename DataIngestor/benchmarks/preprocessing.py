@@ -0,0 +1,128 @@
+"""
+Compares the previous row-wise date combining and league percentages against
+`src.preprocessing` on a 50k row multi-league frame.
+
+Run from the DataIngestor directory: `python -m benchmarks.preprocessing`
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import combine_date_time, preprocess
+
+ROWS = 50_000
+LEAGUES = ["E0", "E1", "E2", "E3", "SC0", "SC1", "D1", "I1", "SP1", "F1"]
+FEATURES = ["Date", "HomeTeam", "AwayTeam", "FTHG", "FTAG", "FTR", "HTHG", "HTAG", "HTR", "HS", "AS", "HST", "AST", "AvgH", "AvgD", "AvgA", "Avg>2.5", "Avg<2.5"]  # fmt: skip
+
+
+def make_sheets(rows: int = ROWS, seed: int = 0) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    per_league = rows // len(LEAGUES)
+
+    sheets = dict()
+    for league in LEAGUES:
+        days = np.sort(rng.integers(0, 365 * 10, per_league))
+        minutes = rng.choice([12 * 60 + 30, 15 * 60, 17 * 60 + 30, 20 * 60], per_league)
+        df = pd.DataFrame(
+            {
+                "Date": pd.Timestamp("2015-08-01") + pd.to_timedelta(days, "D"),
+                "Time": [
+                    datetime.min.replace(hour=m // 60, minute=m % 60).time()
+                    for m in minutes
+                ],
+                "HomeTeam": rng.choice([f"Team {i}" for i in range(20)], per_league),
+                "AwayTeam": rng.choice([f"Team {i}" for i in range(20)], per_league),
+                "FTR": rng.choice(["H", "D", "A"], per_league),
+                "HTR": rng.choice(["H", "D", "A"], per_league),
+            }
+        )
+        for col in ["FTHG", "FTAG", "HTHG", "HTAG", "HS", "AS", "HST", "AST"]:
+            df[col] = rng.integers(0, 6, per_league)
+        for col in ["AvgH", "AvgD", "AvgA", "Avg>2.5", "Avg<2.5"]:
+            df[col] = rng.uniform(1.1, 8.0, per_league)
+        sheets[league] = df
+
+    return sheets
+
+
+def legacy_combine_date_time(df: pd.DataFrame) -> pd.DataFrame:
+    df["Date"] = pd.to_datetime(
+        df["Date"].dt.date.combine(df["Time"], lambda x, y: datetime.combine(x, y)),
+        errors="coerce",
+    )
+    df.drop(columns=["Time"], inplace=True)
+    return df
+
+
+def legacy_create_league_percentages(df: pd.DataFrame):
+    df["total_goals"] = df["fthg"] + df["ftag"]
+    df.insert(7, "ftour", df["total_goals"].apply(lambda x: "O" if x > 2.5 else "U"))
+
+    df["cum_o"] = (df["ftour"] == "O").cumsum()
+    df["cum_u"] = (df["ftour"] == "U").cumsum()
+    df["total_games"] = df.index
+    df[["cum_o", "cum_u"]] = df[["cum_o", "cum_u"]].shift(1)
+    df[["cum_o", "cum_u", "total_games"]] = df[
+        ["cum_o", "cum_u", "total_games"]
+    ].fillna(0)
+
+    df["league_over_percentage"] = (df["cum_o"] / df["total_games"]).fillna(0)
+    df["league_under_percentage"] = (df["cum_u"] / df["total_games"]).fillna(0)
+    df.drop(columns=["total_goals", "cum_o", "cum_u", "total_games"], inplace=True)
+
+    return df
+
+
+def legacy_preprocess(sheets: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    # Column formatting did not change, so only the other steps are the old ones
+    from src.preprocessing import format_df
+
+    dfs = dict()
+    for league, df in sheets.items():
+        df = legacy_combine_date_time(df.copy())
+        df = format_df(df[FEATURES].copy())
+        dfs[league] = legacy_create_league_percentages(df)
+
+    return dfs
+
+
+def vectorized_preprocess(sheets: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    return {
+        league: preprocess(combine_date_time(df.copy()), FEATURES)
+        for league, df in sheets.items()
+    }
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def main():
+    sheets = make_sheets()
+    legacy_time, expected = timed(legacy_preprocess, sheets)
+    new_time, result = timed(vectorized_preprocess, sheets)
+
+    for league in LEAGUES:
+        pd.testing.assert_frame_equal(
+            result[league].astype({"ftour": object}), expected[league]
+        )
+
+    memory = sum(df.memory_usage(deep=True).sum() for df in expected.values())
+    new_memory = sum(df.memory_usage(deep=True).sum() for df in result.values())
+    print(f"{ROWS} rows in {len(LEAGUES)} leagues")
+    print(f"legacy:     {legacy_time:.3f}s, {memory / 1024**2:.1f} MiB")
+    print(f"vectorized: {new_time:.3f}s, {new_memory / 1024**2:.1f} MiB")
+    print(f"speedup:    {legacy_time / new_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+KEY = ["Date", "HomeTeam", "AwayTeam"]
+# Lists the parts a compaction merges until all of them are removed
+COMPACTION_MARKER = "_compacting.json"
+
+
+def season_of(dates: pd.Series) -> pd.Series:
+    # Seasons start in July, e.g. 2024-08-17 is in season 2024-2025
+    start = dates.dt.year - (dates.dt.month < 7)
+    return start.astype(str) + "-" + (start + 1).astype(str)
+
+
+def key_hashes(df: pd.DataFrame) -> np.ndarray:
+    # Dates hash by their unit, the parts may be read back in another one
+    keys = df[KEY].astype({"Date": "datetime64[ns]"})
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+class MatchArchive:
+    """
+    Append-only local store of the downloaded sheets, partitioned by league
+    and season:
+
+        <root>/league=<league>/season=<season>/part-<n>.parquet
+
+    Every partition keeps an index of the key hashes it contains, so appending
+    only writes the new rows as a small part file. Partitions with many parts
+    are compacted into one part in a background thread. A compaction that was
+    interrupted, e.g. by a crash, is finished the next time its partition is
+    used, so its rows are never read twice. So is an append that wrote its
+    part but not the index, which is rebuilt from the parts.
+    """
+
+    def __init__(self, root: str, compact_after_parts: int = 8):
+        self.root = root
+        self.compact_after_parts = compact_after_parts
+        self._locks: dict[str, threading.Lock] = dict()
+        self._locks_lock = threading.Lock()
+        self._compactor = ThreadPoolExecutor(max_workers=1)
+
+    def append(self, league: str, df: pd.DataFrame) -> int:
+        """
+        Appends the rows of `df` whose keys are not stored yet and returns the
+        number of rows appended.
+        """
+        df = df.dropna(subset=["Date"]).drop_duplicates(subset=KEY, keep="first")
+        appended = 0
+        for season, season_df in df.groupby(season_of(df["Date"]), sort=True):
+            partition = self._partition_dir(league, season)
+            with self._lock(partition):
+                self._recover(partition)
+                stored = self._load_index(partition)
+                hashes = key_hashes(season_df)
+                new = ~np.isin(hashes, stored)
+                if not new.any():
+                    continue
+
+                os.makedirs(partition, exist_ok=True)
+                self._write_part(partition, season_df[new])
+                self._save_index(partition, np.concatenate([stored, hashes[new]]))
+                appended += int(new.sum())
+
+            if len(self._parts(partition)) > self.compact_after_parts:
+                self.compact_async(league, season)
+
+        return appended
+
+    def read(self, league: str, season: str = None) -> pd.DataFrame:
+        # A merged, time sorted view of the league (or one of its seasons)
+        seasons = [season] if season else self.seasons(league)
+        frames = []
+        for season in seasons:
+            partition = self._partition_dir(league, season)
+            with self._lock(partition):
+                self._recover(partition)
+                frames += [
+                    pd.read_parquet(os.path.join(partition, part))
+                    for part in self._parts(partition)
+                ]
+
+        if len(frames) == 0:
+            return pd.DataFrame(columns=KEY)
+
+        return (
+            pd.concat(frames, ignore_index=True)
+            .sort_values("Date", kind="stable")
+            .reset_index(drop=True)
+        )
+
+    def seasons(self, league: str) -> list[str]:
+        league_dir = os.path.join(self.root, f"league={league}")
+        if not os.path.exists(league_dir):
+            return []
+
+        return sorted(
+            name.removeprefix("season=")
+            for name in os.listdir(league_dir)
+            if name.startswith("season=")
+        )
+
+    def compact(self, league: str, season: str):
+        # Merge all parts of the partition into one, in the order they were written
+        partition = self._partition_dir(league, season)
+        with self._lock(partition):
+            self._recover(partition)
+            parts = self._parts(partition)
+            if len(parts) <= 1:
+                return
+
+            df = pd.concat(
+                [pd.read_parquet(os.path.join(partition, part)) for part in parts],
+                ignore_index=True,
+            )
+            # Named after the last merged part so later parts still sort after it
+            compacted = f"{parts[-1].removesuffix('.parquet')}-compacted.parquet"
+            tmp_path = os.path.join(partition, f"{compacted}.tmp")
+            df.to_parquet(tmp_path, index=False)
+
+            # The marker is written before the compacted part appears, so a
+            # crash leaves either the source parts or the marker to finish with
+            marker = {"compacted": compacted, "parts": parts}
+            marker_path = os.path.join(partition, COMPACTION_MARKER)
+            with open(f"{marker_path}.tmp", "w") as f:
+                json.dump(marker, f)
+            os.replace(f"{marker_path}.tmp", marker_path)
+            os.replace(tmp_path, os.path.join(partition, compacted))
+            self._finish_compaction(partition, marker)
+
+    def compact_async(self, league: str, season: str) -> Future:
+        return self._compactor.submit(self.compact, league, season)
+
+    def close(self):
+        # Wait for background compactions to finish
+        self._compactor.shutdown(wait=True)
+
+    def _partition_dir(self, league: str, season: str) -> str:
+        return os.path.join(self.root, f"league={league}", f"season={season}")
+
+    def _lock(self, partition: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(partition, threading.Lock())
+
+    def _recover(self, partition: str):
+        # Finishes a compaction that was interrupted after writing its marker
+        marker_path = os.path.join(partition, COMPACTION_MARKER)
+        if os.path.exists(marker_path):
+            with open(marker_path, "r") as f:
+                marker = json.load(f)
+            if os.path.exists(os.path.join(partition, marker["compacted"])):
+                self._finish_compaction(partition, marker)
+            else:
+                # The compacted part was never swapped in, the source parts are intact
+                tmp_path = os.path.join(partition, f"{marker['compacted']}.tmp")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                os.remove(marker_path)
+
+        self._recover_index(partition)
+
+    def _recover_index(self, partition: str):
+        # Every stored row has one key in the index, unless an append was
+        # interrupted after writing its part, whose keys are then missing
+        parts = [os.path.join(partition, part) for part in self._parts(partition)]
+        rows = sum(pq.read_metadata(path).num_rows for path in parts)
+        if rows == len(self._load_index(partition)):
+            return
+
+        print(f"Rebuilding the key index of {partition} from {len(parts)} parts")
+        keys = pd.concat(
+            [pd.read_parquet(path, columns=KEY) for path in parts], ignore_index=True
+        )
+        self._save_index(partition, key_hashes(keys))
+
+    def _finish_compaction(self, partition: str, marker: dict):
+        for part in marker["parts"]:
+            path = os.path.join(partition, part)
+            if os.path.exists(path):
+                os.remove(path)
+        os.remove(os.path.join(partition, COMPACTION_MARKER))
+
+    def _parts(self, partition: str) -> list[str]:
+        if not os.path.exists(partition):
+            return []
+
+        return sorted(
+            name
+            for name in os.listdir(partition)
+            if name.startswith("part-") and name.endswith(".parquet")
+        )
+
+    def _write_part(self, partition: str, df: pd.DataFrame):
+        name = f"part-{time.time_ns():020d}.parquet"
+        tmp_path = os.path.join(partition, f"{name}.tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(partition, name))
+
+    def _load_index(self, partition: str) -> np.ndarray:
+        path = os.path.join(partition, "_keys.npy")
+        if not os.path.exists(path):
+            return np.empty(0, dtype=np.uint64)
+
+        return np.load(path)
+
+    def _save_index(self, partition: str, hashes: np.ndarray):
+        # np.save appends .npy to names without it
+        tmp_path = os.path.join(partition, "_keys.tmp.npy")
+        np.save(tmp_path, hashes)
+        os.replace(tmp_path, os.path.join(partition, "_keys.npy"))
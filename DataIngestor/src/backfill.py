@@ -0,0 +1,101 @@
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from urllib.parse import urljoin
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from src.data_downloader import extract_data, get_download_cache, source_url
+
+SEASON_LINK = re.compile(r"^Season (\d{4})/(\d{4})$")
+
+
+def find_season_links(html: bytes, base_url: str) -> dict[str, str]:
+    # Every "Season YYYY/YYYY" link on the download page, oldest season first
+    soup = BeautifulSoup(html, "html.parser")
+    links = {
+        a.get_text(strip=True): urljoin(base_url, a["href"])
+        for a in soup.find_all("a", href=True)
+        if SEASON_LINK.match(a.get_text(strip=True))
+    }
+
+    return dict(sorted(links.items()))
+
+
+def merge_seasons(
+    season_dfs: dict[str, dict[str, pd.DataFrame]],
+) -> dict[str, pd.DataFrame]:
+    # Concatenate in season order so the result does not depend on completion order
+    dfs = dict()
+    for season in sorted(season_dfs):
+        for sheet_name, df in season_dfs[season].items():
+            dfs.setdefault(sheet_name, []).append(df)
+
+    return {
+        sheet_name: pd.concat(frames, ignore_index=True)
+        .sort_values("Date", kind="stable")
+        .drop_duplicates(subset=["Date", "HomeTeam", "AwayTeam"], keep="first")
+        .reset_index(drop=True)
+        for sheet_name, frames in dfs.items()
+    }
+
+
+def get_backfill_dataframes(config: dict) -> dict[str, pd.DataFrame]:
+    """
+    Downloads every season on the download page with a bounded thread pool
+    and parses the workbooks in a process pool as they arrive. Returns one
+    time ordered dataframe per sheet.
+    """
+    cache = get_download_cache(config)
+    page = cache.fetch(config["url"])
+    if page is None:
+        raise RuntimeError(f"Failed to fetch {config['url']}")
+
+    links = find_season_links(page.content, config["url"])
+    if config.get("backfill_seasons"):
+        links = dict(list(links.items())[-config["backfill_seasons"] :])
+    if len(links) == 0:
+        raise RuntimeError(f"Found no season links on {config['url']}")
+    print(f"BACKFILL: Found {len(links)} seasons, {next(iter(links))} and onwards")
+
+    season_dfs = dict()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(
+        max_workers=config["backfill_download_workers"]
+    ) as download_pool, ProcessPoolExecutor(
+        max_workers=config["backfill_parse_workers"]
+    ) as parse_pool:
+        downloads = {
+            download_pool.submit(cache.fetch, source_url(config, season, url)): season
+            for season, url in links.items()
+        }
+
+        parses = dict()
+        for future in as_completed(downloads):
+            season = downloads[future]
+            download = future.result()
+            if download is None:
+                raise RuntimeError(f"Failed to download {season}")
+
+            parse = partial(extract_data, config, download.content)
+            parses[parse_pool.submit(parse)] = season
+
+        for done, future in enumerate(as_completed(parses), start=1):
+            season = parses[future]
+            season_dfs[season] = future.result()
+
+            elapsed = time.perf_counter() - start
+            print(
+                f"BACKFILL: [{done}/{len(links)}] {season} done, {done / elapsed:.2f} seasons/s"
+            )
+
+    dfs = merge_seasons(season_dfs)
+    elapsed = time.perf_counter() - start
+    print(
+        f"BACKFILL: {len(links)} seasons in {elapsed:.1f}s ({len(links) / elapsed:.2f} seasons/s), "
+        + ", ".join(f"{sheet}: {len(df)} rows" for sheet, df in dfs.items())
+    )
+
+    return dfs
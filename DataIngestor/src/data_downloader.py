@@ -1,11 +1,14 @@
 import pandas as pd
 import os
-import requests
 
 from bs4 import BeautifulSoup
-from datetime import datetime
-from io import BytesIO
 
+from football_shared.http_client import HttpClient
+
+from src.archive import MatchArchive
+from src.download_cache import Download, DownloadCache
+from src.preprocessing import combine_date_time, fill_columns
+from src.sheet_readers import read_sheets
 from src.utils import load_config
 
 
@@ -14,11 +17,37 @@ def setup_dirs(config: dict):
     os.makedirs(config["save_dir"], exist_ok=True)
 
 
-def download_data(config: dict) -> bytes:
-    # Send a GET request to fetch the page content
-    response = requests.get(config["url"])
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.content, "html.parser")
+def get_http_client(config: dict) -> HttpClient:
+    # Every backfill download thread gets its own pooled connection
+    return HttpClient(
+        timeout=config["http_timeout_seconds"],
+        retries=config["http_retries"],
+        pool_size=config["backfill_download_workers"],
+    )
+
+
+def get_download_cache(config: dict) -> DownloadCache:
+    return DownloadCache(
+        os.path.join(config["save_dir"], "download_cache"),
+        max_bytes=config["download_cache_max_mb"] * 1024**2,
+        session=get_http_client(config),
+    )
+
+
+def source_url(config: dict, season: str, excel_url: str) -> str:
+    # The csv reader reads a zip with the csv files of the season instead
+    if config["reader"] != "csv":
+        return excel_url
+
+    start, end = season.split()[-1].split("/")
+    return config["csv_url"].format(season=f"{start[-2:]}{end[-2:]}")
+
+
+def download_data(config: dict, cache: DownloadCache) -> Download | None:
+    # Fetch the page content, revalidating any cached copy
+    page = cache.fetch(config["url"])
+    if page is not None:
+        soup = BeautifulSoup(page.content, "html.parser")
 
         # Find the <a> tag containing the text "Excel"
         excel_link = soup.find("a", string=config["file_name"])
@@ -32,15 +61,15 @@ def download_data(config: dict) -> bytes:
                 excel_url = f"https://www.football-data.co.uk/{excel_url}"
 
             # Download the Excel file
-            file_response = requests.get(excel_url)
-            if file_response.status_code == 200:
-                return file_response.content
+            download = cache.fetch(source_url(config, config["file_name"], excel_url))
+            if download is not None:
+                return download
             else:
                 print("Failed to download the Excel file.")
         else:
             print("Could not find the 'Excel' link on the page.")
     else:
-        print(f"Failed to fetch the webpage. Status code: {response.status_code}")
+        print("Failed to fetch the webpage.")
 
 
 def extract_data(
@@ -51,46 +80,36 @@ def extract_data(
 
     if save_to_file:
         setup_dirs(config)
+        archive = get_archive(config)
+
+    # Read the specified sheets, only parsing the data if it is not cached
+    sheets = read_sheets(config, data)
+    for sheet_name in config["sheets_mapping"]:
+        if sheet_name in sheets:
+            df: pd.DataFrame = sheets[sheet_name]
+
+            # Fill missing Odds values and add kick-off times to the dates
+            df = fill_columns(df, config["fill_columns"])
+            if "Date" in df.columns:
+                df = combine_date_time(df)
+
+            # Save or merge
+            if save_to_file:
+                df = save_to_archive(archive, df, sheet_name)
+
+            dfs[sheet_name] = df
+
+            # Check if there are missing values in interesting cols
+            cols = [col for col in config["features"] if col in df.columns]
+            with_na = df[cols].columns[df[cols].isna().any()].tolist()
+            with_na += [col for col in config["features"] if col not in cols]
+            if len(with_na) > 0:
+                columns_with_na.append((with_na, config["sheets_mapping"][sheet_name]))
+        else:
+            print(f"Sheet '{sheet_name}' not found in the Excel file.")
 
-    # Read the Excel file and load specified sheets
-    with pd.ExcelFile(BytesIO(data)) as excel_file:
-        for sheet_name in config["sheets_mapping"]:
-            if sheet_name in excel_file.sheet_names:
-                df: pd.DataFrame = excel_file.parse(sheet_name)
-
-                # Fill missing Odds values
-                for target_col, source_col in config["fill_columns"].items():
-                    if target_col in df.columns and source_col in df.columns:
-                        df[target_col] = df[target_col].fillna(df[source_col])
-                        # print(
-                        #    f"Filled missing values in '{target_col}' with values from '{source_col}'."
-                        # )
-
-                # Convert to date
-                if "Date" in df.columns:
-                    df["Date"] = pd.to_datetime(
-                        df["Date"].dt.date.combine(
-                            df["Time"], lambda x, y: datetime.combine(x, y)
-                        ),
-                        errors="coerce",
-                    )
-                    df.drop(columns=["Time"], inplace=True)
-
-                # Save or merge
-                if save_to_file:
-                    df = save_or_concat_data(config, df, sheet_name)
-
-                dfs[sheet_name] = df
-
-                # Check if there are missing values in interesting cols
-                cols = config["features"]
-                with_na = df[cols].columns[df[cols].isna().any()].tolist()
-                if len(with_na) > 0:
-                    columns_with_na.append(
-                        (with_na, config["sheets_mapping"][sheet_name])
-                    )
-            else:
-                print(f"Sheet '{sheet_name}' not found in the Excel file.")
+    if save_to_file:
+        archive.close()
 
     for cwn, sheet in columns_with_na:
         print(f"Columns with NaN values: {cwn} in {sheet}")
@@ -98,42 +117,37 @@ def extract_data(
     return dfs
 
 
-def save_or_concat_data(config: dict, df: pd.DataFrame, sheet_name: str):
-    # Save the concatenated DataFrame to a new Excel file
-    concat_file_path = os.path.join(
-        config["save_dir"],
-        f"{config['sheets_mapping'][sheet_name]}.xlsx",
+def get_archive(config: dict) -> MatchArchive:
+    return MatchArchive(
+        os.path.join(config["save_dir"], "archive"),
+        compact_after_parts=config["archive_compact_parts"],
     )
 
-    num_rows_merged = None
-    file_exists = os.path.exists(concat_file_path)
-    if file_exists:
-        main_df = pd.read_excel(concat_file_path)
-        main_df["Date"] = pd.to_datetime(main_df["Date"])
-
-        df = (
-            pd.concat([main_df, df], ignore_index=True)
-            .drop_duplicates(subset=["Date", "HomeTeam", "AwayTeam"], keep="first")
-            .sort_values("Date", ignore_index=True)
-        )
-        num_rows_merged = len(df) - len(main_df)
-
-    df.to_excel(concat_file_path, index=False)
-    print(
-        f"Sheet {sheet_name} {f'merged {num_rows_merged} rows' if file_exists else 'saved'} to: {concat_file_path}"
-    )
 
-    return df
+def save_to_archive(archive: MatchArchive, df: pd.DataFrame, sheet_name: str):
+    # Append the new rows and return the merged history of the sheet
+    num_rows_merged = archive.append(sheet_name, df)
+    print(f"Sheet {sheet_name} merged {num_rows_merged} rows to: {archive.root}")
+
+    return archive.read(sheet_name)
 
 
 def get_dataframes(config) -> dict[str, pd.DataFrame]:
-    data = download_data(config)
-    dfs = extract_data(config, data, save_to_file=False)
+    # No leagues when the workbook could not be downloaded, the client already retried
+    download = download_data(config, get_download_cache(config))
+    if download is None:
+        print("No workbook downloaded, skipping all leagues")
+        return dict()
+
+    dfs = extract_data(config, download.content, save_to_file=False)
 
     return dfs
 
 
 if __name__ == "__main__":
     config = load_config("config.yaml")
-    data = download_data(config)
-    extract_data(config, data, save_to_file=True)
+    download = download_data(config, get_download_cache(config))
+    if download is None:
+        raise SystemExit(f"Failed to download the workbook from {config['url']}")
+
+    extract_data(config, download.content, save_to_file=True)
@@ -1,16 +1,32 @@
+import hashlib
 import hopsworks
+import json
 import os
 import pandas as pd
-from hsfs.feature_group import FeatureGroup
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from hsfs.feature_store import FeatureStore
 
-from src.data_downloader import get_dataframes
-from src.utils import load_config
+from football_shared import local_store
+from src.backfill import get_backfill_dataframes
+from src.data_downloader import download_data, extract_data, get_download_cache
+from src.delta import filter_new_rows, read_stored_keys
+from src.lag_state import LagState, lag_state_path
+from src.lags import (
+    create_window_lag_df,
+    current_form_feature_group_name,
+    lags_feature_group_name,
+)
+from src.preprocessing import preprocess, to_feature_store_dtypes
+from src.utils import load_config, store_backend
+from src.writer import FeatureGroupWriter
+
+
+def login(project="ID2223_Project") -> tuple[hopsworks.project.Project, FeatureStore]:
+    if store_backend() == "local":
+        project = local_store.login()
+        return project, project.get_feature_store()
 
-
-def login(
-    project="ID2223_Project",
-) -> tuple[hopsworks.project.Project, FeatureStore]:
     project = hopsworks.login(
         api_key_value=os.environ["HOPSWORKS_API_KEY"],
         project=project,
@@ -20,201 +36,265 @@ def login(
     return project, fs
 
 
-def set_feature_descriptions(fg: FeatureGroup):
-    # Update feature descriptions
-    feature_descriptions = [
-        {"name": "datetime", "description": "Match datetime"},
-        {"name": "HomeTeam", "description": "Home Team"},
-        {"name": "AwayTeam", "description": "Away Team"},
-        {"name": "FTHG", "description": "Full Time Home Team Goals"},
-        {"name": "FTAG", "description": "Full Time Away Team Goals"},
-        {
-            "name": "FTR",
-            "description": "Full Time Result (H=Home Win, D=Draw, A=Away Win)",
-        },
-        {"name": "HTHG", "description": "Half Time Home Team Goals"},
-        {"name": "HTAG", "description": "Half Time Away Team Goals"},
-        {
-            "name": "HTR",
-            "description": "Half Time Result (H=Home Win, D=Draw, A=Away Win)",
-        },
-        {"name": "homeshots", "description": "Home Team Shots"},
-        {"name": "awayshots", "description": "Away Team Shots"},
-        {"name": "HST", "description": "Home Team Shots on Target"},
-        {"name": "AST", "description": "Away Team Shots on Target"},
-        {"name": "AvgH", "description": "Market average home win odds"},
-        {"name": "AvgD", "description": "Market average draw win odds"},
-        {"name": "AvgA", "description": "Market average away win odds"},
-        {"name": "Avg_gt_2_5", "description": "Market average over 2.5 goals"},
-        {"name": "Avg_lt_2_5", "description": "Market average under 2.5 goals"},
-        {
-            "name": "league_over_percentage",
-            "description": "Percentage of games that were over 2.5 goals",
-        },
-        {
-            "name": "league_under_percentage",
-            "description": "Percentage of games that were under 2.5 goals",
-        },
-        {"name": "ftour", "description": "Full time over/under result"},
-    ]
-
-    for desc in feature_descriptions:
-        fg.update_feature_description(desc["name"].lower(), desc["description"])
-
-
-def set_lag_feature_descriptions(fg: FeatureGroup):
-    # Update feature descriptions
-    feature_descriptions = [
-        {"name": "datetime", "description": "Match datetime"},
-        {"name": "HomeTeam", "description": "Home Team"},
-        {"name": "AwayTeam", "description": "Away Team"},
-    ]
-
-    for desc in feature_descriptions:
-        fg.update_feature_description(desc["name"].lower(), desc["description"])
-
-
-def create_league_percentages(df: pd.DataFrame):
-    # Calculate league percentage for Over/Under 2.5 goals
-    df["total_goals"] = df["fthg"] + df["ftag"]
-    df.insert(7, "ftour", df["total_goals"].apply(lambda x: "O" if x > 2.5 else "U"))
-
-    df["cum_o"] = (df["ftour"] == "O").cumsum()
-    df["cum_u"] = (df["ftour"] == "U").cumsum()
-
-    # Calculate total games played up to each row (excluding the current row)
-    df["total_games"] = df.index
-
-    # Shift cumulative counts by 1 to exclude the current row's result
-    df[["cum_o", "cum_u"]] = df[["cum_o", "cum_u"]].shift(1)
-
-    # Fill NaNs with 0 for the first row
-    df[["cum_o", "cum_u", "total_games"]] = df[
-        ["cum_o", "cum_u", "total_games"]
-    ].fillna(0)
-
-    # Calculate global win/draw/loss percentages
-    df["league_over_percentage"] = (df["cum_o"] / df["total_games"]).fillna(0)
-    df["league_under_percentage"] = (df["cum_u"] / df["total_games"]).fillna(0)
-
-    df.drop(columns=["total_goals", "cum_o", "cum_u", "total_games"], inplace=True)
-
-    return df
-
-
-def create_lag_df(df: pd.DataFrame, window_size):
-    df_lags = df[["datetime", "hometeam", "awayteam"]].copy()
-
-    # Goal lag features
-    # Create lag features using rolling window
-    def get_lag_features(series, window_size):
-        return pd.Series(
-            series.shift().rolling(window=window_size, min_periods=1)
-        ).apply(lambda x: list(x.dropna()))
-
-    # Apply the function
-    homeshot_lags = df.groupby("hometeam")["homeshots"].apply(
-        lambda x: get_lag_features(x, window_size)
-    )
-    awayshot_lags = df.groupby("awayteam")["awayshots"].apply(
-        lambda x: get_lag_features(x, window_size)
-    )
-
-    fulltime_home_goals_lags = df.groupby("hometeam")["fthg"].apply(
-        lambda x: get_lag_features(x, window_size)
-    )
-    fulltime_away_goals_lags = df.groupby("awayteam")["ftag"].apply(
-        lambda x: get_lag_features(x, window_size)
-    )
-
-    halftime_home_goals_lags = df.groupby("hometeam")["hthg"].apply(
-        lambda x: get_lag_features(x, window_size)
-    )
-    halftime_away_goals_lags = df.groupby("awayteam")["htag"].apply(
-        lambda x: get_lag_features(x, window_size)
-    )
-
-    homeshots_target_lags = df.groupby("hometeam")["hst"].apply(
-        lambda x: get_lag_features(x, window_size)
-    )
-    awayshots_target_lags = df.groupby("awayteam")["ast"].apply(
-        lambda x: get_lag_features(x, window_size)
+# Feature descriptions, set once when a feature group is created
+FEATURE_DESCRIPTIONS = [
+    {"name": "datetime", "description": "Match datetime"},
+    {"name": "HomeTeam", "description": "Home Team"},
+    {"name": "AwayTeam", "description": "Away Team"},
+    {"name": "FTHG", "description": "Full Time Home Team Goals"},
+    {"name": "FTAG", "description": "Full Time Away Team Goals"},
+    {
+        "name": "FTR",
+        "description": "Full Time Result (H=Home Win, D=Draw, A=Away Win)",
+    },
+    {"name": "HTHG", "description": "Half Time Home Team Goals"},
+    {"name": "HTAG", "description": "Half Time Away Team Goals"},
+    {
+        "name": "HTR",
+        "description": "Half Time Result (H=Home Win, D=Draw, A=Away Win)",
+    },
+    {"name": "homeshots", "description": "Home Team Shots"},
+    {"name": "awayshots", "description": "Away Team Shots"},
+    {"name": "HST", "description": "Home Team Shots on Target"},
+    {"name": "AST", "description": "Away Team Shots on Target"},
+    {"name": "AvgH", "description": "Market average home win odds"},
+    {"name": "AvgD", "description": "Market average draw win odds"},
+    {"name": "AvgA", "description": "Market average away win odds"},
+    {"name": "Avg_gt_2_5", "description": "Market average over 2.5 goals"},
+    {"name": "Avg_lt_2_5", "description": "Market average under 2.5 goals"},
+    {
+        "name": "league_over_percentage",
+        "description": "Percentage of games that were over 2.5 goals",
+    },
+    {
+        "name": "league_under_percentage",
+        "description": "Percentage of games that were under 2.5 goals",
+    },
+    {"name": "ftour", "description": "Full time over/under result"},
+]
+LAG_FEATURE_DESCRIPTIONS = [
+    {"name": "datetime", "description": "Match datetime"},
+    {"name": "HomeTeam", "description": "Home Team"},
+    {"name": "AwayTeam", "description": "Away Team"},
+]
+
+
+def descriptions_by_name(feature_descriptions: list[dict]) -> dict[str, str]:
+    return {desc["name"].lower(): desc["description"] for desc in feature_descriptions}
+
+
+def lag_settings(config: dict) -> tuple[list[int], list[str]]:
+    # lag_window used to be a single window size
+    windows = config.get("lag_windows") or [config["lag_window"]]
+    return sorted(windows), config.get("lag_aggregates") or []
+
+
+def can_update_lags(
+    state: LagState | None,
+    df: pd.DataFrame,
+    windows: list[int],
+    aggregates: list[str],
+):
+    return lag_state_mismatch(state, df, windows, aggregates) is None
+
+
+def lag_state_mismatch(
+    state: LagState | None,
+    df: pd.DataFrame,
+    windows: list[int],
+    aggregates: list[str],
+) -> str | None:
+    # Why the lags can not be updated from the state, None if they can
+    if state is None:
+        return "there is no lag state, it was discarded or a full rebuild was requested"
+    if state.windows != windows or state.aggregates != aggregates:
+        return (
+            f"the state has windows {state.windows} and aggregates {state.aggregates}"
+        )
+    inconsistency = state.inconsistency(df)
+    if inconsistency:
+        return f"the state does not match the data, {inconsistency}"
+    return None
+
+
+def create_lags(
+    league: str,
+    df: pd.DataFrame,
+    windows: list[int],
+    aggregates: list[str],
+    state: LagState | None,
+) -> tuple[pd.DataFrame, LagState]:
+    # Only compute lags for the new rows if the state matches the data
+    mismatch = lag_state_mismatch(state, df, windows, aggregates)
+    if mismatch is None:
+        new_rows = df[state.new_rows_mask(df)]
+        print(f"LAGS [{league}]: Updating lag state with {len(new_rows)} new rows")
+        return state.update(new_rows), state
+
+    # Always create all lag columns so the feature group schema does not depend
+    # on how many matches the teams had played at the first run
+    print(f"LAGS [{league}]: Rebuilding lags for all {len(df)} rows, {mismatch}")
+    df_lags = create_window_lag_df(df, windows, aggregates)
+    return df_lags, LagState.from_frame(df, windows, aggregates)
+
+
+def ingest(fs: FeatureStore, config: dict, backfill: bool = False):
+    if backfill:
+        # Ingest the history of every season at once
+        dfs = get_backfill_dataframes(config)
+        ingest_leagues(fs, config, dfs)
+        return
+
+    # Download the workbook and skip it if it was already ingested with these settings
+    cache = get_download_cache(config)
+    download = download_data(config, cache)
+    if download is None:
+        raise RuntimeError(f"Failed to download the workbook from {config['url']}")
+
+    settings = ingest_settings_hash(config)
+    if download.consumed_settings == settings and is_ingest_complete(fs, config):
+        print("DATA: Workbook and settings unchanged since the last ingest, skipping!")
+        return
+
+    # Parse the workbook once for all leagues
+    dfs = extract_data(config, download.content)
+    ingest_leagues(fs, config, dfs)
+
+    # Only mark the workbook as ingested once its rows are in the feature store
+    cache.mark_consumed(download, settings)
+
+
+# Settings that change what an ingest of the same workbook writes
+INGEST_SETTINGS = [
+    "url",
+    "file_name",
+    "reader",
+    "csv_url",
+    "sheets_mapping",
+    "fill_columns",
+    "leagues",
+    "lag_window",
+    "lag_windows",
+    "lag_aggregates",
+    "current_form_online",
+    "features",
+]
+
+
+def ingest_settings_hash(config: dict) -> str:
+    settings = {key: config.get(key) for key in INGEST_SETTINGS}
+    return hashlib.sha256(
+        json.dumps(settings, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def is_ingest_complete(fs: FeatureStore, config: dict) -> bool:
+    """
+    False if an ingest of an unchanged workbook still has work to do: a full
+    lag rebuild was requested, or a lag state or feature group of a league
+    is missing, e.g. because it was deleted.
+    """
+    if config.get("full_lag_rebuild", False):
+        print("DATA: Full lag rebuild requested, ingesting the unchanged workbook")
+        return False
+
+    windows, aggregates = lag_settings(config)
+    for league in config["leagues"]:
+        if not os.path.exists(
+            lag_state_path(config["save_dir"], league, windows, aggregates)
+        ):
+            print(f"DATA [{league}]: No lag state, ingesting the unchanged workbook")
+            return False
+
+        for name in [
+            f"football_{league.lower()}",
+            lags_feature_group_name(league, windows, aggregates),
+            current_form_feature_group_name(league, windows, aggregates),
+        ]:
+            if not feature_group_exists(fs, name):
+                print(f"DATA [{league}]: No {name}, ingesting the unchanged workbook")
+                return False
+
+    return True
+
+
+def ingest_leagues(fs: FeatureStore, config: dict, dfs: dict[str, pd.DataFrame]):
+    """
+    Ingests every league in `config["leagues"]` in parallel. A failing league
+    does not stop the others, but an error is raised once all are done.
+    """
+    leagues = config["leagues"]
+
+    # Inserts of all leagues share one writer so they overlap with each other
+    writer = FeatureGroupWriter(
+        max_workers=config["write_workers"],
+        chunk_rows=config["insert_chunk_rows"],
+        wait_for_job=config["wait_for_materialization"],
     )
 
-    home_lags = [
-        ("hs_lags", homeshot_lags),
-        ("fthg_lags", fulltime_home_goals_lags),
-        ("hthg_lags", halftime_home_goals_lags),
-        ("hst_lags", homeshots_target_lags),
-    ]
-    away_lags = [
-        ("as_lags", awayshot_lags),
-        ("ftag_lags", fulltime_away_goals_lags),
-        ("htag_lags", halftime_away_goals_lags),
-        ("ast_lags", awayshots_target_lags),
-    ]
-
-    for side, lags in [("hometeam", home_lags), ("awayteam", away_lags)]:
-        for name, data in lags:
-            for team in df_lags[side].unique():
-                team_data = data[team]
-                team_data.index = df_lags.loc[df_lags[side] == team].index
-                df_lags.loc[df_lags[side] == team, name] = team_data
-
-    df_lags = expand_lags(df_lags)
-
-    return df_lags
-
-
-def expand_lags(df: pd.DataFrame):
-    # Identify columns with lists
-    lag_columns = [col for col in df.columns if col.endswith("_lags")]
-
-    # Expand list columns into separate columns
-    for col in lag_columns:
-        expanded_cols = pd.DataFrame(df[col].tolist(), index=df.index)
-        expanded_cols.columns = [f"{col}_{i+1}" for i in expanded_cols.columns]
-        df = pd.concat([df.drop(columns=[col]), expanded_cols], axis=1)
-
-    return df
-
-
-def format_df(df: pd.DataFrame):
-    df.columns = (
-        df.columns.str.lower()
-        .str.replace("<", "_lt_")
-        .str.replace(">", "_gt_")
-        .str.replace(".", "_")
-    )  # Rename incompatible columns names for Hopsworks
-    df.rename(
-        columns={"date": "datetime", "as": "awayshots", "hs": "homeshots"},
-        inplace=True,
-    )  # Rename as to awayshot because as causes hopsworks to not upload data...
-    df.reset_index(inplace=True, drop=True)
-
-    return df
-
-
-def ingest(fs: FeatureStore, config: dict):
+    def timed_ingest(league):
+        start = time.perf_counter()
+        data_rows, lag_rows = ingest_league(fs, config, league, dfs[league], writer)
+        return time.perf_counter() - start, data_rows, lag_rows
+
+    failures = dict()
+    with ThreadPoolExecutor(max_workers=config["league_workers"]) as pool:
+        futures = {pool.submit(timed_ingest, league): league for league in leagues}
+        for future in as_completed(futures):
+            league = futures[future]
+            try:
+                elapsed, data_rows, lag_rows = future.result()
+                print(
+                    f"INGEST [{league}]: Done in {elapsed:.1f}s, inserted {data_rows} data rows and {lag_rows} lag rows"
+                )
+            except Exception as e:
+                failures[league] = e
+                print(f"INGEST [{league}]: Failed with {e!r}")
+
+    writer.close()
+    writer.report()
+
+    if failures:
+        league, error = next(iter(failures.items()))
+        raise RuntimeError(f"Ingest failed for leagues {sorted(failures)}") from error
+
+
+def ingest_league(
+    fs: FeatureStore,
+    config: dict,
+    league: str,
+    df: pd.DataFrame,
+    writer: FeatureGroupWriter,
+) -> tuple[int, int]:
+    # Returns the number of data and lag rows inserted
     feature_descriptions_set = True
     lags_feature_descriptions_set = True
     features = config["features"]
-    league = config["league"]
-    window_size = config["lag_window"]
+    windows, aggregates = lag_settings(config)
+    dataset_rows = len(df)
 
-    # Get the dataframe for the specified league in config
-    dfs = get_dataframes(config)
-    df = dfs[league]
-    df = df[features].copy()
+    # Format df and calculate league percentages
+    df = preprocess(df, features)
 
-    # Format df
-    df = format_df(df)
-
-    # Calculate leage p
-    df = create_league_percentages(df)
-
-    # Create lags
-    df_lags = create_lag_df(df, window_size)
+    # Load the lag state of the previous run unless a full rebuild is requested
+    lag_state_file = lag_state_path(config["save_dir"], league, windows, aggregates)
+    lag_state = (
+        None if config.get("full_lag_rebuild", False) else LagState.load(lag_state_file)
+    )
+    lags_fg = get_lags_feature_group(fs, league, windows, aggregates)
+
+    # The last run did not wait for its lag rows to be materialized, so check
+    # they arrived before the state is trusted
+    if lag_state is not None and lag_state.unverified_since is not None:
+        missing = missing_lag_rows(lags_fg, lag_state, df)
+        if missing:
+            print(
+                f"LAGS [{league}]: {missing} lag rows of the last run are missing from the feature store, discarding the lag state"
+            )
+            lag_state = None
+        else:
+            lag_state.unverified_since = None
+            lag_state.save(lag_state_file)
 
     ## Insert data
     # Get or create the 'football' feature group
@@ -227,63 +307,166 @@ def ingest(fs: FeatureStore, config: dict):
         online_enabled=False,
     )
 
-    # Try read data in the feature group in order to filter out data we already have
+    # Read the keys stored since the first row in order to filter out data we already have
     try:
-        read_df = fg.select_all().read()
-        df = df[~df.isin(read_df).all(axis=1)].copy()
+        stored_keys = read_stored_keys(fg, df["datetime"].min())
+        df_new = filter_new_rows(df, stored_keys)
     except Exception:
         # If it fails it does not exist so set the descs
-        read_df = []
+        stored_keys = []
+        df_new = df
         feature_descriptions_set = False
 
-    if len(df) > 0:
+    # The insert runs in the background while the lags are computed
+    data_write = None
+    if len(df_new) > 0:
         print(
-            f"DATA: Inserting {len(df)} rows, dataset contains {len(dfs[league])} and featurestore already had {len(read_df)} rows"
+            f"DATA [{league}]: Inserting {len(df_new)} rows, dataset contains {dataset_rows} and featurestore already had {len(stored_keys)} of its rows"
+        )
+        data_write = writer.submit(
+            fg.name,
+            fg,
+            to_feature_store_dtypes(df_new),
+            descriptions=(
+                None
+                if feature_descriptions_set
+                else descriptions_by_name(FEATURE_DESCRIPTIONS)
+            ),
         )
-        fg.insert(df)
     else:
-        print("DATA: Featurestore already contains all data!")
-
-    if not feature_descriptions_set:
-        set_feature_descriptions(fg)
+        print(f"DATA [{league}]: Featurestore already contains all data!")
 
     ## Insert lags
-    # Get or create the 'football' feature group
-    lags_fg = fs.get_or_create_feature_group(
-        name=f"football_{league.lower()}_lags_{window_size}",
-        version=1,
-        description=f"Lags for historical football data for league {league} with window size {window_size}",
-        primary_key=["datetime", "hometeam", "awayteam"],
-        event_time="datetime",
-        online_enabled=False,
-    )
+    # The rows of the state are in the lags feature group, so if it has no
+    # new rows the lags feature group is already up to date
+    if (
+        can_update_lags(lag_state, df, windows, aggregates)
+        and not lag_state.new_rows_mask(df).any()
+    ):
+        print(f"LAGS [{league}]: Featurestore already contains all data!")
+        # The form did not change either, unless its table is missing
+        if not feature_group_exists(
+            fs, current_form_feature_group_name(league, windows, aggregates)
+        ):
+            write_current_form(fs, config, league, lag_state, writer).result()
+        return data_write.result() if data_write else 0, 0
 
-    # Try read data in the feature group in order to filter out data we already have
+    # Create lags
     try:
-        lags_read_df = lags_fg.select_all().read()
-        df_lags = df_lags[~df_lags.isin(lags_read_df).all(axis=1)].copy()
+        stored_keys = read_stored_keys(lags_fg, df["datetime"].min())
     except Exception:
-        # If it fails it does not exist so set the descs
-        lags_read_df = []
+        # If it fails it does not exist so set the descs and build all lags
+        stored_keys = []
         lags_feature_descriptions_set = False
+        lag_state = None
+
+    df_lags, lag_state = create_lags(league, df, windows, aggregates, lag_state)
+    # Only the teams that played in the consumed rows have a new form
+    form_write = write_current_form(fs, config, league, lag_state, writer, df_lags)
+    df_lags = filter_new_rows(df_lags, stored_keys)
 
+    lags_write = None
     if len(df_lags):
         print(
-            f"LAGS: Inserting {len(df_lags)} rows, dataset contains {len(dfs[league])} and featurestore already had {len(lags_read_df)} rows"
+            f"LAGS [{league}]: Inserting {len(df_lags)} rows, dataset contains {dataset_rows} and featurestore already had {len(stored_keys)} of its rows"
+        )
+        lags_write = writer.submit(
+            lags_fg.name,
+            lags_fg,
+            df_lags,
+            descriptions=(
+                None
+                if lags_feature_descriptions_set
+                else descriptions_by_name(LAG_FEATURE_DESCRIPTIONS)
+            ),
         )
-        lags_fg.insert(df_lags)
     else:
-        print("LAGS: Featurestore already contains all data!")
+        print(f"LAGS [{league}]: Featurestore already contains all data!")
+
+    # Wait for all writes, and only persist the state once its rows are
+    # uploaded. Unless the writer waited for the materialization job, the
+    # next run checks that they were materialized.
+    data_rows = data_write.result() if data_write else 0
+    lag_rows = lags_write.result() if lags_write else 0
+    form_write.result()
+    if lag_rows and not writer.wait_for_job:
+        lag_state.unverified_since = df_lags["datetime"].min()
+    lag_state.save(lag_state_file)
+
+    return data_rows, lag_rows
+
+
+def feature_group_exists(fs: FeatureStore, name: str) -> bool:
+    try:
+        return fs.get_feature_group(name=name, version=1) is not None
+    except Exception:
+        return False
+
+
+def get_lags_feature_group(
+    fs: FeatureStore, league: str, windows: list[int], aggregates: list[str]
+):
+    return fs.get_or_create_feature_group(
+        name=lags_feature_group_name(league, windows, aggregates),
+        version=1,
+        description=f"Lags for historical football data for league {league} with window sizes {windows}",
+        primary_key=["datetime", "hometeam", "awayteam"],
+        event_time="datetime",
+        online_enabled=False,
+    )
+
+
+def missing_lag_rows(lags_fg, state: LagState, df: pd.DataFrame) -> int:
+    """
+    The number of rows from `state.unverified_since` on that the state
+    consumed but the lags feature group does not have, e.g. because the
+    materialization job of the run that inserted them failed.
+    """
+    since = state.unverified_since
+    consumed = df[~state.new_rows_mask(df) & (df["datetime"] >= since)]
+    try:
+        stored_keys = read_stored_keys(lags_fg, since)
+    except Exception:
+        # The feature group does not exist (anymore)
+        return len(consumed)
+    return len(filter_new_rows(consumed, stored_keys))
+
+
+def write_current_form(
+    fs: FeatureStore,
+    config: dict,
+    league: str,
+    lag_state: LagState,
+    writer: FeatureGroupWriter,
+    matches: pd.DataFrame = None,
+) -> Future:
+    """
+    Upserts the latest lags of the teams and sides of the league, so the
+    predictor looks up the rows of the teams playing instead of reading
+    their whole lag history. With `matches` only the teams that played in
+    them are upserted, the form of the others did not change.
+    """
+    windows, aggregates = lag_settings(config)
+    form_fg = fs.get_or_create_feature_group(
+        name=current_form_feature_group_name(league, windows, aggregates),
+        version=1,
+        description=f"Latest lags of every team in league {league} with window sizes {windows}",
+        primary_key=["league", "team", "side"],
+        event_time="datetime",
+        online_enabled=config.get("current_form_online", False),
+    )
 
-    if not lags_feature_descriptions_set:
-        set_lag_feature_descriptions(lags_fg)
+    form = lag_state.current_form(league, matches)
+    print(f"FORM [{league}]: Upserting the form of {len(form)} teams and sides")
+    return writer.submit(form_fg.name, form_fg, form)
 
 
-def run(config_path):
+def run(config_path, backfill=False):
     config = load_config(config_path)
     project, fs = login()
-    ingest(fs, config)
-    hopsworks.logout()
+    ingest(fs, config, backfill=backfill)
+    if store_backend() == "hopsworks":
+        hopsworks.logout()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from hsfs.feature_group import FeatureGroup
+
+PRIMARY_KEY = ["datetime", "hometeam", "awayteam"]
+
+
+def _utc_naive(datetimes: pd.Series) -> pd.Series:
+    # The feature store may return tz-aware event times in another unit, the
+    # workbook does not, and the key hashes differ between units
+    return pd.to_datetime(datetimes, utc=True).dt.tz_localize(None).dt.as_unit("ns")
+
+
+def key_hashes(df: pd.DataFrame) -> np.ndarray:
+    keys = df[PRIMARY_KEY].copy()
+    keys["datetime"] = _utc_naive(keys["datetime"])
+
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def read_stored_keys(fg: FeatureGroup, since: pd.Timestamp) -> pd.DataFrame:
+    # Only read the primary key of rows from the day of `since` and onwards
+    return (
+        fg.select(PRIMARY_KEY).filter(fg.datetime >= since.strftime("%Y-%m-%d")).read()
+    )
+
+
+def filter_new_rows(df: pd.DataFrame, stored_keys: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keeps the rows of `df` that are newer than the latest stored event time
+    or whose primary key is not among `stored_keys`.
+    """
+    if len(stored_keys) == 0:
+        return df
+
+    watermark = _utc_naive(stored_keys["datetime"]).max()
+    newer = (_utc_naive(df["datetime"]) > watermark).to_numpy()
+    missing = ~np.isin(key_hashes(df), key_hashes(stored_keys))
+
+    return df[newer | missing]
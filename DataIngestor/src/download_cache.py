@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from football_shared.http_client import HttpClient
+
+
+@dataclass
+class Download:
+    url: str
+    content: bytes
+    sha256: str
+    # Settings this content was consumed with by a previous run, None if it was not
+    consumed_settings: str | None
+
+
+class DownloadCache:
+    """
+    On-disk cache of downloads keyed by URL. Responses are stored by content
+    hash and revalidated with conditional requests (ETag/Last-Modified). The
+    least recently used entries are evicted once the cache exceeds
+    `max_bytes`. Safe to share between threads.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, session: HttpClient = None):
+        self.cache_dir = cache_dir
+        self.blobs_dir = os.path.join(cache_dir, "blobs")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.max_bytes = max_bytes
+        self.session = session or HttpClient()
+        self._lock = threading.Lock()
+
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def fetch(self, url: str) -> Download | None:
+        with self._lock:
+            entry = dict(self.index.get(url, {}))
+        has_blob = "sha256" in entry and os.path.exists(
+            self._blob_path(entry["sha256"])
+        )
+
+        headers = dict()
+        if has_blob:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 304 and has_blob:
+            with open(self._blob_path(entry["sha256"]), "rb") as f:
+                content = f.read()
+            sha256 = entry["sha256"]
+        elif response.status_code == 200:
+            content = response.content
+            sha256 = hashlib.sha256(content).hexdigest()
+            self._write_blob(sha256, content)
+            entry.update(
+                {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "sha256": sha256,
+                    "size": len(content),
+                }
+            )
+        else:
+            print(f"Failed to fetch {url}. Status code: {response.status_code}")
+            return None
+
+        entry["accessed"] = time.time()
+        with self._lock:
+            self.index[url] = entry
+            self._evict(keep=url)
+            self._save_index()
+
+        return Download(
+            url=url,
+            content=content,
+            sha256=sha256,
+            consumed_settings=(
+                entry.get("consumed_settings")
+                if entry.get("consumed") == sha256
+                else None
+            ),
+        )
+
+    def mark_consumed(self, download: Download, settings: str):
+        # Later fetches of the same content report the settings it was consumed with
+        with self._lock:
+            if download.url in self.index:
+                self.index[download.url]["consumed"] = download.sha256
+                self.index[download.url]["consumed_settings"] = settings
+                self._save_index()
+
+    def _evict(self, keep: str):
+        def total_size():
+            blobs = {
+                e["sha256"]: e["size"] for e in self.index.values() if "sha256" in e
+            }
+            return sum(blobs.values())
+
+        by_access = sorted(
+            self.index, key=lambda url: self.index[url].get("accessed", 0)
+        )
+        for url in by_access:
+            if total_size() <= self.max_bytes:
+                break
+            if url == keep:
+                continue
+
+            sha256 = self.index.pop(url).get("sha256")
+            still_used = any(e.get("sha256") == sha256 for e in self.index.values())
+            if sha256 and not still_used and os.path.exists(self._blob_path(sha256)):
+                os.remove(self._blob_path(sha256))
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blobs_dir, sha256)
+
+    def _write_blob(self, sha256: str, content: bytes):
+        path = self._blob_path(sha256)
+        if os.path.exists(path):
+            return
+
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _load_index(self) -> dict:
+        if not os.path.exists(self.index_path):
+            return dict()
+
+        with open(self.index_path, "r") as f:
+            return json.load(f)
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,274 @@
+import json
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.lags import LAG_SIDES, lag_columns, lags_feature_group_name, window_features
+
+
+def lag_state_path(
+    save_dir: str, league: str, windows: list[int], aggregates: list[str] = ()
+) -> str:
+    # Versioned by windows and aggregates like the lags feature group
+    return os.path.join(
+        save_dir,
+        "lag_state",
+        f"{lags_feature_group_name(league, windows, aggregates)}.json",
+    )
+
+
+class LagState:
+    """
+    Ring buffers with the last `max(windows)` home (and away) matches of every
+    team, plus a watermark and the number of rows per day that have been
+    consumed. Updating the state with new matches yields the same lag rows as
+    `create_window_lag_df` would for them, but only touches the new rows.
+    `unverified_since` is the first event time of the lag rows the last run
+    inserted without waiting for them to be materialized.
+    """
+
+    def __init__(
+        self,
+        windows: list[int],
+        aggregates: list[str] = (),
+        buffers: dict[str, dict[str, deque]] = None,
+        rows: int = 0,
+        watermark: pd.Timestamp = None,
+        watermark_keys: set[tuple[str, str]] = None,
+        day_rows: dict[str, int] = None,
+        unverified_since: pd.Timestamp = None,
+    ):
+        self.windows = sorted(windows)
+        self.aggregates = list(aggregates)
+        self.window_size = self.windows[-1]
+        self.buffers = buffers or {side: dict() for side, _ in LAG_SIDES}
+        self.rows = rows
+        self.watermark = watermark
+        self.watermark_keys = watermark_keys or set()
+        self.day_rows = day_rows or dict()
+        self.unverified_since = unverified_since
+
+    @classmethod
+    def from_frame(
+        cls, df: pd.DataFrame, windows: list[int], aggregates: list[str] = ()
+    ) -> "LagState":
+        state = cls(windows, aggregates)
+        for side, features in LAG_SIDES:
+            tail = df.groupby(side, sort=False).tail(state.window_size)
+            values = tail[list(features.values())].to_numpy(dtype=np.float64)
+            for team, row in zip(tail[side], values.tolist()):
+                state._buffer(side, team).append(row)
+
+        state._advance(df)
+        return state
+
+    @classmethod
+    def load(cls, path: str) -> "LagState | None":
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        # States saved before multiple windows were supported only have a window size
+        windows = data["windows"] if "windows" in data else [data["window_size"]]
+        window_size = max(windows)
+        return cls(
+            windows,
+            data.get("aggregates", []),
+            buffers={
+                side: {
+                    team: deque(rows, maxlen=window_size)
+                    for team, rows in teams.items()
+                }
+                for side, teams in data["buffers"].items()
+            },
+            rows=data["rows"],
+            watermark=pd.Timestamp(data["watermark"]) if data["watermark"] else None,
+            watermark_keys={tuple(key) for key in data["watermark_keys"]},
+            day_rows=data.get("day_rows"),
+            unverified_since=(
+                pd.Timestamp(data["unverified_since"])
+                if data.get("unverified_since")
+                else None
+            ),
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = {
+            "windows": self.windows,
+            "aggregates": self.aggregates,
+            "rows": self.rows,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "watermark_keys": sorted(self.watermark_keys),
+            "day_rows": self.day_rows,
+            "unverified_since": (
+                self.unverified_since.isoformat() if self.unverified_since else None
+            ),
+            "buffers": {
+                side: {team: list(rows) for team, rows in teams.items()}
+                for side, teams in self.buffers.items()
+            },
+        }
+
+        # Write to a temporary file first so a crash never leaves a truncated state
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def new_rows_mask(self, df: pd.DataFrame) -> pd.Series:
+        if self.watermark is None:
+            return pd.Series(True, index=df.index)
+
+        keys = pd.Series(list(zip(df["hometeam"], df["awayteam"])), index=df.index)
+        at_watermark = df["datetime"] == self.watermark
+
+        return (df["datetime"] > self.watermark) | (
+            at_watermark & ~keys.isin(self.watermark_keys)
+        )
+
+    def is_consistent(self, df: pd.DataFrame) -> bool:
+        return self.inconsistency(df) is None
+
+    def inconsistency(self, df: pd.DataFrame) -> str | None:
+        """
+        Why the state can not be updated incrementally with `df`, or None if
+        it can. `df` has to contain exactly the rows the state consumed from
+        the first day of `df` on, followed by new ones, otherwise history
+        changed and the lags have to be rebuilt. Days before the first day of
+        `df`, e.g. the older seasons of a backfill, are not checked.
+        """
+        if self.rows and not self.day_rows:
+            return "it was saved before rows were counted per day"
+
+        new_rows = self.new_rows_mask(df)
+        consumed = df.loc[~new_rows, "datetime"]
+        if len(df):
+            first = _day(df["datetime"].min())
+            days = consumed.dt.strftime("%Y-%m-%d").value_counts().to_dict()
+            expected = {day: n for day, n in self.day_rows.items() if day >= first}
+            changed = sorted(
+                day
+                for day in days.keys() | expected.keys()
+                if days.get(day, 0) != expected.get(day, 0)
+            )
+            if changed:
+                return f"the rows of {len(changed)} days changed, from {changed[0]} on"
+
+        # New rows must come after all consumed rows
+        if new_rows.any() and (~new_rows[new_rows.idxmax() :]).any():
+            return "the data has new rows before rows it consumed"
+        return None
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Consumes the rows of `df` in order and returns their lag rows with
+        all lag and aggregate columns of the windows.
+        """
+        columns = dict()
+        for side, features in LAG_SIDES:
+            # The buffer of the team right aligned in the widest window
+            windows = np.full((len(df), len(features), self.window_size), np.nan)
+            values = df[list(features.values())].to_numpy(dtype=np.float64)
+
+            for i, (team, row) in enumerate(zip(df[side], values.tolist())):
+                buffer = self._buffer(side, team)
+                if buffer:
+                    windows[i, :, self.window_size - len(buffer) :] = np.array(buffer).T
+                buffer.append(row)
+
+            columns |= window_features(
+                windows, list(features), self.windows, self.aggregates
+            )
+
+        self._advance(df)
+        return pd.concat(
+            [
+                df[["datetime", "hometeam", "awayteam"]],
+                pd.DataFrame(columns, index=df.index)[
+                    lag_columns(self.windows, self.aggregates)
+                ],
+            ],
+            axis=1,
+        )
+
+    def current_form(self, league: str, matches: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        One row per team and side, keyed by league, team and side ("home" or
+        "away"), with the lag columns the next match of the team on that side
+        gets. Columns of the other side are NaN. `datetime` is the watermark
+        the form is up to date with. With `matches` only the rows of the teams
+        that played in them, on the side they played, are returned.
+        """
+        frames = []
+        for side, features in LAG_SIDES:
+            teams = list(self.buffers[side])
+            if matches is not None:
+                played = set(matches[side])
+                teams = [team for team in teams if team in played]
+            windows = np.full((len(teams), len(features), self.window_size), np.nan)
+            for i, team in enumerate(teams):
+                buffer = self.buffers[side][team]
+                if buffer:
+                    windows[i, :, self.window_size - len(buffer) :] = np.array(buffer).T
+
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "league": league,
+                        "team": teams,
+                        "side": side.removesuffix("team"),
+                        "datetime": self.watermark,
+                    }
+                    | window_features(
+                        windows, list(features), self.windows, self.aggregates
+                    )
+                )
+            )
+
+        form = pd.concat(frames, ignore_index=True)
+        return form[
+            [
+                "league",
+                "team",
+                "side",
+                "datetime",
+                *lag_columns(self.windows, self.aggregates),
+            ]
+        ]
+
+    def _buffer(self, side: str, team: str) -> deque:
+        if team not in self.buffers[side]:
+            self.buffers[side][team] = deque(maxlen=self.window_size)
+
+        return self.buffers[side][team]
+
+    def _advance(self, df: pd.DataFrame):
+        self.rows += len(df)
+        if len(df) == 0:
+            return
+
+        days = df["datetime"].dt.strftime("%Y-%m-%d").value_counts()
+        for day, n in days.items():
+            self.day_rows[day] = self.day_rows.get(day, 0) + int(n)
+
+        watermark = df["datetime"].max()
+        keys = set(
+            zip(
+                df.loc[df["datetime"] == watermark, "hometeam"],
+                df.loc[df["datetime"] == watermark, "awayteam"],
+            )
+        )
+        if watermark == self.watermark:
+            self.watermark_keys |= keys
+        elif self.watermark is None or watermark > self.watermark:
+            self.watermark = watermark
+            self.watermark_keys = keys
+
+
+def _day(datetime: pd.Timestamp) -> str:
+    return datetime.strftime("%Y-%m-%d")
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from football_shared.lag_features import (
+    AGGREGATES,
+    AWAY_LAG_FEATURES,
+    HOME_LAG_FEATURES,
+    LAG_SIDES,
+    current_form_feature_group_name,
+    lag_columns,
+    lags_feature_group_name,
+    pack_windows,
+    window_features,
+)
+
+
+def team_windows(teams: pd.Series, values: np.ndarray, window_size: int) -> np.ndarray:
+    """
+    Returns an array of shape (rows, features, window_size) holding, for every
+    row, the values of the team's previous `window_size` matches (oldest
+    first) in row order. Slots without a previous match are NaN.
+    """
+    n = len(teams)
+    codes, _ = pd.factorize(teams)
+
+    # Stable sort keeps the original row order within each team
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_codes)) + 1]
+    sizes = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, sizes)
+
+    sorted_values = values[order]
+    windows = np.full((n, values.shape[1], window_size), np.nan)
+    for slot in range(window_size):
+        # Slot 0 is the oldest match in the window, the last slot is the previous match
+        lag = window_size - slot
+        valid = rank >= lag
+        positions = np.flatnonzero(valid)
+        windows[positions, :, slot] = sorted_values[positions - lag]
+
+    # Scatter back to the original row order
+    out = np.empty_like(windows)
+    out[order] = windows
+    return out
+
+
+def create_window_lag_df(
+    df: pd.DataFrame, windows: list[int], aggregates: list[str] = ()
+) -> pd.DataFrame:
+    """
+    Creates the lag and aggregate columns of all `windows` for every row in
+    `df` with a single pass per side over the widest window. Unlike
+    `create_lag_df` every lag column is created.
+    """
+    columns = dict()
+    for side, features in LAG_SIDES:
+        values = df[list(features.values())].to_numpy(dtype=np.float64)
+        windows_array = team_windows(df[side], values, max(windows))
+        columns |= window_features(windows_array, list(features), windows, aggregates)
+
+    return pd.concat(
+        [
+            df[["datetime", "hometeam", "awayteam"]],
+            pd.DataFrame(columns, index=df.index)[lag_columns(windows, aggregates)],
+        ],
+        axis=1,
+    )
+
+
+def create_lag_df(df: pd.DataFrame, window_size: int) -> pd.DataFrame:
+    """
+    Creates the `<feature>_lags_<i>` columns for every row in `df`. Lag `i`
+    is the i-th oldest non-missing value among the team's previous
+    `window_size` home (or away) matches, and only as many lag columns as
+    are actually filled are created.
+    """
+    df_lags = create_window_lag_df(df, [window_size])
+    empty = [col for col in lag_columns(window_size) if df_lags[col].isna().all()]
+    return df_lags.drop(columns=empty)
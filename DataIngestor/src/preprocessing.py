@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+OVER_UNDER = pd.CategoricalDtype(["O", "U"])
+
+
+def fill_columns(df: pd.DataFrame, fill_columns: dict[str, str]) -> pd.DataFrame:
+    # Fill missing values in the target columns from the source columns
+    for target_col, source_col in fill_columns.items():
+        if target_col in df.columns and source_col in df.columns:
+            df[target_col] = df[target_col].fillna(df[source_col])
+        elif source_col in df.columns:
+            # Older seasons use other names for some columns
+            df[target_col] = df[source_col]
+
+    return df
+
+
+def combine_date_time(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the kick-off time in "Time" to the "Date" column and drops "Time".
+    Seasons before 2019/2020 have no kick-off times and only get their dates
+    converted.
+    """
+    dates = pd.to_datetime(df["Date"], errors="coerce")
+    if "Time" not in df.columns:
+        df["Date"] = dates
+        return df
+
+    # Times are datetime.time objects or "HH:MM" strings depending on the reader.
+    # There are only a few distinct kick-off times, so only those are parsed
+    codes, times = pd.factorize(df["Time"])
+    times = pd.Series(times, dtype=object).astype(str).str.slice(0, 8)
+    times = times.where(times.str.len() != 5, times + ":00")
+    offsets = pd.to_timedelta(times, errors="coerce").to_numpy()
+    offsets = np.append(offsets, np.timedelta64("NaT"))  # Code -1 is a missing time
+
+    df["Date"] = dates.dt.normalize() + offsets[codes]
+    df.drop(columns=["Time"], inplace=True)
+
+    return df
+
+
+def format_df(df: pd.DataFrame):
+    df.columns = (
+        df.columns.str.lower()
+        .str.replace("<", "_lt_")
+        .str.replace(">", "_gt_")
+        .str.replace(".", "_")
+    )  # Rename incompatible columns names for Hopsworks
+    df.rename(
+        columns={"date": "datetime", "as": "awayshots", "hs": "homeshots"},
+        inplace=True,
+    )  # Rename as to awayshot because as causes hopsworks to not upload data...
+    df.reset_index(inplace=True, drop=True)
+
+    return df
+
+
+def create_league_percentages(df: pd.DataFrame):
+    """
+    Adds the categorical over/under 2.5 goals result `ftour` and the share of
+    earlier games in the league that ended over/under 2.5 goals.
+    """
+    over = (df["fthg"].to_numpy(np.float64) + df["ftag"].to_numpy(np.float64)) > 2.5
+    df.insert(
+        7, "ftour", pd.Categorical.from_codes(np.where(over, 0, 1), dtype=OVER_UNDER)
+    )
+
+    # Games played and games over 2.5 goals before each row
+    games = np.arange(len(df), dtype=np.float64)
+    over_before = np.cumsum(over, dtype=np.float64) - over
+
+    df["league_over_percentage"] = np.divide(
+        over_before, games, out=np.zeros(len(df)), where=games > 0
+    )
+    df["league_under_percentage"] = np.divide(
+        games - over_before, games, out=np.zeros(len(df)), where=games > 0
+    )
+
+    return df
+
+
+def preprocess(df: pd.DataFrame, features: list[str]) -> pd.DataFrame:
+    # The features of a league sheet in the format of the feature groups
+    df = format_df(df[features].copy())
+    return create_league_percentages(df)
+
+
+def to_feature_store_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    # The feature groups store categorical features as strings
+    categorical = df.select_dtypes("category").columns
+    return df.astype({col: object for col in categorical})
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+from io import BytesIO
+from typing import Callable
+
+import pandas as pd
+
+# name -> reader(data, sheet_names, usecols) returning the sheets found in data
+READERS: dict[str, Callable[..., dict[str, pd.DataFrame]]] = dict()
+
+
+def register_reader(name: str):
+    def decorator(reader):
+        READERS[name] = reader
+        return reader
+
+    return decorator
+
+
+def _read_excel(data: bytes, sheet_names: list[str], usecols: list[str], engine: str):
+    with pd.ExcelFile(BytesIO(data), engine=engine) as excel_file:
+        return {
+            sheet_name: excel_file.parse(sheet_name, usecols=lambda col: col in usecols)
+            for sheet_name in sheet_names
+            if sheet_name in excel_file.sheet_names
+        }
+
+
+@register_reader("openpyxl")
+def read_openpyxl(data: bytes, sheet_names: list[str], usecols: list[str]):
+    return _read_excel(data, sheet_names, usecols, engine="openpyxl")
+
+
+@register_reader("calamine")
+def read_calamine(data: bytes, sheet_names: list[str], usecols: list[str]):
+    # Much faster than openpyxl, requires python-calamine
+    return _read_excel(data, sheet_names, usecols, engine="calamine")
+
+
+@register_reader("csv")
+def read_csv(data: bytes, sheet_names: list[str], usecols: list[str]):
+    # A zip of football-data csv files named after the sheets, e.g. E0.csv
+    dfs = dict()
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        for sheet_name in sheet_names:
+            if f"{sheet_name}.csv" not in archive.namelist():
+                continue
+
+            with archive.open(f"{sheet_name}.csv") as f:
+                df = pd.read_csv(
+                    f, usecols=lambda col: col in usecols, encoding="latin-1"
+                )
+            df["Date"] = pd.to_datetime(df["Date"], dayfirst=True)
+            dfs[sheet_name] = df
+
+    return dfs
+
+
+def sheet_columns(config: dict) -> list[str]:
+    # The columns extract_data needs, everything else is skipped when reading
+    columns = {"Date", "Time", *config["features"]}
+    for target_col, source_col in config["fill_columns"].items():
+        columns |= {target_col, source_col}
+
+    return sorted(columns)
+
+
+def parsed_sheets_dir(config: dict, sha256: str) -> str:
+    # Keyed by the data, the reader and the columns read
+    columns = json.dumps(sheet_columns(config)).encode()
+    return os.path.join(
+        config["save_dir"],
+        "parsed_sheets",
+        sha256,
+        f"{config['reader']}-{hashlib.sha256(columns).hexdigest()[:12]}",
+    )
+
+
+def read_sheets(config: dict, data: bytes) -> dict[str, pd.DataFrame]:
+    """
+    Reads the sheets in `sheets_mapping` from `data` with the configured
+    reader. The parsed sheets are cached as parquet files, so reading the
+    same data again only loads them.
+    """
+    sheet_names = list(config["sheets_mapping"])
+    cache_dir = parsed_sheets_dir(config, hashlib.sha256(data).hexdigest())
+
+    cached = load_parsed_sheets(cache_dir)
+    if cached is not None and set(sheet_names) <= set(cached[0]):
+        return {name: df for name, df in cached[1].items() if name in sheet_names}
+
+    sheets = READERS[config["reader"]](data, sheet_names, sheet_columns(config))
+    save_parsed_sheets(cache_dir, sheets, sheet_names)
+
+    return sheets
+
+
+def load_parsed_sheets(
+    cache_dir: str,
+) -> tuple[list[str], dict[str, pd.DataFrame]] | None:
+    # Returns the requested sheet names and the sheets that were found
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+
+    return manifest["requested"], {
+        sheet_name: pd.read_parquet(os.path.join(cache_dir, f"{sheet_name}.parquet"))
+        for sheet_name in manifest["found"]
+    }
+
+
+def save_parsed_sheets(
+    cache_dir: str, sheets: dict[str, pd.DataFrame], requested: list[str]
+):
+    # Write to a temporary directory first so readers never see a partial cache
+    tmp_dir = f"{cache_dir}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(tmp_dir, exist_ok=True)
+        for sheet_name, df in sheets.items():
+            df.to_parquet(os.path.join(tmp_dir, f"{sheet_name}.parquet"), index=False)
+
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump({"requested": requested, "found": list(sheets)}, f)
+
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.replace(tmp_dir, cache_dir)
+    except Exception as e:
+        print(f"Could not cache parsed sheets in {cache_dir}: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
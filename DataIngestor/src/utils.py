@@ -1,8 +1,15 @@
 import yaml
 
+from football_shared import local_store
+
 
 def load_config(path: str) -> dict:
     with open(path, "r") as f:
         config = yaml.safe_load(f)
 
     return config
+
+
+def store_backend() -> str:
+    # "hopsworks" or "local", the local store lives in FOOTBALL_STORE_DIR
+    return local_store.backend()
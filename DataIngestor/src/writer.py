@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+from hsfs.feature_group import FeatureGroup
+
+
+def update_descriptions(fg: FeatureGroup, descriptions: dict[str, str]):
+    # One metadata call for all features instead of one per feature
+    features = []
+    for feature in fg.features:
+        if feature.name in descriptions:
+            feature.description = descriptions[feature.name]
+            features.append(feature)
+
+    if features:
+        fg.update_features(features)
+
+
+class FeatureGroupWriter:
+    """
+    Writes to feature groups from a thread pool, so the writes of different
+    feature groups overlap with each other and with the caller. Frames larger
+    than `chunk_rows` are inserted in chunks, one after another. Only the last
+    chunk starts the materialization job, which materializes the earlier
+    chunks too, so a write starts one job. Unless `wait_for_job` is set the
+    write resolves once the rows are uploaded, without waiting for the job.
+    """
+
+    def __init__(
+        self, max_workers: int = 4, chunk_rows: int = 100_000, wait_for_job=False
+    ):
+        self.chunk_rows = chunk_rows
+        self.wait_for_job = wait_for_job
+        self.latencies: list[tuple[str, str, float]] = []
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(
+        self,
+        label: str,
+        fg: FeatureGroup,
+        df: pd.DataFrame,
+        descriptions: dict[str, str] = None,
+    ) -> Future:
+        """
+        Inserts `df` into `fg` and then sets the feature `descriptions` in the
+        background. The future resolves to the number of rows inserted.
+        """
+        return self._pool.submit(self._write, label, fg, df, descriptions)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def report(self):
+        # Time spent writing to every feature group, writes of different groups overlap
+        totals = dict()
+        for label, _, elapsed in self.latencies:
+            totals[label] = totals.get(label, 0.0) + elapsed
+
+        for label, elapsed in sorted(totals.items()):
+            print(f"WRITE [{label}]: {elapsed:.2f}s in total")
+
+    def _write(
+        self,
+        label: str,
+        fg: FeatureGroup,
+        df: pd.DataFrame,
+        descriptions: dict[str, str] | None,
+    ) -> int:
+        starts = range(0, len(df), self.chunk_rows)
+        for i, start in enumerate(starts):
+            chunk = df.iloc[start : start + self.chunk_rows]
+            begin = time.perf_counter()
+            if i < len(starts) - 1:
+                write_options = {"start_offline_materialization": False}
+            else:
+                write_options = {"wait_for_job": self.wait_for_job}
+            fg.insert(chunk, write_options=write_options)
+            self._record(
+                label, f"insert {i + 1}/{len(starts)} of {len(chunk)} rows", begin
+            )
+
+        if descriptions:
+            begin = time.perf_counter()
+            update_descriptions(fg, descriptions)
+            self._record(label, f"update of {len(descriptions)} descriptions", begin)
+
+        return len(df)
+
+    def _record(self, label: str, operation: str, begin: float):
+        elapsed = time.perf_counter() - begin
+        with self._lock:
+            self.latencies.append((label, operation, elapsed))
+        print(f"WRITE [{label}]: {operation} took {elapsed:.2f}s")
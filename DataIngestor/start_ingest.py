@@ -7,16 +7,34 @@ image = (
     .apt_install("git")
     .apt_install("build-essential")
     .pip_install_from_requirements(requirements_txt="modal_container_requirements.txt")
-    .add_local_python_source("src")
+    .add_local_python_source("src", "football_shared")
     .add_local_file("./config.yaml", "/root/config.yaml")
 )
 app = modal.App(name="Football Data Ingestor")
 
+# Keeps save_dir (e.g. the lag state) between runs
+volume = modal.Volume.from_name("football-data-ingestor", create_if_missing=True)
+
 
 @app.function(
     image=image,
     secrets=[modal.Secret.from_name("HOPSWORKS_API_KEY")],
     schedule=modal.Cron("0 1 * * *"),  # Every day at 1 am
+    volumes={"/root/outputs": volume},
 )
 def entry():
     run("/root/config.yaml")
+    volume.commit()
+
+
+@app.function(
+    image=image,
+    secrets=[modal.Secret.from_name("HOPSWORKS_API_KEY")],
+    volumes={"/root/outputs": volume},
+    cpu=4,
+    timeout=3600,
+)
+def backfill():
+    # The lag state of the backfill is continued by the daily runs
+    run("/root/config.yaml", backfill=True)
+    volume.commit()
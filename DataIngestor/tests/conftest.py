@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.lags import AWAY_LAG_FEATURES, HOME_LAG_FEATURES
+
+
+def make_matches(rows: int, teams: int = 6, seed: int = 0) -> pd.DataFrame:
+    # Matches between random teams in event time order, with some missing stats
+    rng = np.random.default_rng(seed)
+    home = rng.integers(0, teams, rows)
+    away = (home + rng.integers(1, teams, rows)) % teams
+    df = pd.DataFrame(
+        {
+            "datetime": pd.Timestamp("2024-08-01 15:00")
+            + pd.to_timedelta(np.arange(rows) * 8, unit="h"),
+            "hometeam": [f"team{i}" for i in home],
+            "awayteam": [f"team{i}" for i in away],
+        }
+    )
+    for col in [*HOME_LAG_FEATURES.values(), *AWAY_LAG_FEATURES.values()]:
+        values = rng.integers(0, 10, rows).astype(np.float64)
+        values[rng.random(rows) < 0.1] = np.nan
+        df[col] = values
+
+    return df
+
+
+@pytest.fixture
+def matches() -> pd.DataFrame:
+    return make_matches(120)
@@ -0,0 +1,93 @@
+import json
+import os
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from src.archive import COMPACTION_MARKER, MatchArchive
+
+
+def sheet(dates: list[str], teams: list[str]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Date": pd.to_datetime(dates),
+            "HomeTeam": teams,
+            "AwayTeam": ["away"] * len(dates),
+            "FTHG": range(len(dates)),
+        }
+    )
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MatchArchive(str(tmp_path), compact_after_parts=100)
+    yield archive
+    archive.close()
+
+
+def test_appends_only_new_rows_per_season(archive):
+    df = sheet(["2024-05-01", "2024-08-17", "2024-08-18"], ["a", "b", "c"])
+    assert archive.append("E0", df) == 3
+    assert archive.append("E0", pd.concat([df, sheet(["2025-01-01"], ["d"])])) == 1
+
+    assert archive.seasons("E0") == ["2023-2024", "2024-2025"]
+    assert archive.read("E0")["HomeTeam"].tolist() == ["a", "b", "c", "d"]
+
+
+def test_dates_of_other_units_are_the_same_keys(archive):
+    df = sheet(["2024-08-17 15:00"], ["a"])
+    archive.append("E0", df)
+    assert archive.append("E0", df.astype({"Date": "datetime64[s]"})) == 0
+
+
+def test_append_interrupted_before_the_index(archive):
+    archive.append("E0", sheet(["2024-08-17"], ["a"]))
+    df = sheet(["2024-08-17", "2024-08-18"], ["a", "b"])
+    with mock.patch.object(MatchArchive, "_save_index", side_effect=OSError):
+        with pytest.raises(OSError):
+            archive.append("E0", df)
+
+    # The part of b was written, so the rebuilt index already has its key
+    assert archive.append("E0", df) == 0
+    assert archive.read("E0")["HomeTeam"].tolist() == ["a", "b"]
+
+
+def test_compaction_keeps_rows_and_order(archive):
+    for day, team in enumerate("abcd", start=17):
+        archive.append("E0", sheet([f"2024-08-{day}"], [team]))
+    archive.compact("E0", "2024-2025")
+
+    partition = archive._partition_dir("E0", "2024-2025")
+    assert len(archive._parts(partition)) == 1
+    assert archive.read("E0")["HomeTeam"].tolist() == ["a", "b", "c", "d"]
+    assert archive.append("E0", sheet(["2024-08-18"], ["b"])) == 0
+
+
+def interrupt_compaction(archive: MatchArchive, swapped: bool):
+    # Leaves the partition like a crash after writing the marker
+    partition = archive._partition_dir("E0", "2024-2025")
+    with mock.patch.object(MatchArchive, "_finish_compaction"):
+        archive.compact("E0", "2024-2025")
+    marker_path = os.path.join(partition, COMPACTION_MARKER)
+    if not swapped:
+        with open(marker_path, "r") as f:
+            compacted = json.load(f)["compacted"]
+        os.replace(
+            os.path.join(partition, compacted),
+            os.path.join(partition, f"{compacted}.tmp"),
+        )
+    return partition, marker_path
+
+
+@pytest.mark.parametrize("swapped", [True, False])
+def test_interrupted_compaction_is_recovered(archive, swapped):
+    archive.append("E0", sheet(["2024-08-17"], ["a"]))
+    archive.append("E0", sheet(["2024-08-18"], ["b"]))
+    partition, marker_path = interrupt_compaction(archive, swapped)
+
+    # The rows are read once, whether the compaction is finished or dropped
+    assert archive.read("E0")["HomeTeam"].tolist() == ["a", "b"]
+    assert not os.path.exists(marker_path)
+    assert len(archive._parts(partition)) == (1 if swapped else 2)
+    assert not [name for name in os.listdir(partition) if name.endswith(".tmp")]
@@ -0,0 +1,14 @@
+from src import data_downloader
+
+
+def test_get_dataframes_without_a_download(monkeypatch, tmp_path):
+    monkeypatch.setattr(data_downloader, "download_data", lambda config, cache: None)
+    config = {
+        "save_dir": str(tmp_path),
+        "download_cache_max_mb": 1,
+        "http_timeout_seconds": 1,
+        "http_retries": 0,
+        "backfill_download_workers": 1,
+    }
+
+    assert data_downloader.get_dataframes(config) == dict()
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("hsfs")
+
+from src.delta import filter_new_rows  # noqa: E402
+
+
+def keys(days: list[int], teams: list[str]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "datetime": pd.to_datetime([f"2024-08-{day:02d} 15:00" for day in days]),
+            "hometeam": teams,
+            "awayteam": ["away"] * len(days),
+        }
+    )
+
+
+def test_nothing_stored():
+    df = keys([1, 2], ["a", "b"])
+    pd.testing.assert_frame_equal(filter_new_rows(df, keys([], [])), df)
+
+
+def test_keeps_newer_and_missing_rows():
+    df = keys([1, 2, 3, 4], ["a", "b", "c", "d"])
+    # Row b was lost, row d is newer than everything stored
+    stored = keys([1, 3], ["a", "c"])
+
+    assert filter_new_rows(df, stored)["hometeam"].tolist() == ["b", "d"]
+
+
+def test_rows_changed_at_the_same_time_are_new():
+    df = keys([1, 1], ["a", "b"])
+    assert filter_new_rows(df, keys([1], ["a"]))["hometeam"].tolist() == ["b"]
+
+
+@pytest.mark.parametrize(
+    "dtype", ["datetime64[us]", "datetime64[s]", "datetime64[us, UTC]"]
+)
+def test_stored_event_times_of_other_units_and_zones(dtype):
+    df = keys([1, 2, 3], ["a", "b", "c"])
+    stored = keys([1, 2], ["a", "b"])
+    if "UTC" in dtype:
+        stored["datetime"] = stored["datetime"].dt.tz_localize("UTC")
+    stored = stored.astype({"datetime": dtype})
+
+    assert filter_new_rows(df, stored)["hometeam"].tolist() == ["c"]
@@ -0,0 +1,94 @@
+import os
+from dataclasses import dataclass, field
+
+from src.download_cache import DownloadCache
+
+
+@dataclass
+class Response:
+    status_code: int
+    content: bytes = b""
+    headers: dict = field(default_factory=dict)
+
+
+class Server:
+    # Answers like a server with ETags, recording the headers of every request
+    def __init__(self, pages: dict[str, bytes]):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url: str, headers: dict = None) -> Response:
+        self.requests.append((url, headers or {}))
+        if url not in self.pages:
+            return Response(404)
+
+        etag = f'"{hash(self.pages[url])}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return Response(304)
+        return Response(200, self.pages[url], {"ETag": etag})
+
+
+def test_revalidates_with_the_etag(tmp_path):
+    server = Server({"a": b"workbook"})
+    cache = DownloadCache(str(tmp_path), max_bytes=1024, session=server)
+    assert cache.fetch("a").content == b"workbook"
+
+    # A new cache reads the index from disk, the server answers 304
+    cache = DownloadCache(str(tmp_path), max_bytes=1024, session=server)
+    assert cache.fetch("a").content == b"workbook"
+    assert "If-None-Match" not in server.requests[0][1]
+    assert "If-None-Match" in server.requests[1][1]
+
+    server.pages["a"] = b"new workbook"
+    assert cache.fetch("a").content == b"new workbook"
+
+
+def test_refetches_a_missing_blob(tmp_path):
+    server = Server({"a": b"workbook"})
+    cache = DownloadCache(str(tmp_path), max_bytes=1024, session=server)
+    download = cache.fetch("a")
+    os.remove(os.path.join(cache.blobs_dir, download.sha256))
+
+    assert cache.fetch("a").content == b"workbook"
+    assert "If-None-Match" not in server.requests[1][1]
+
+
+def test_failed_fetch(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=1024, session=Server({}))
+    assert cache.fetch("a") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    server = Server({"a": b"a" * 40, "b": b"b" * 40, "c": b"c" * 40})
+    cache = DownloadCache(str(tmp_path), max_bytes=100, session=server)
+    cache.fetch("a")
+    cache.fetch("b")
+    cache.fetch("a")
+    # b is the least recently used, the newest entry is kept
+    cache.fetch("c")
+
+    assert sorted(cache.index) == ["a", "c"]
+    blobs = sorted(os.listdir(cache.blobs_dir))
+    assert blobs == sorted(cache.index[url]["sha256"] for url in ["a", "c"])
+
+
+def test_same_content_is_stored_once(tmp_path):
+    server = Server({"a": b"x" * 40, "b": b"x" * 40, "c": b"c" * 40})
+    cache = DownloadCache(str(tmp_path), max_bytes=80, session=server)
+    for url in ["a", "b", "c"]:
+        cache.fetch(url)
+
+    # Both entries of the same content count once towards the size
+    assert sorted(cache.index) == ["a", "b", "c"]
+    assert len(os.listdir(cache.blobs_dir)) == 2
+
+
+def test_consumed_settings_of_the_same_content(tmp_path):
+    server = Server({"a": b"workbook"})
+    cache = DownloadCache(str(tmp_path), max_bytes=1024, session=server)
+    cache.mark_consumed(cache.fetch("a"), "settings")
+
+    cache = DownloadCache(str(tmp_path), max_bytes=1024, session=server)
+    assert cache.fetch("a").consumed_settings == "settings"
+    server.pages["a"] = b"new workbook"
+    assert cache.fetch("a").consumed_settings is None
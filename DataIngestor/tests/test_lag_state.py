@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from src.lag_state import LagState
+from src.lags import create_window_lag_df, lag_columns
+
+WINDOWS = [2, 4]
+AGGREGATES = ["mean", "sum"]
+
+
+@pytest.mark.parametrize("split", [0, 1, 57, 119])
+def test_update_matches_full_computation(matches, split):
+    state = LagState.from_frame(matches.iloc[:split], WINDOWS, AGGREGATES)
+    df_lags = state.update(matches.iloc[split:])
+
+    expected = create_window_lag_df(matches, WINDOWS, AGGREGATES).iloc[split:]
+    pd.testing.assert_frame_equal(df_lags, expected)
+
+
+def test_update_in_batches_after_save_and_load(matches, tmp_path):
+    path = str(tmp_path / "state.json")
+    LagState.from_frame(matches.iloc[:40], WINDOWS, AGGREGATES).save(path)
+
+    frames = []
+    for start, end in [(40, 41), (41, 90), (90, 120)]:
+        state = LagState.load(path)
+        frames.append(state.update(matches.iloc[start:end]))
+        state.save(path)
+
+    expected = create_window_lag_df(matches, WINDOWS, AGGREGATES).iloc[40:]
+    pd.testing.assert_frame_equal(pd.concat(frames), expected)
+    assert LagState.load(path).rows == len(matches)
+
+
+def test_current_form_is_the_lags_of_the_next_match(matches):
+    state = LagState.from_frame(matches, WINDOWS, AGGREGATES)
+    form = state.current_form("E0").set_index(["team", "side"])
+
+    # A match of every team at home and away after the last one
+    teams = sorted(set(matches["hometeam"]) | set(matches["awayteam"]))
+    next_matches = pd.DataFrame(
+        {
+            "datetime": matches["datetime"].max() + pd.Timedelta(days=1),
+            "hometeam": teams,
+            "awayteam": teams[1:] + teams[:1],
+        }
+    )
+    df = pd.concat([matches, next_matches], ignore_index=True)
+    df_lags = create_window_lag_df(df, WINDOWS, AGGREGATES).iloc[len(matches) :]
+
+    for side in ["home", "away"]:
+        team = f"{side}team"
+        columns = lag_columns(WINDOWS, AGGREGATES, sides=[team])
+        expected = df_lags.set_index(team)[columns].sort_index()
+        actual = form.xs(side, level="side")[columns].sort_index()
+        pd.testing.assert_frame_equal(actual, expected, check_names=False)
+
+
+def test_inconsistency(matches):
+    # Matches are 8 hours apart, rows 50 and 101 are the first of their days
+    state = LagState.from_frame(matches.iloc[:101], WINDOWS, AGGREGATES)
+    assert state.inconsistency(matches.iloc[50:]) is None
+    assert state.inconsistency(matches.iloc[101:]) is None
+    assert "changed" in state.inconsistency(matches.iloc[100:])
+
+    changed = matches.drop(index=70)
+    assert "changed" in state.inconsistency(changed.iloc[50:])
+
+    # A new match on a day the state already consumed
+    late = matches.iloc[[10]].assign(hometeam="late", awayteam="comer")
+    assert state.inconsistency(pd.concat([matches, late]).sort_values("datetime"))
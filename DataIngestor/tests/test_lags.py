@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.lags import LAG_SIDES, create_lag_df, create_window_lag_df, lag_columns
+
+
+def reference_lags(
+    df: pd.DataFrame, windows: list[int], aggregates: list[str]
+) -> pd.DataFrame:
+    # The lags of every row from the previous matches of its team, one row at a time
+    rows = []
+    for i in range(len(df)):
+        row = dict()
+        for side, features in LAG_SIDES:
+            previous = df.iloc[:i][df[side].iloc[:i] == df[side].iloc[i]]
+            for prefix, col in features.items():
+                for window in windows:
+                    values = previous[col].tail(window).dropna().tolist()
+                    name = prefix if len(windows) == 1 else f"{prefix}_w{window}"
+                    padded = values + [np.nan] * (window - len(values))
+                    for j, value in enumerate(padded):
+                        row[f"{name}_lags_{j + 1}"] = value
+                    if "mean" in aggregates:
+                        row[f"{prefix}_w{window}_mean"] = (
+                            np.mean(values) if values else np.nan
+                        )
+                    if "sum" in aggregates:
+                        row[f"{prefix}_w{window}_sum"] = (
+                            np.sum(values) if values else np.nan
+                        )
+        rows.append(row)
+
+    columns = lag_columns(windows, aggregates)
+    return pd.concat(
+        [
+            df[["datetime", "hometeam", "awayteam"]],
+            pd.DataFrame(rows, index=df.index, columns=columns).astype(np.float64),
+        ],
+        axis=1,
+    )
+
+
+@pytest.mark.parametrize(
+    "windows, aggregates",
+    [([4], []), ([2, 5], []), ([3, 1, 6], ["mean", "sum"])],
+)
+def test_window_lags_match_reference(matches, windows, aggregates):
+    df_lags = create_window_lag_df(matches, windows, aggregates)
+    pd.testing.assert_frame_equal(
+        df_lags, reference_lags(matches, sorted(windows), aggregates)
+    )
+
+
+def test_lag_columns_of_one_window():
+    columns = lag_columns([2, 4], ["mean"], window=2, sides=["awayteam"])
+    assert columns[:4] == [
+        "as_w2_lags_1",
+        "as_w2_lags_2",
+        "as_w2_mean",
+        "ftag_w2_lags_1",
+    ]
+    assert all(col.split("_")[1] == "w2" for col in columns)
+    assert len(columns) == 4 * 3
+
+
+def test_create_lag_df_drops_empty_lags(matches):
+    # Every team plays twice, so the third and fourth lags are never filled
+    df = matches.iloc[:4].copy()
+    df["hometeam"] = ["a", "b", "a", "b"]
+    df["awayteam"] = ["c", "d", "c", "d"]
+
+    df_lags = create_lag_df(df, 4)
+    assert "fthg_lags_1" in df_lags.columns
+    assert "fthg_lags_2" not in df_lags.columns
+    assert df_lags["fthg_lags_1"].isna().tolist()[:2] == [True, True]
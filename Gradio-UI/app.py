@@ -7,8 +7,27 @@ import os
 import hopsworks
 from hsfs.feature_store import FeatureStore
 
+try:
+    from football_shared import local_store
+except ImportError:
+    # The Huggingface Space only has this folder and always reads from Hopsworks
+    local_store = None
+
+
+def store_backend() -> str:
+    # "hopsworks" or "local", the local store lives in FOOTBALL_STORE_DIR
+    if local_store is None:
+        if os.environ.get("FOOTBALL_STORE_BACKEND", "hopsworks") != "hopsworks":
+            raise ImportError("The local store needs the shared package: pip install -e ../shared")
+        return "hopsworks"
+    return local_store.backend()
+
 
 def login(project="ID2223_Project") -> tuple[hopsworks.project.Project, FeatureStore]:
+    if store_backend() == "local":
+        project = local_store.login()
+        return project, project.get_feature_store()
+
     project = hopsworks.login(
         api_key_value=os.environ["HOPSWORKS_API_KEY"],
         project=project,
@@ -84,7 +103,8 @@ def get_hist_roi():
     return {"total_bets": total_best, "bets_won": bets_won, "bets_lost": bets_lost, "current_balance": current_balance, "data": daily_aggregated}
 
 def logout():
-    hopsworks.logout()
+    if store_backend() == "hopsworks":
+        hopsworks.logout()
 
 def get_todays_predictions():
     project, fs = login()
@@ -0,0 +1,118 @@
+"""
+Compares the peak memory of training on the snapshot loaded into pandas, as
+`Trainer.fit` does, against streaming it into column stores and training on
+the histogram index, as `Trainer.fit_out_of_core` does. Every run is a fresh
+process so its peak resident set size is its own.
+
+Run from the XGBoostTrainer directory: `python -m benchmarks.out_of_core`
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.column_store import quantile_dmatrix, write_split
+from src.snapshot import PART_ROWS, TrainingSnapshot, split_train_test, test_mask
+
+ROWS = [250_000, 1_000_000, 2_000_000]
+FEATURES = 60
+LABEL = "ou_transformation_ftour_"
+KEYS = ["datetime", "hometeam", "awayteam"]
+# Fewer rounds than the classifier default, the memory peaks before training
+ROUNDS = 10
+MODES = ["pandas", "column store", "external memory"]
+
+
+def make_snapshot(root: str, rows: int) -> TrainingSnapshot:
+    # Parts in the snapshot layout, written one part at a time
+    snapshot = TrainingSnapshot(root, "benchmark", 1)
+    os.makedirs(snapshot.path)
+    rng = np.random.default_rng(0)
+    kickoff = pd.Timestamp("1995-08-01 15:00")
+
+    for i, start in enumerate(range(0, rows, PART_ROWS)):
+        n = min(PART_ROWS, rows - start)
+        part = pd.DataFrame(
+            rng.normal(size=(n, FEATURES)), columns=[f"f{j}" for j in range(FEATURES)]
+        )
+        part.insert(0, "datetime", kickoff + pd.to_timedelta(start + np.arange(n), "h"))
+        part.insert(1, "hometeam", "Home")
+        part.insert(2, "awayteam", "Away")
+        part[LABEL] = (part["f0"] + rng.normal(size=n) > 0).astype(int)
+        part.to_parquet(os.path.join(snapshot.path, f"part-{i:05d}.parquet"))
+
+    return snapshot
+
+
+def train_pandas(snapshot: TrainingSnapshot, work_dir: str):
+    df = snapshot.read()
+    X_train, _, y_train, _ = split_train_test(df, [LABEL], 0.2)
+    X_train = X_train.drop(columns=KEYS)
+    del df
+
+    xgb.XGBClassifier(n_estimators=ROUNDS).fit(X_train, y_train)
+
+
+def train_column_store(snapshot: TrainingSnapshot, work_dir: str, external=False):
+    X_train, _, y_train, _ = write_split(
+        os.path.join(work_dir, "stores"),
+        snapshot.batches(),
+        [LABEL],
+        lambda batch: test_mask(batch, 0.2),
+        drop=KEYS,
+    )
+    cache_dir = os.path.join(work_dir, "cache") if external else None
+    dtrain = quantile_dmatrix(X_train, y_train, cache_dir=cache_dir)
+
+    xgb.train({"objective": "binary:logistic"}, dtrain, num_boost_round=ROUNDS)
+
+
+def run(mode: str, root: str, work_dir: str):
+    snapshot = TrainingSnapshot(root, "benchmark", 1)
+    if mode == "pandas":
+        train_pandas(snapshot, work_dir)
+    else:
+        train_column_store(snapshot, work_dir, external=mode == "external memory")
+
+    # ru_maxrss is in kB on Linux
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+
+def main():
+    print(f"{'rows':>10} {'mode':>16} {'peak memory (MB)':>17} {'time (s)':>9}")
+    for rows in ROWS:
+        with tempfile.TemporaryDirectory() as root:
+            make_snapshot(root, rows)
+            for mode in MODES:
+                with tempfile.TemporaryDirectory() as work_dir:
+                    start = time.perf_counter()
+                    result = subprocess.run(
+                        [
+                            sys.executable,
+                            "-m",
+                            "benchmarks.out_of_core",
+                            mode,
+                            root,
+                            work_dir,
+                        ],
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                    )
+                    seconds = time.perf_counter() - start
+                    peak = float(result.stdout.split()[-1])
+                    print(f"{rows:>10} {mode:>16} {peak:>17.0f} {seconds:>9.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run(*sys.argv[1:])
+    else:
+        main()
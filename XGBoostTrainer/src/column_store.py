@@ -0,0 +1,217 @@
+import json
+import os
+import shutil
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+
+class ColumnStore:
+    """
+    A table on disk with one raw file per column, read through memory maps
+    so only the rows in use are paged in:
+
+        <path>/meta.json            row count, column names and dtypes
+        <path>/<column index>.bin
+
+    Mean and standard deviation are computed in batches and match pandas.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+
+        self.rows = meta["rows"]
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in meta["columns"]}
+        self.columns = list(self.dtypes)
+
+    def column(self, name: str) -> np.ndarray:
+        if self.rows == 0:
+            return np.empty(0, dtype=self.dtypes[name])
+
+        return np.memmap(
+            os.path.join(self.path, f"{self.columns.index(name)}.bin"),
+            dtype=self.dtypes[name],
+            mode="r",
+            shape=(self.rows,),
+        )
+
+    def matrix(self, columns: list[str], start: int, stop: int) -> np.ndarray:
+        # Copies rows [start, stop) of the columns into one float32 matrix
+        batch = np.empty((min(stop, self.rows) - start, len(columns)), np.float32)
+        for i, name in enumerate(columns):
+            batch[:, i] = self.column(name)[start:stop]
+
+        return batch
+
+    def frame(
+        self, columns: list[str], start: int = 0, stop: int = None
+    ) -> pd.DataFrame:
+        stop = self.rows if stop is None else stop
+        return pd.DataFrame(
+            {name: np.asarray(self.column(name)[start:stop]) for name in columns}
+        )
+
+    def mean(self, batch_rows: int = 1_000_000) -> pd.Series:
+        return self._moments(batch_rows)[0]
+
+    def std(self, batch_rows: int = 1_000_000) -> pd.Series:
+        return self._moments(batch_rows)[1]
+
+    def _moments(self, batch_rows: int) -> tuple[pd.Series, pd.Series]:
+        means, stds = dict(), dict()
+        for name in self.columns:
+            # Merges the count, mean and sum of squared deviations of every batch
+            count, mean, m2 = 0, 0.0, 0.0
+            column = self.column(name)
+            for start in range(0, self.rows, batch_rows):
+                values = column[start : start + batch_rows].astype(np.float64)
+                values = values[~np.isnan(values)]
+                if len(values) == 0:
+                    continue
+
+                batch_mean = values.mean()
+                delta = batch_mean - mean
+                total = count + len(values)
+                m2 += np.square(values - batch_mean).sum()
+                m2 += delta**2 * count * len(values) / total
+                mean += delta * len(values) / total
+                count = total
+
+            means[name] = mean if count else np.nan
+            # Sample standard deviation like pandas
+            stds[name] = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+
+        return pd.Series(means), pd.Series(stds)
+
+
+class ColumnStoreWriter:
+    """Appends batches of rows to the column files of a new ColumnStore."""
+
+    def __init__(self, path: str, dtypes: dict[str, str]):
+        self.path = path
+        self.dtypes = dtypes
+        self.rows = 0
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        self._files = {
+            name: open(os.path.join(path, f"{i}.bin"), "wb")
+            for i, name in enumerate(dtypes)
+        }
+
+    def append(self, batch: pd.DataFrame):
+        for name, dtype in self.dtypes.items():
+            batch[name].to_numpy(dtype=dtype, na_value=np.nan).tofile(self._files[name])
+        self.rows += len(batch)
+
+    def close(self) -> ColumnStore:
+        for f in self._files.values():
+            f.close()
+
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(
+                {
+                    "rows": self.rows,
+                    "columns": [
+                        [name, np.dtype(dtype).str]
+                        for name, dtype in self.dtypes.items()
+                    ],
+                },
+                f,
+            )
+        return ColumnStore(self.path)
+
+
+def write_split(
+    path: str,
+    batches: Iterable[pd.DataFrame],
+    labels: list[str],
+    is_test: Callable[[pd.DataFrame], np.ndarray],
+    drop: list[str] = (),
+) -> tuple[ColumnStore, ColumnStore, ColumnStore, ColumnStore]:
+    """
+    Streams batches of rows into X_train, X_test, y_train and y_test stores
+    under `path`, one batch at a time. `is_test` marks the test rows of a
+    batch and the `drop` columns are not stored.
+    """
+    writers = None
+    for batch in batches:
+        test = is_test(batch)
+        batch = batch.drop(columns=list(drop))
+        if writers is None:
+            features = [col for col in batch.columns if col not in labels]
+            writers = {
+                f"{name}_{split}": ColumnStoreWriter(
+                    os.path.join(path, f"{name}_{split}"),
+                    {col: "float32" for col in columns},
+                )
+                for name, columns in [("X", features), ("y", labels)]
+                for split in ["train", "test"]
+            }
+
+        for split, rows in [("train", batch[~test]), ("test", batch[test])]:
+            writers[f"X_{split}"].append(rows)
+            writers[f"y_{split}"].append(rows)
+
+    if writers is None:
+        raise ValueError("No rows to write")
+
+    stores = {key: writer.close() for key, writer in writers.items()}
+    return stores["X_train"], stores["X_test"], stores["y_train"], stores["y_test"]
+
+
+class ColumnStoreIter(xgb.DataIter):
+    """Feeds the features in `X` and the first label in `y` to xgboost in batches."""
+
+    def __init__(
+        self,
+        X: ColumnStore,
+        y: ColumnStore,
+        batch_rows: int = 65_536,
+        cache_prefix: str = None,
+    ):
+        self.X = X
+        self.y = y
+        self.starts = range(0, X.rows, batch_rows)
+        self.batch_rows = batch_rows
+        self._batch = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        if self._batch == len(self.starts):
+            return False
+
+        start = self.starts[self._batch]
+        stop = start + self.batch_rows
+        input_data(
+            data=self.X.matrix(self.X.columns, start, stop),
+            label=np.asarray(self.y.column(self.y.columns[0])[start:stop]),
+            feature_names=self.X.columns,
+        )
+        self._batch += 1
+        return True
+
+    def reset(self):
+        self._batch = 0
+
+
+def quantile_dmatrix(
+    X: ColumnStore, y: ColumnStore, batch_rows: int = 65_536, cache_dir: str = None
+) -> xgb.DMatrix:
+    """
+    Builds the histogram index xgboost trains on from the stores, batch by
+    batch. The index takes about a quarter of the memory of the float32
+    matrix; with `cache_dir` its pages are kept on disk instead.
+    """
+    if cache_dir is None:
+        return xgb.QuantileDMatrix(ColumnStoreIter(X, y, batch_rows), max_bin=256)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    iterator = ColumnStoreIter(
+        X, y, batch_rows, cache_prefix=os.path.join(cache_dir, "cache")
+    )
+    return xgb.ExtMemQuantileDMatrix(iterator, max_bin=256)
@@ -0,0 +1,135 @@
+import itertools
+from typing import Callable
+
+import pandas as pd
+
+from src.feature_view import get_label_encoder
+from src.shared_arrays import process_pool
+from src.trainer import Trainer, TrainingRun
+from src.utils import login, logout
+
+# (league, window size, test size, incremental, lag windows, lag aggregates)
+Job = tuple[str, int, float, bool, list[int], list[str]]
+
+
+def train_combination(
+    league: str,
+    window_size: int,
+    test_size: float,
+    incremental: bool,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> TrainingRun | None:
+    # Runs in a worker process or container, on the files written by `prepare`
+    trainer = Trainer(
+        league,
+        window_size,
+        test_size,
+        lag_windows=lag_windows,
+        lag_aggregates=lag_aggregates,
+    )
+    return trainer.train(incremental)
+
+
+def train_all(
+    leagues: list[str],
+    window_sizes: list[int],
+    test_size: float,
+    incremental: bool = False,
+    workers: int = None,
+    starmap: Callable[[list[Job]], list] = None,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> pd.DataFrame:
+    """
+    Trains a model for every league and window size and returns a summary of
+    the runs. Logging in, loading the transformation function, syncing the
+    snapshots and registering the models happen once here; the combinations
+    train in parallel in a process pool of `workers`, or with `starmap`, which
+    calls `train_combination` for every job elsewhere (e.g. a Modal function)
+    and returns the runs or exceptions in job order.
+
+    Without `lag_windows` every window size is read from the lags feature
+    group of only that window. With the `lag_windows` and `lag_aggregates`
+    of the ingestor, all window sizes are read from its one feature group and
+    must be among its windows.
+
+    A failing combination is reported and does not stop the others, an error
+    is raised once all combinations are done.
+    """
+    combinations = list(itertools.product(leagues, window_sizes))
+    project, fs = login()
+    label_encoder = get_label_encoder(fs)
+
+    trainers = [
+        Trainer(
+            league,
+            ws,
+            test_size,
+            lag_windows=lag_windows,
+            lag_aggregates=lag_aggregates,
+        )
+        for league, ws in combinations
+    ]
+    feature_views, results = dict(), dict()
+    for i, trainer in enumerate(trainers):
+        trainer.project, trainer.fs = project, fs
+        try:
+            feature_views[i] = trainer.prepare(label_encoder, incremental)
+        except Exception as e:
+            results[i] = e
+
+    jobs = [
+        (
+            trainers[i].league,
+            trainers[i].window_size,
+            test_size,
+            incremental,
+            trainers[i].lag_windows,
+            trainers[i].lag_aggregates,
+        )
+        for i in feature_views
+    ]
+    if starmap is None:
+        with process_pool({}, workers) as pool:
+            futures = [pool.submit(train_combination, *job) for job in jobs]
+            runs = [future.exception() or future.result() for future in futures]
+    else:
+        runs = starmap(jobs)
+    results.update(zip(feature_views, runs))
+
+    rows, failures = [], dict()
+    for i, trainer in enumerate(trainers):
+        run = results[i]
+        row = {"league": trainer.league, "window_size": trainer.window_size}
+        if isinstance(run, BaseException):
+            failures[trainer.model_name] = run
+            print(f"TRAIN [{trainer.model_name}]: Failed with {run!r}")
+            rows.append(row | {"status": "failed"})
+            continue
+        if run is None:
+            rows.append(row | {"status": "unchanged"})
+            continue
+
+        trainer.register(
+            feature_views[i], run.metrics, run.description, run.input_example
+        )
+        rows.append(
+            row
+            | {
+                "status": "incremental" if run.incremental else "full",
+                "fit_seconds": round(run.fit_seconds, 1),
+                "f1_score": round(run.metrics["f1_score"], 4),
+                "model_kb": round(run.model_bytes / 1024, 1),
+            }
+        )
+
+    logout()
+
+    summary = pd.DataFrame(rows)
+    print(summary.to_string(index=False))
+    if failures:
+        error = next(iter(failures.values()))
+        raise RuntimeError(f"Training failed for {sorted(failures)}") from error
+
+    return summary
@@ -1,41 +1,120 @@
 import pandas as pd
 
+from hsfs.feature_group import FeatureGroup
 from hsfs.feature_store import FeatureStore
 from hsfs.feature_view import FeatureView
-from hsfs.hopsworks_udf import udf
 
+from football_shared.lag_features import (
+    lag_columns,
+    lags_feature_group_name,
+    training_name,
+)
+
+from src.utils import udf
 
 FEATURE_VIEW_NAME = "football_train_view"
 FEATURE_VIEW_VERSION = 1
 
 
-def get_feature_view(league: str, window_size: int, fs: FeatureStore) -> FeatureView:
+def feature_view_name(
+    league: str,
+    window_size: int,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> str:
+    # Every league and window size has its own view, suffixed by the lag
+    # settings when its lags come from a feature group of several windows
+    return training_name(
+        FEATURE_VIEW_NAME, league, window_size, lag_windows, lag_aggregates
+    )
+
+
+def get_feature_view(
+    league: str,
+    window_size: int,
+    fs: FeatureStore,
+    label_encoder=None,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> FeatureView:
+    # `label_encoder` is only loaded with `get_label_encoder` when the view is created
     print("Fetching feature view...")
+    name = feature_view_name(league, window_size, lag_windows, lag_aggregates)
     try:
-        feature_view = fs.get_feature_view(
-            name=FEATURE_VIEW_NAME, version=FEATURE_VIEW_VERSION
-        )
+        feature_view = fs.get_feature_view(name=name, version=FEATURE_VIEW_VERSION)
     except Exception:
         print("Could not fetch feature view, creating a new feature view...")
-        feature_view = _create_feature_view(league, window_size, fs)
+        feature_view = _create_feature_view(
+            league, window_size, fs, label_encoder, lag_windows, lag_aggregates
+        )
 
     print("Fetched feature view")
     return feature_view
 
 
-def _create_feature_view(
-    league: str, window_size: int, fs: FeatureStore
-) -> FeatureView:
+def get_feature_groups(
+    league: str,
+    window_size: int,
+    fs: FeatureStore,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> tuple[FeatureGroup, FeatureGroup]:
+    # The main and lags feature groups joined by the feature view, the lags
+    # feature group is the one the ingestor writes for `lag_windows`
     main_fg = fs.get_feature_group(
         name=f"football_{league.lower()}",
         version=FEATURE_VIEW_VERSION,
     )
 
     lags_fg = fs.get_feature_group(
-        name=f"football_{league.lower()}_lags_{window_size}",
+        name=lags_feature_group_name(
+            league, lag_windows or [window_size], lag_aggregates
+        ),
         version=FEATURE_VIEW_VERSION,
     )
 
+    return main_fg, lags_fg
+
+
+def ou_transformation(value: pd.Series) -> pd.Series:
+    # At the top level of the module, so the local store can import it again
+    return value.apply(lambda x: int(x.lower() == "o") if not pd.isna(x) else pd.NA)
+
+
+def get_label_encoder(fs: FeatureStore):
+    try:
+        label_encoder = fs.get_transformation_function(
+            name="ou_transformation",
+            version=1,
+        )
+    except Exception:
+        # Our custom transformation does not exist yet
+        print("Creating transfromation function for O/U results")
+
+        label_encoder = fs.create_transformation_function(
+            transformation_function=udf(int, drop=["value"], mode="pandas")(
+                ou_transformation
+            ),
+            version=1,
+        )
+        label_encoder.save()
+
+    return label_encoder
+
+
+def _create_feature_view(
+    league: str,
+    window_size: int,
+    fs: FeatureStore,
+    label_encoder=None,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> FeatureView:
+    lag_windows = lag_windows or [window_size]
+    main_fg, lags_fg = get_feature_groups(
+        league, window_size, fs, lag_windows, lag_aggregates
+    )
+
     # Select features for training data
     selected_features = main_fg.select(
         [
@@ -52,34 +131,11 @@ def _create_feature_view(
             "league_under_percentage",
         ]
     ).join(
-        lags_fg.select_except(
-            [
-                "datetime",
-                "hometeam",
-                "awayteam",
-            ]
-        )
+        # Only the lags and aggregates of the window the model is trained on
+        lags_fg.select(lag_columns(lag_windows, lag_aggregates, window=window_size))
     )
-    try:
-        label_encoder = fs.get_transformation_function(
-            name="ou_transformation",
-            version=1,
-        )
-    except Exception:
-        # Our custom transformation does not exist yet
-        print("Creating transfromation function for O/U results")
-
-        @udf(int, drop=["value"], mode="pandas")
-        def ou_transformation(value: pd.Series) -> pd.Series:
-            return value.apply(
-                lambda x: int(x.lower() == "o") if not pd.isna(x) else pd.NA
-            )
-
-        label_encoder = fs.create_transformation_function(
-            transformation_function=ou_transformation,
-            version=1,
-        )
-        label_encoder.save()
+    if label_encoder is None:
+        label_encoder = get_label_encoder(fs)
 
     # Map features to transformations.
     transformation_functions = [
@@ -88,7 +144,7 @@ def _create_feature_view(
 
     # Get or create the 'transactions_view' feature view
     feature_view = fs.get_or_create_feature_view(
-        name=FEATURE_VIEW_NAME,
+        name=feature_view_name(league, window_size, lag_windows, lag_aggregates),
         version=FEATURE_VIEW_VERSION,
         query=selected_features,
         labels=["ftour"],
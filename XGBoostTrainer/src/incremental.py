@@ -0,0 +1,118 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from hsml.model_registry import ModelRegistry
+
+from football_shared.lag_features import training_name
+from football_shared.trees import TREES_FILE, TreeEnsemble, export_trees
+
+MODEL_NAME = "football_xgboost"
+# Native XGBoost format, models saved before it are pickled classifiers
+MODEL_FILE = "xgboost_model.ubj"
+PICKLE_FILE = "xgboost_model.pkl"
+META_FILE = "training_meta.json"
+# Largest difference to the xgboost probabilities allowed for the exported trees
+TREES_TOLERANCE = 1e-6
+
+
+def model_name(
+    league: str,
+    window_size: int,
+    lag_windows: list[int] = None,
+    lag_aggregates: list[str] = (),
+) -> str:
+    # Every league, window size and lag settings are registered as their own model
+    return training_name(MODEL_NAME, league, window_size, lag_windows, lag_aggregates)
+
+
+def training_meta(
+    watermark: pd.Timestamp, X_train: pd.DataFrame, previous: dict = None
+) -> dict:
+    """
+    Metadata saved next to the model. The watermark is the newest event time
+    of the training data, later runs only add rows after it. The feature
+    statistics of the last full retrain are kept through incremental updates,
+    so drift is measured against the data the first trees were built on.
+    """
+    if previous is None:
+        return {
+            "watermark": watermark.isoformat(),
+            "features": list(X_train.columns),
+            "feature_means": X_train.mean().to_dict(),
+            "feature_stds": X_train.std().to_dict(),
+            "incremental_updates": 0,
+        }
+
+    return previous | {
+        "watermark": watermark.isoformat(),
+        "incremental_updates": previous["incremental_updates"] + 1,
+    }
+
+
+def save_model(
+    model_dir: str, clf: xgb.XGBClassifier, meta: dict, X_check: pd.DataFrame
+):
+    """
+    Saves the classifier in the native format with its metadata. The native
+    format only holds the trees, so the parameters are kept in the metadata
+    for the rounds added by later incremental runs. The trees are also
+    exported for the numpy evaluator, which must score `X_check` like xgboost.
+    """
+    clf.save_model(os.path.join(model_dir, MODEL_FILE))
+
+    trees_path = os.path.join(model_dir, TREES_FILE)
+    export_trees(clf.get_booster(), trees_path)
+    difference = np.abs(
+        TreeEnsemble(trees_path).predict_proba(X_check[clf.feature_names_in_])
+        - clf.predict_proba(X_check[clf.feature_names_in_])[:, 1]
+    ).max(initial=0.0)
+    if difference > TREES_TOLERANCE:
+        raise ValueError(f"Exported trees differ from xgboost by {difference}")
+
+    params = {k: v for k, v in clf.get_xgb_params().items() if v is not None}
+    with open(os.path.join(model_dir, META_FILE), "w") as f:
+        json.dump(meta | {"params": params}, f, indent=2)
+
+
+def feature_drift(meta: dict, X_new: pd.DataFrame) -> float:
+    # Largest shift of a feature mean, in standard deviations of the reference data
+    means = pd.Series(meta["feature_means"], dtype=float)
+    stds = pd.Series(meta["feature_stds"], dtype=float)
+    shift = (X_new[means.index].mean() - means).abs() / stds.where(stds > 0)
+
+    return float(shift.max()) if shift.notna().any() else 0.0
+
+
+def download_best_model(
+    mr: ModelRegistry, name: str, download_dir: str, metric: str = "f1_score"
+) -> str | None:
+    """
+    Downloads the model named `name` with the highest `metric`, the one the
+    predictor loads, to `download_dir` and returns its path, or None when
+    there is no such model.
+    """
+    best_model = mr.get_best_model(name, metric, "max")
+    if best_model is None:
+        return None
+
+    return best_model.download(download_dir)
+
+
+def load_model_dir(model_path: str) -> tuple[xgb.XGBClassifier, dict] | None:
+    # Returns None when there is no model or it was saved without metadata
+    if not os.path.exists(os.path.join(model_path, META_FILE)):
+        return None
+
+    with open(os.path.join(model_path, META_FILE), "r") as f:
+        meta = json.load(f)
+
+    if not os.path.exists(os.path.join(model_path, MODEL_FILE)):
+        return joblib.load(os.path.join(model_path, PICKLE_FILE)), meta
+
+    clf = xgb.XGBClassifier(**meta.get("params", dict()))
+    clf.load_model(os.path.join(model_path, MODEL_FILE))
+    return clf, meta
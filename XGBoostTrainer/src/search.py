@@ -0,0 +1,188 @@
+import time
+from concurrent.futures import wait
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.shared_arrays import SharedArray, process_pool, worker_arrays
+
+# Used by every trial, "hist" bins the features once instead of sorting them per split
+BASE_PARAMS = {"tree_method": "hist", "eval_metric": "logloss"}
+
+
+@dataclass
+class SearchResult:
+    params: dict
+    n_estimators: int
+    validation_logloss: float
+    # One row per trial and rung
+    trials: pd.DataFrame
+
+
+def sample_params(rng: np.random.Generator) -> dict:
+    return {
+        "max_depth": int(rng.integers(2, 9)),
+        "learning_rate": float(10 ** rng.uniform(-2.5, -0.5)),
+        "subsample": float(rng.uniform(0.5, 1.0)),
+        "colsample_bytree": float(rng.uniform(0.3, 1.0)),
+        "min_child_weight": float(10 ** rng.uniform(0, 1.5)),
+        "reg_lambda": float(10 ** rng.uniform(-1, 1)),
+    }
+
+
+class _Deadline(xgb.callback.TrainingCallback):
+    # Stops boosting once time.time() passes `deadline`. It is checked before a
+    # round, after early stopping scored the previous one, and at least one
+    # round is always trained so the trial has a best round
+    def __init__(self, deadline: float):
+        super().__init__()
+        self.deadline = deadline
+        self.reached = False
+
+    def before_iteration(self, model, epoch, evals_log) -> bool:
+        self.reached = epoch > 0 and time.time() >= self.deadline
+        return self.reached
+
+
+def _run_trial(
+    params: dict,
+    rounds: int,
+    early_stopping_rounds: int,
+    train_end: int,
+    threads: int,
+    deadline: float | None,
+) -> dict:
+    X, y = worker_arrays["X"], worker_arrays["y"]
+    start = time.perf_counter()
+
+    callbacks = [] if deadline is None else [_Deadline(deadline)]
+    clf = xgb.XGBClassifier(
+        **BASE_PARAMS,
+        **params,
+        n_estimators=rounds,
+        early_stopping_rounds=early_stopping_rounds,
+        n_jobs=threads,
+        callbacks=callbacks,
+    )
+    clf.fit(
+        X[:train_end],
+        y[:train_end],
+        eval_set=[(X[train_end:], y[train_end:])],
+        verbose=False,
+    )
+
+    return {
+        "validation_logloss": float(clf.best_score),
+        "best_iteration": int(clf.best_iteration),
+        "seconds": time.perf_counter() - start,
+        "out_of_time": bool(callbacks and callbacks[0].reached),
+    }
+
+
+def hyperparameter_search(
+    X: pd.DataFrame,
+    y: pd.DataFrame,
+    validation_size: float = 0.2,
+    max_trials: int = 27,
+    time_budget: float = None,
+    min_rounds: int = 50,
+    max_rounds: int = 1000,
+    eta: int = 3,
+    early_stopping_rounds: int = 25,
+    workers: int = None,
+    threads_per_trial: int = 1,
+    seed: int = 0,
+) -> SearchResult:
+    """
+    Successive halving over `max_trials` random configurations. The rows must
+    be sorted by time, the last `validation_size` of them are the validation
+    slice. Every rung trains the remaining configurations with up to `eta`
+    times more boosting rounds than the previous one, stopping early when the
+    validation log loss does not improve, and keeps the best 1 / `eta` of
+    them. Trials run in a process pool; after `time_budget` seconds the trials
+    that have not started are cancelled, running trials stop boosting and keep
+    their best round so far, and the best trial of the last rung reached wins.
+    """
+    train_end = int(len(X) * (1 - validation_size))
+    if train_end == 0 or train_end == len(X):
+        raise ValueError(f"validation_size={validation_size} leaves an empty slice")
+
+    rng = np.random.default_rng(seed)
+    configs = [sample_params(rng) for _ in range(max_trials)]
+    # Wall clock time, the trials check it in the worker processes
+    deadline = None if time_budget is None else time.time() + time_budget
+
+    arrays = {
+        "X": SharedArray(X.to_numpy(dtype=np.float32)),
+        "y": SharedArray(np.asarray(y, dtype=np.int32).ravel()),
+    }
+
+    records = []
+    survivors, rounds, rung = list(range(max_trials)), min_rounds, 0
+    try:
+        with process_pool(arrays, workers) as pool:
+            while True:
+                futures = {
+                    pool.submit(
+                        _run_trial,
+                        configs[trial],
+                        rounds,
+                        early_stopping_rounds,
+                        train_end,
+                        threads_per_trial,
+                        deadline,
+                    ): trial
+                    for trial in survivors
+                }
+
+                timeout = None
+                if deadline is not None:
+                    timeout = max(deadline - time.time(), 0)
+                _, pending = wait(futures, timeout=timeout)
+
+                # Out of time, trials that already started stop at their next
+                # boosting round and count with their best round so far
+                for future in pending:
+                    future.cancel()
+                out_of_time = deadline is not None and time.time() >= deadline
+
+                finished = [
+                    {"trial": futures[future], "rung": rung, "rounds": rounds}
+                    | future.result()
+                    for future in futures
+                    if not future.cancelled()
+                ]
+                records.extend(finished)
+                if finished:
+                    best = min(r["validation_logloss"] for r in finished)
+                    print(
+                        f"SEARCH: rung {rung} finished {len(finished)}/{len(survivors)} trials with {rounds} rounds, best log loss {best:.4f}"
+                    )
+                if out_of_time or rounds >= max_rounds or len(finished) <= 1:
+                    break
+
+                finished.sort(key=lambda r: r["validation_logloss"])
+                survivors = [
+                    r["trial"] for r in finished[: max(len(finished) // eta, 1)]
+                ]
+                rounds, rung = min(rounds * eta, max_rounds), rung + 1
+    finally:
+        for array in arrays.values():
+            array.release()
+
+    if not records:
+        raise RuntimeError(f"No trial finished within {time_budget}s")
+
+    trials = pd.DataFrame(records)
+    last_rung = trials[trials["rung"] == trials["rung"].max()]
+    best = last_rung.loc[last_rung["validation_logloss"].idxmin()]
+    trials = trials.join(pd.DataFrame(configs), on="trial")
+
+    return SearchResult(
+        params=configs[int(best["trial"])],
+        n_estimators=int(best["best_iteration"]) + 1,
+        validation_logloss=float(best["validation_logloss"]),
+        trials=trials,
+    )
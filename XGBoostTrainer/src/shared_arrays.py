@@ -0,0 +1,49 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+class SharedArray:
+    """A numpy array in shared memory that worker processes attach to by name."""
+
+    def __init__(self, array: np.ndarray):
+        self._shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.spec = (self._shm.name, array.shape, array.dtype.str)
+        np.ndarray(array.shape, array.dtype, buffer=self._shm.buf)[:] = array
+
+    @staticmethod
+    def attach(spec) -> tuple[SharedMemory, np.ndarray]:
+        name, shape, dtype = spec
+        shm = SharedMemory(name=name)
+        return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+    def release(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+# Arrays attached by every worker process once
+worker_arrays: dict[str, np.ndarray] = dict()
+_worker_memory: list[SharedMemory] = []
+
+
+def _init_worker(specs: dict):
+    for key, spec in specs.items():
+        shm, array = SharedArray.attach(spec)
+        _worker_memory.append(shm)
+        worker_arrays[key] = array
+
+
+def process_pool(arrays: dict[str, SharedArray], workers: int = None):
+    """
+    A process pool whose workers find `arrays` by key in `worker_arrays`.
+    Spawned workers do not inherit the OpenMP state of this process.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=({key: array.spec for key, array in arrays.items()},),
+    )
@@ -0,0 +1,228 @@
+import glob
+import json
+import os
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from hsfs.feature_group import FeatureGroup
+from hsfs.feature_view import FeatureView
+
+PRIMARY_KEY = ["datetime", "hometeam", "awayteam"]
+# Rows per part file, parts only split between event times
+PART_ROWS = 100_000
+
+
+def _utc_naive(datetimes: pd.Series) -> pd.Series:
+    # The feature store may return tz-aware event times
+    return pd.to_datetime(datetimes, utc=True).dt.tz_localize(None)
+
+
+def event_times(fg: FeatureGroup) -> pd.Series:
+    # Only reads the event time column
+    return _utc_naive(fg.select(["datetime"]).read()["datetime"])
+
+
+def rows_until(times: pd.Series, watermark: pd.Timestamp | None) -> int:
+    return int((times <= watermark).sum()) if watermark is not None else 0
+
+
+def test_mask(df: pd.DataFrame, test_size: float, seed: int = 0) -> np.ndarray:
+    """
+    Marks the test rows by a seeded hash of their primary key, so the split
+    does not depend on the order of the rows and rows stay in their split
+    when new rows are added.
+    """
+    hashes = pd.util.hash_pandas_object(
+        df[PRIMARY_KEY], index=False, hash_key=f"{seed:016d}"
+    ).to_numpy()
+    return (hashes % np.uint64(1_000_000)) < test_size * 1_000_000
+
+
+class TrainingSnapshot:
+    """
+    A local copy of the training data of a feature view in
+
+        <root>/<feature view name>_<version>/part-<n>.parquet
+
+    Parts hold the rows in primary key order, so the newest rows are in the
+    last part. The watermark of the snapshot is the oldest of the newest
+    event times of the feature groups joined by the view, so rows whose lags
+    are not in the feature store yet are not cached. Updating the snapshot
+    only fetches the rows from the watermark on, in windows of `fetch_days`,
+    so no more than a window and a part are held in memory. The number of
+    rows up to the watermark in every feature group is kept too, and when it
+    changed, e.g. after a backfill of older seasons or a lag rebuild, all
+    rows are fetched again.
+    """
+
+    def __init__(self, root: str, name: str, version: int, fetch_days: int = 365):
+        self.path = os.path.join(root, f"{name}_{version}")
+        self.meta_path = os.path.join(self.path, "meta.json")
+        self.fetch_window = pd.Timedelta(days=fetch_days)
+
+    def load_meta(self) -> dict | None:
+        if not os.path.exists(self.meta_path):
+            return None
+
+        # Snapshots from before the parts were a single data.parquet
+        legacy_path = os.path.join(self.path, "data.parquet")
+        if os.path.exists(legacy_path):
+            os.replace(legacy_path, self._part_path(0))
+
+        with open(self.meta_path, "r") as f:
+            return json.load(f)
+
+    def parts(self) -> list[str]:
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def read(self) -> pd.DataFrame:
+        return pd.concat(
+            [pd.read_parquet(part) for part in self.parts()], ignore_index=True
+        )
+
+    def batches(
+        self, batch_rows: int = 65_536, columns: list[str] = None
+    ) -> Iterator[pd.DataFrame]:
+        for part in self.parts():
+            for batch in pq.ParquetFile(part).iter_batches(batch_rows, columns=columns):
+                yield batch.to_pandas()
+
+    def sync(
+        self,
+        feature_view: FeatureView,
+        feature_groups: list[FeatureGroup],
+        refresh: bool = False,
+    ) -> list[str]:
+        """
+        Fetches the rows newer than the watermark of the snapshot and returns
+        the names of the label columns. Fetches all rows when `refresh` is
+        set or rows older than the watermark were added to the feature groups.
+        """
+        times = {fg.name: event_times(fg) for fg in feature_groups}
+        meta = None if refresh else self.load_meta()
+        if meta is not None and "rows" not in meta:
+            print("Snapshot has no row counts yet, fetching all training data again")
+            meta = None
+        elif meta is not None and meta["rows"] != {
+            name: rows_until(t, pd.Timestamp(meta["watermark"]))
+            for name, t in times.items()
+        }:
+            print(
+                "Feature groups have new rows older than the snapshot watermark,"
+                " fetching all training data again"
+            )
+            meta = None
+        if meta is None:
+            for part in self.parts():
+                os.remove(part)
+        since = pd.Timestamp(meta["watermark"]) if meta else None
+
+        watermark = min(t.max() for t in times.values())
+        rows = {name: rows_until(t, watermark) for name, t in times.items()}
+        if meta and watermark == since:
+            print(f"Training data is up to date to {watermark}")
+            return meta["labels"]
+
+        # Rows at the watermark are fetched again as they may have been incomplete
+        start = since if since is not None else min(t.min() for t in times.values())
+        labels, fetched = meta["labels"] if meta else None, 0
+        versions = training_dataset_versions(feature_view)
+        while start <= watermark:
+            end = start + self.fetch_window
+            X, y = feature_view.training_data(
+                start_time=start,
+                end_time=min(end, watermark + pd.Timedelta(seconds=1)),
+                description="football training dataset",
+            )
+            window = pd.concat([X, y], axis=1)
+            window["datetime"] = _utc_naive(window["datetime"])
+            window = window[
+                (window["datetime"] >= start)
+                & (window["datetime"] < end)
+                & (window["datetime"] <= watermark)
+            ]
+            labels = list(y.columns)
+
+            if len(window):
+                self._append(window)
+                fetched += len(window)
+            start = end
+
+        delete_training_datasets(
+            feature_view, training_dataset_versions(feature_view) - versions
+        )
+        print(f"Fetched {fetched} rows up to {watermark}")
+        self._save_meta(labels, watermark, rows)
+        return labels
+
+    def _append(self, rows: pd.DataFrame):
+        # New rows are merged into the last part, which holds the newest rows
+        parts = self.parts()
+        first = max(len(parts) - 1, 0)
+        if parts:
+            rows = pd.concat([pd.read_parquet(parts[-1]), rows])
+
+        rows = (
+            rows.drop_duplicates(PRIMARY_KEY, keep="last")
+            .sort_values(PRIMARY_KEY)
+            .reset_index(drop=True)
+        )
+
+        # Split after PART_ROWS rows, at the next change of event time
+        changes = np.flatnonzero(
+            rows["datetime"].diff().to_numpy() != np.timedelta64(0)
+        )
+        bounds = [0]
+        for change in changes:
+            if change - bounds[-1] >= PART_ROWS:
+                bounds.append(change)
+        bounds.append(len(rows))
+
+        os.makedirs(self.path, exist_ok=True)
+        for i, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+            # Write to a temporary file first so a crash never leaves a partial part
+            path = self._part_path(first + i)
+            rows.iloc[lo:hi].to_parquet(f"{path}.tmp", index=False)
+            os.replace(f"{path}.tmp", path)
+
+    def _save_meta(
+        self, labels: list[str], watermark: pd.Timestamp, rows: dict[str, int]
+    ):
+        with open(f"{self.meta_path}.tmp", "w") as f:
+            json.dump(
+                {"labels": labels, "watermark": watermark.isoformat(), "rows": rows}, f
+            )
+        os.replace(f"{self.meta_path}.tmp", self.meta_path)
+
+    def _part_path(self, index: int) -> str:
+        return os.path.join(self.path, f"part-{index:05d}.parquet")
+
+
+def training_dataset_versions(feature_view: FeatureView) -> set[int]:
+    # Hopsworks registers a training dataset version for every training_data call
+    try:
+        return {td.version for td in feature_view.get_training_datasets()}
+    except Exception:
+        # The local store does not register training datasets
+        return set()
+
+
+def delete_training_datasets(feature_view: FeatureView, versions: set[int]):
+    # The fetched windows are kept in the snapshot, not as training datasets
+    for version in sorted(versions):
+        try:
+            feature_view.delete_training_dataset(training_dataset_version=version)
+        except Exception as e:
+            print(f"Could not delete training dataset version {version}: {e!r}")
+
+
+def split_train_test(
+    df: pd.DataFrame, labels: list[str], test_size: float, seed: int = 0
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    # Splits by `test_mask`
+    test = test_mask(df, test_size, seed)
+
+    X, y = df.drop(columns=labels), df[labels]
+    return X[~test], X[test], y[~test], y[test]
@@ -1,59 +1,466 @@
+import json
 import os
-import joblib
-import matplotlib.pyplot as plt
+import shutil
+import time
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 import seaborn as sns
 import xgboost as xgb
 from hsfs.feature_view import FeatureView
+from matplotlib.figure import Figure
 from hsml.model_registry import ModelRegistry
 from sklearn.metrics import confusion_matrix
 from sklearn.metrics import f1_score
 
-from src.feature_view import get_feature_view
-from src.utils import login, logout
+from football_shared.lag_features import legacy_training_name
+
+from src.column_store import ColumnStore, quantile_dmatrix, write_split
+from src.feature_view import (
+    FEATURE_VIEW_VERSION,
+    feature_view_name,
+    get_feature_groups,
+    get_feature_view,
+)
+from src.incremental import (
+    MODEL_FILE,
+    MODEL_NAME,
+    download_best_model,
+    feature_drift,
+    load_model_dir,
+    model_name,
+    save_model,
+    training_meta,
+)
+from src.search import BASE_PARAMS, SearchResult, hyperparameter_search
+from src.snapshot import TrainingSnapshot, split_train_test, test_mask
+from src.utils import login, logout, report_peak_memory
+from src.walk_forward import summarize, walk_forward
+
+
+@dataclass
+class TrainingRun:
+    # A model written to the model directory by `Trainer.train`, not registered yet
+    league: str
+    window_size: int
+    incremental: bool
+    metrics: dict
+    description: str
+    input_example: pd.Series
+    fit_seconds: float
+    model_bytes: int
 
 
 class Trainer:
-    def __init__(self, league, window_size, test_size):
+    def __init__(
+        self,
+        league,
+        window_size,
+        test_size,
+        split_seed=0,
+        refresh_snapshot=False,
+        lag_windows=None,
+        lag_aggregates=(),
+    ):
         self.league = league
         self.window_size = window_size
         self.test_size = test_size
+        self.split_seed = split_seed
+        self.refresh_snapshot = refresh_snapshot
+        # The lag settings of the ingestor, the lags feature group has every
+        # window in `lag_windows` and the model trains on `window_size` of them
+        self.lag_windows = sorted(lag_windows or [window_size])
+        self.lag_aggregates = list(lag_aggregates)
+        self.model_name = model_name(
+            league, window_size, self.lag_windows, self.lag_aggregates
+        )
 
-        self.model_dir = "football_model"
+        # Every model has its own directories, so they can train at once
+        self.run_dir = os.path.join(
+            "training_runs", self.model_name.removeprefix(f"{MODEL_NAME}_")
+        )
+        self.model_dir = os.path.join(self.run_dir, "model")
+        self.snapshot_dir = "training_snapshots"
+        self.previous_model_dir = os.path.join(self.run_dir, "previous_model")
+        self.column_store_dir = os.path.join(self.run_dir, "column_stores")
         self.images_dir = os.path.join(self.model_dir, "images")
         self._setup_folders()
 
     def fit(self):
         self.project, self.fs = login()
 
+        feature_view = self.prepare()
+        run = self.train()
+        self.register(feature_view, run.metrics, run.description, run.input_example)
+        print("Model saved")
+
+        logout()
+
+    def prepare(self, label_encoder=None, incremental=False) -> FeatureView:
+        """
+        The steps of a run that need the feature store, after logging in:
+        syncs the training snapshot and, for incremental runs, downloads the
+        best model. `train` then only reads local files.
+        """
+        print("Retrieving data...")
+        feature_view, _, _ = self._sync_snapshot(label_encoder)
+
+        shutil.rmtree(self.previous_model_dir, ignore_errors=True)
+        if incremental:
+            mr: ModelRegistry = self.project.get_model_registry()
+            path = download_best_model(mr, self.model_name, self.previous_model_dir)
+
+            # The first run after the rename continues the legacy model
+            legacy_name = legacy_training_name(
+                MODEL_NAME,
+                self.league,
+                self.window_size,
+                self.lag_windows,
+                self.lag_aggregates,
+            )
+            if path is None and legacy_name is not None:
+                print(f"No model {self.model_name} yet, continuing {legacy_name}")
+                download_best_model(mr, legacy_name, self.previous_model_dir)
+
+        return feature_view
+
+    def fit_out_of_core(self, batch_rows=65_536, external_memory=False):
+        """
+        Trains like `fit` without loading the training data into memory. The
+        snapshot is streamed into memory-mapped column stores, which xgboost
+        reads in batches of `batch_rows` to build its histogram index, kept
+        on disk too with `external_memory`.
+        """
+        self.project, self.fs = login()
+
+        print("Retrieving data...")
+        X_train, X_test, y_train, y_test, feature_view = self._get_column_stores(
+            batch_rows
+        )
+        print(f"Data retrieved, {X_train.rows} training rows")
+        report_peak_memory("retrieving data")
+
+        print("Fitting classifier...")
+        dtrain = quantile_dmatrix(
+            X_train,
+            y_train,
+            batch_rows,
+            os.path.join(self.column_store_dir, "cache") if external_memory else None,
+        )
+
+        # The defaults of the classifier in `fit`, trained on the histogram index
+        clf = xgb.XGBClassifier()
+        params = {k: v for k, v in clf.get_xgb_params().items() if v is not None}
+        booster = xgb.train(params, dtrain, num_boost_round=clf.n_estimators or 100)
+        clf.load_model(bytearray(booster.save_raw("ubj")))
+        del dtrain
+        print("Classifier fit")
+        report_peak_memory("fitting")
+
+        # Predict the test rows batch by batch, the model keeps a sample of them
+        y_pred_test = np.concatenate(
+            [
+                booster.inplace_predict(
+                    X_test.matrix(X_test.columns, start, start + batch_rows)
+                )
+                > 0.5
+                for start in range(0, X_test.rows, batch_rows)
+            ]
+            or [np.empty(0, dtype=bool)]
+        ).astype(np.int32)
+
+        print("Saving model...")
+        meta = training_meta(self.watermark, X_train)
+        self._save_model(
+            clf,
+            feature_view,
+            X_test.frame(X_test.columns, stop=1000),
+            np.asarray(y_test.column(y_test.columns[0])).astype(np.int32),
+            meta,
+            y_pred_test=y_pred_test,
+        )
+        print("Model saved")
+        report_peak_memory("saving")
+
+        logout()
+
+    def fit_incremental(self, rounds=20, max_drift=1.0, max_f1_drop=0.02):
+        """
+        Adds `rounds` boosting rounds, trained on the rows newer than the
+        watermark of the best model, to that model. Falls back to a full
+        retrain when there is no model with a watermark, the features
+        changed, the mean of a feature in the new rows moved more than
+        `max_drift` standard deviations or the test F1 score dropped by more
+        than `max_f1_drop`.
+        """
+        self.project, self.fs = login()
+
+        feature_view = self.prepare(incremental=True)
+        run = self.train(True, rounds, max_drift, max_f1_drop)
+        if run is not None:
+            self.register(feature_view, run.metrics, run.description, run.input_example)
+            print("Model saved")
+
+        logout()
+
+    def train(
+        self, incremental=False, rounds=20, max_drift=1.0, max_f1_drop=0.02
+    ) -> TrainingRun | None:
+        """
+        Trains on the snapshot synced by `prepare` and writes the model to
+        `model_dir`, without a feature store connection. Incremental runs
+        add rounds to the model downloaded by `prepare` like
+        `fit_incremental`, and return None when there are no new rows.
+        """
+        df, labels = self._read_snapshot()
+        X_train, X_test, y_train, y_test = self._split_data(df, labels)
+        print("Data retrieved")
+        report_peak_memory("retrieving data")
+
+        start = time.perf_counter()
+        previous = load_model_dir(self.previous_model_dir) if incremental else None
+        clf = None
+        if incremental and previous is None:
+            print("Full retrain: no previous model with a training watermark")
+        elif previous is not None:
+            previous_clf, meta = previous
+            new_rows = df[df["datetime"] > pd.Timestamp(meta["watermark"])]
+
+            # The split is by row, so new rows land in the same split as in X_train
+            X_new, _, y_new, _ = self._split_data(new_rows, labels)
+            if len(X_new) == 0:
+                print(f"No training rows after {meta['watermark']}, keeping the model")
+                return None
+
+            clf = self._warm_start(
+                previous_clf,
+                meta,
+                X_new,
+                y_new,
+                X_test,
+                y_test,
+                rounds,
+                max_drift,
+                max_f1_drop,
+            )
+
+        if clf is None:
+            clf = xgb.XGBClassifier()
+
+            print("Fitting classifier...")
+            clf.fit(X_train, y_train)
+            print("Classifier fit")
+            meta = training_meta(self.watermark, X_train)
+        else:
+            meta = training_meta(self.watermark, X_train, previous=meta)
+        fit_seconds = time.perf_counter() - start
+        report_peak_memory("fitting")
+
+        print("Saving model...")
+        metrics, description = self._write_model(clf, X_test, y_test, meta)
+        return TrainingRun(
+            league=self.league,
+            window_size=self.window_size,
+            incremental=meta["incremental_updates"] > 0,
+            metrics=metrics,
+            description=description,
+            input_example=X_test.iloc[0],
+            fit_seconds=fit_seconds,
+            model_bytes=os.path.getsize(os.path.join(self.model_dir, MODEL_FILE)),
+        )
+
+    def register(
+        self,
+        feature_view: FeatureView,
+        metrics: dict,
+        description: str,
+        input_example: pd.Series,
+    ):
+        # Uploads the model written to `model_dir` to the model registry
+        mr: ModelRegistry = self.project.get_model_registry()
+
+        football_model = mr.python.create_model(
+            name=self.model_name,
+            metrics=metrics,
+            feature_view=feature_view,
+            input_example=input_example,
+            description=description,
+        )
+
+        # Save the model to the specified directory
+        football_model.save(self.model_dir)
+
+    def search(
+        self,
+        max_trials=27,
+        time_budget=None,
+        validation_size=0.2,
+        workers=None,
+        threads_per_trial=1,
+        seed=0,
+    ):
+        """
+        Tunes the classifier with a budgeted successive halving search on the
+        latest `validation_size` of the training rows, refits the best
+        configuration on all training rows and saves it like `fit`.
+        """
+        self.project, self.fs = login()
+
         print("Retrieving data...")
         X_train, X_test, y_train, y_test, feature_view = self._get_data()
         print("Data retrieved")
+        report_peak_memory("retrieving data")
 
-        # Create an XGBoost classifier
-        clf = xgb.XGBClassifier()
+        # The training rows are sorted by time, so the validation slice holds the latest matches
+        print("Searching hyperparameters...")
+        result = hyperparameter_search(
+            X_train,
+            y_train,
+            validation_size=validation_size,
+            max_trials=max_trials,
+            time_budget=time_budget,
+            workers=workers,
+            threads_per_trial=threads_per_trial,
+            seed=seed,
+        )
+        print(f"Best parameters {result.params} with {result.n_estimators} rounds")
+
+        clf = xgb.XGBClassifier(
+            **BASE_PARAMS, **result.params, n_estimators=result.n_estimators
+        )
 
-        # Fit XGBoost classifier to the training data
         print("Fitting classifier...")
         clf.fit(X_train, y_train)
         print("Classifier fit")
+        report_peak_memory("fitting")
 
         print("Saving model...")
-        self._save_model(clf, feature_view, X_test, y_test)
+        meta = training_meta(self.watermark, X_train)
+        self._save_model(clf, feature_view, X_test, y_test, meta, search=result)
         print("Model saved")
 
         logout()
 
-    def _save_model(self, clf, feature_view, X_test, y_test):
-        # Predict the test data using the trained classifier
-        y_pred_test = clf.predict(X_test)
+    def evaluate_walk_forward(
+        self,
+        min_train_weeks=52,
+        test_weeks=4,
+        step_weeks=4,
+        workers=None,
+        threads_per_fold=1,
+    ) -> pd.DataFrame:
+        """
+        Trains on all matches before a cutoff and tests on the following
+        matchweeks, for cutoffs every `step_weeks` matchweeks, and reports
+        the F1 score and betting ROI of every fold.
+        """
+        self.project, self.fs = login()
+
+        print("Retrieving data...")
+        df, labels, _ = self._get_training_frame()
+        print("Data retrieved")
 
-        # Save the trained XGBoost classifier to a joblib file in the specified directory
-        joblib.dump(clf, os.path.join(self.model_dir, "xgboost_model.pkl"))
+        print("Evaluating folds...")
+        results = walk_forward(
+            df,
+            labels,
+            min_train_weeks=min_train_weeks,
+            test_weeks=test_weeks,
+            step_weeks=step_weeks,
+            workers=workers,
+            threads_per_fold=threads_per_fold,
+        )
+        print(results.to_string(index=False))
+        print(summarize(results))
+
+        logout()
+        return results
+
+    def _warm_start(
+        self,
+        previous_clf: xgb.XGBClassifier,
+        meta: dict,
+        X_new: pd.DataFrame,
+        y_new: pd.DataFrame,
+        X_test: pd.DataFrame,
+        y_test: pd.DataFrame,
+        rounds: int,
+        max_drift: float,
+        max_f1_drop: float,
+    ) -> xgb.XGBClassifier | None:
+        # Returns None when the previous model should be retrained from scratch
+        if meta["features"] != list(X_new.columns):
+            print("Full retrain: the features changed")
+            return None
+
+        drift = feature_drift(meta, X_new)
+        if drift > max_drift:
+            print(f"Full retrain: feature drift {drift:.2f} is above {max_drift}")
+            return None
+
+        print(f"Adding boosting rounds on {len(X_new)} new rows...")
+        clf = xgb.XGBClassifier(**previous_clf.get_params())
+        clf.set_params(n_estimators=rounds)
+        clf.fit(X_new, y_new, xgb_model=previous_clf.get_booster())
+
+        previous_f1 = f1_score(y_test, previous_clf.predict(X_test), average="macro")
+        updated_f1 = f1_score(y_test, clf.predict(X_test), average="macro")
+        print(f"Test F1 score {previous_f1:.4f} -> {updated_f1:.4f}")
+        if updated_f1 < previous_f1 - max_f1_drop:
+            print(f"Full retrain: F1 score dropped more than {max_f1_drop}")
+            return None
+
+        return clf
+
+    def _save_model(
+        self,
+        clf,
+        feature_view,
+        X_test,
+        y_test,
+        meta: dict,
+        search: SearchResult = None,
+        y_pred_test=None,
+    ):
+        metrics, description = self._write_model(
+            clf, X_test, y_test, meta, search, y_pred_test
+        )
+        self.register(feature_view, metrics, description, X_test.iloc[0])
+
+    def _write_model(
+        self,
+        clf,
+        X_test,
+        y_test,
+        meta: dict,
+        search: SearchResult = None,
+        y_pred_test=None,
+    ) -> tuple[dict, str]:
+        # Predict the test data using the trained classifier, unless the caller
+        # did and `X_test` only holds a sample of the test rows
+        if y_pred_test is None:
+            y_pred_test = clf.predict(X_test)
+
+        # Save the trained XGBoost classifier with the watermark, feature names
+        # and statistics for the predictor and the next incremental run
+        save_model(self.model_dir, clf, meta, X_test)
 
         # Create a DataFrame for the confusion matrix results
-        results = confusion_matrix(y_test, y_pred_test)
+        results = confusion_matrix(y_test, y_pred_test, labels=[0, 1])
         metrics = {"f1_score": f1_score(y_test, y_pred_test, average="macro")}
+        description = "XGB Classifier for football dataset"
+
+        if search is not None:
+            metrics["validation_logloss"] = search.validation_logloss
+            metrics["search_trials"] = int(search.trials["trial"].nunique())
+            params = search.params | {"n_estimators": search.n_estimators}
+            description += f" with {json.dumps(params)}"
+
+            # Every trial of the search is kept next to the model
+            search.trials.to_csv(
+                os.path.join(self.model_dir, "search_trials.csv"), index=False
+            )
 
         df_cm = pd.DataFrame(
             results,
@@ -61,8 +468,9 @@ class Trainer:
             ["Pred Under", "Pred Over"],
         )
 
-        # Create figure with specific size
-        plt.figure(figsize=(8, 6))
+        # Create figure with specific size, not through pyplot so runs in
+        # other threads or processes do not share its state
+        fig = Figure(figsize=(8, 6))
 
         # Create a heatmap using seaborn with annotations
         cm = sns.heatmap(
@@ -71,47 +479,31 @@ class Trainer:
             fmt="d",  # Use integer format for annotations
             cmap="Blues",  # Use a blue colormap
             cbar=True,  # Include a color bar
+            ax=fig.subplots(),
         )
 
         # Save the figure
-        plt.savefig(f"{self.images_dir}/confusion_matrix.png", bbox_inches="tight")
-
-        # Clear the plot and close the figure
-        plt.clf()
-        plt.close()
-
-        # Get the model registry
-        mr: ModelRegistry = self.project.get_model_registry()
+        fig.savefig(f"{self.images_dir}/confusion_matrix.png", bbox_inches="tight")
 
-        football_model = mr.python.create_model(
-            name="football_xgboost",
-            metrics=metrics,
-            feature_view=feature_view,
-            input_example=X_test.iloc[0],
-            description="XGB Classifier for football dataset",
-        )
-
-        # Save the model to the specified directory
-        football_model.save(self.model_dir)
+        return metrics, description
 
     def _setup_folders(self):
         # Create directories if they don't exist
         os.makedirs(self.model_dir, exist_ok=True)
         os.makedirs(self.images_dir, exist_ok=True)
 
-    def _get_data(self) -> tuple[
+    def _get_data(self):
+        df, labels, feature_view = self._get_training_frame()
+        return *self._split_data(df, labels), feature_view
+
+    def _split_data(self, df: pd.DataFrame, labels: list[str]) -> tuple[
         pd.DataFrame,
         pd.DataFrame,
         pd.DataFrame,
         pd.DataFrame,
     ]:
-        feature_view: FeatureView = get_feature_view(
-            self.league, self.window_size, self.fs
-        )
-
-        X_train, X_test, y_train, y_test = feature_view.train_test_split(
-            description="football training dataset",
-            test_size=self.test_size,
+        X_train, X_test, y_train, y_test = split_train_test(
+            df, labels, self.test_size, seed=self.split_seed
         )
 
         # Sort the training features DataFrame 'X_train' based on the 'datetime' column
@@ -132,4 +524,82 @@ class Trainer:
         # Drop the 'datetime' column from the test features DataFrame 'X_test'
         X_test.drop(columns=["datetime", "hometeam", "awayteam"], inplace=True)
 
-        return X_train, X_test, y_train, y_test, feature_view
+        return X_train, X_test, y_train, y_test
+
+    def _get_training_frame(self) -> tuple[pd.DataFrame, list[str], FeatureView]:
+        feature_view, _, _ = self._sync_snapshot()
+        df, labels = self._read_snapshot()
+
+        return df, labels, feature_view
+
+    def _read_snapshot(self) -> tuple[pd.DataFrame, list[str]]:
+        # Reads the snapshot synced by `_sync_snapshot`, without the feature store
+        snapshot = self._snapshot()
+        meta = snapshot.load_meta()
+        # Newest event time of the training data, saved with the model
+        self.watermark = pd.Timestamp(meta["watermark"])
+
+        df = snapshot.read()
+        print(f"Training data has {len(df)} rows")
+
+        return df, meta["labels"]
+
+    def _get_column_stores(self, batch_rows: int) -> tuple[
+        ColumnStore,
+        ColumnStore,
+        ColumnStore,
+        ColumnStore,
+        FeatureView,
+    ]:
+        feature_view, snapshot, labels = self._sync_snapshot()
+
+        # Streams the snapshot into the stores one batch at a time
+        return (
+            *write_split(
+                self.column_store_dir,
+                snapshot.batches(batch_rows),
+                labels,
+                lambda batch: test_mask(batch, self.test_size, seed=self.split_seed),
+                drop=["datetime", "hometeam", "awayteam"],
+            ),
+            feature_view,
+        )
+
+    def _sync_snapshot(
+        self, label_encoder=None
+    ) -> tuple[FeatureView, TrainingSnapshot, list[str]]:
+        feature_view: FeatureView = get_feature_view(
+            self.league,
+            self.window_size,
+            self.fs,
+            label_encoder,
+            self.lag_windows,
+            self.lag_aggregates,
+        )
+
+        # Only fetch the rows that are newer than the local snapshot
+        snapshot = self._snapshot()
+        labels = snapshot.sync(
+            feature_view,
+            get_feature_groups(
+                self.league,
+                self.window_size,
+                self.fs,
+                self.lag_windows,
+                self.lag_aggregates,
+            ),
+            refresh=self.refresh_snapshot,
+        )
+        # Newest event time of the training data, saved with the model
+        self.watermark = pd.Timestamp(snapshot.load_meta()["watermark"])
+
+        return feature_view, snapshot, labels
+
+    def _snapshot(self) -> TrainingSnapshot:
+        return TrainingSnapshot(
+            self.snapshot_dir,
+            feature_view_name(
+                self.league, self.window_size, self.lag_windows, self.lag_aggregates
+            ),
+            FEATURE_VIEW_VERSION,
+        )
@@ -1,9 +1,22 @@
 import os
+import resource
 import hopsworks
 from hsfs.feature_store import FeatureStore
+from hsfs.hopsworks_udf import udf as hopsworks_udf
+
+from football_shared import local_store
+
+
+def store_backend() -> str:
+    # "hopsworks" or "local", the local store lives in FOOTBALL_STORE_DIR
+    return local_store.backend()
 
 
 def login(project="ID2223_Project") -> tuple[hopsworks.project.Project, FeatureStore]:
+    if store_backend() == "local":
+        project = local_store.login()
+        return project, project.get_feature_store()
+
     project = hopsworks.login(
         api_key_value=os.environ["HOPSWORKS_API_KEY"],
         project=project,
@@ -14,4 +27,19 @@ def login(project="ID2223_Project") -> tuple[hopsworks.project.Project, FeatureS
 
 
 def logout():
-    hopsworks.logout()
+    if store_backend() == "hopsworks":
+        hopsworks.logout()
+
+
+def udf(return_type, drop=None, mode="default"):
+    # The udf decorator of the selected store backend
+    if store_backend() == "local":
+        return local_store.udf(return_type, drop=drop, mode=mode)
+
+    return hopsworks_udf(return_type, drop=drop, mode=mode)
+
+
+def report_peak_memory(stage: str):
+    # Peak resident set size of the process so far, ru_maxrss is in kB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Peak memory after {stage}: {peak:.0f} MB")
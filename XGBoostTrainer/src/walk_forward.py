@@ -0,0 +1,138 @@
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import f1_score
+
+from src.shared_arrays import SharedArray, process_pool, worker_arrays
+
+KEY_COLUMNS = ["datetime", "hometeam", "awayteam"]
+# Odds used to compute the return of a bet on over/under 2.5 goals
+OVER_ODDS, UNDER_ODDS = "avg_gt_2_5", "avg_lt_2_5"
+
+
+@dataclass
+class Fold:
+    # Rows [0, train_end) are trained on and rows [train_end, test_end) tested on
+    train_end: int
+    test_end: int
+
+
+def make_folds(
+    datetimes: pd.Series, min_train_weeks: int, test_weeks: int, step_weeks: int
+) -> list[Fold]:
+    """
+    Walk-forward folds over time sorted rows. Matchweeks are the calendar
+    weeks with matches: every fold trains on all matchweeks before its
+    cutoff and tests on the `test_weeks` matchweeks after it, and the cutoff
+    moves forward by `step_weeks` matchweeks.
+    """
+    weeks = datetimes.dt.to_period("W").to_numpy()
+    week_starts = np.flatnonzero(np.r_[True, weeks[1:] != weeks[:-1]])
+    week_starts = np.r_[week_starts, len(weeks)]
+
+    return [
+        Fold(
+            int(week_starts[cutoff]),
+            int(week_starts[min(cutoff + test_weeks, len(week_starts) - 1)]),
+        )
+        for cutoff in range(min_train_weeks, len(week_starts) - 1, step_weeks)
+    ]
+
+
+def betting_roi(
+    predictions: np.ndarray, labels: np.ndarray, over_odds, under_odds
+) -> float:
+    # Return of betting one unit on every predicted result with known odds
+    odds = np.where(predictions == 1, over_odds, under_odds)
+    bets = ~np.isnan(odds)
+    profit = np.where(predictions == labels, odds - 1, -1.0)[bets]
+
+    return float(profit.sum() / bets.sum()) if bets.any() else np.nan
+
+
+def _run_fold(fold: Fold, params: dict, threads: int) -> dict:
+    X, y = worker_arrays["X"], worker_arrays["y"]
+    start = time.perf_counter()
+
+    # Slices of the shared arrays, the rows are not copied per fold
+    clf = xgb.XGBClassifier(**params, n_jobs=threads)
+    clf.fit(X[: fold.train_end], y[: fold.train_end])
+    predictions = clf.predict(X[fold.train_end : fold.test_end])
+
+    y_test = y[fold.train_end : fold.test_end]
+    return {
+        "train_rows": fold.train_end,
+        "test_rows": fold.test_end - fold.train_end,
+        "f1_score": f1_score(y_test, predictions, average="macro"),
+        "roi": betting_roi(
+            predictions,
+            y_test,
+            worker_arrays["over_odds"][fold.train_end : fold.test_end],
+            worker_arrays["under_odds"][fold.train_end : fold.test_end],
+        ),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def walk_forward(
+    df: pd.DataFrame,
+    labels: list[str],
+    min_train_weeks: int = 52,
+    test_weeks: int = 4,
+    step_weeks: int = 4,
+    workers: int = None,
+    threads_per_fold: int = 1,
+    params: dict = None,
+) -> pd.DataFrame:
+    """
+    Evaluates an XGBClassifier with `params` on walk-forward folds of `df`
+    and returns the F1 score and betting ROI of every fold. The folds run
+    in a process pool, each with `threads_per_fold` threads, and share one
+    feature matrix in shared memory.
+    """
+    df = df.dropna(subset=labels).sort_values("datetime", kind="stable")
+    df = df.reset_index(drop=True)
+    folds = make_folds(df["datetime"], min_train_weeks, test_weeks, step_weeks)
+    if len(folds) == 0:
+        raise ValueError(
+            f"Not enough matchweeks for a fold with min_train_weeks={min_train_weeks}"
+        )
+
+    features = df.drop(columns=KEY_COLUMNS + labels)
+    arrays = {
+        "X": SharedArray(features.to_numpy(dtype=np.float32)),
+        "y": SharedArray(df[labels[0]].to_numpy(dtype=np.int32)),
+        "over_odds": SharedArray(df[OVER_ODDS].to_numpy(dtype=np.float64)),
+        "under_odds": SharedArray(df[UNDER_ODDS].to_numpy(dtype=np.float64)),
+    }
+
+    try:
+        with process_pool(arrays, workers) as pool:
+            results = list(
+                pool.map(
+                    _run_fold,
+                    folds,
+                    [params or dict()] * len(folds),
+                    [threads_per_fold] * len(folds),
+                )
+            )
+    finally:
+        for array in arrays.values():
+            array.release()
+
+    results = pd.DataFrame(results)
+    results.insert(
+        0, "cutoff", df["datetime"].iloc[[f.train_end for f in folds]].values
+    )
+    return results
+
+
+def summarize(results: pd.DataFrame) -> dict:
+    return {
+        "folds": len(results),
+        "mean_f1_score": results["f1_score"].mean(),
+        "mean_roi": results["roi"].mean(),
+    }
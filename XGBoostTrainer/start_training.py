@@ -1,5 +1,6 @@
 import modal
 
+from src.fan_out import train_all, train_combination
 from src.trainer import Trainer
 
 image = (
@@ -7,16 +8,99 @@ image = (
     .apt_install("git")
     .apt_install("build-essential")
     .pip_install_from_requirements(requirements_txt="modal_container_requirements.txt")
-    .add_local_python_source("src")
+    .add_local_python_source("src", "football_shared")
 )
 app = modal.App(name="Football XGBoost Model Trainer")
 
+# Keeps the training data snapshot between runs
+volume = modal.Volume.from_name("football-training-snapshots", create_if_missing=True)
+# Shares the model directories of every league and window size with the workers
+runs_volume = modal.Volume.from_name("football-training-runs", create_if_missing=True)
+
+# Every combination is trained as its own model
+LEAGUES = ["E0", "SC0"]
+WINDOW_SIZES = [4]
+# The lag_windows and lag_aggregates of the DataIngestor config, every window
+# size above must be one of the lag windows
+LAG_WINDOWS = [4]
+LAG_AGGREGATES = []
+
 
 @app.function(
     image=image,
     secrets=[modal.Secret.from_name("HOPSWORKS_API_KEY")],
     schedule=modal.Cron("0 2 * * 1"),  # Every monday at 2 am
+    volumes={"/root/training_snapshots": volume, "/root/training_runs": runs_volume},
+    timeout=3600,
 )
 def entry():
-    trainer = Trainer(league="E0", window_size=4, test_size=0.2)
-    trainer.fit()
+    # Adds rounds for the new matches, or retrains from scratch on drift
+    train_all(
+        LEAGUES,
+        WINDOW_SIZES,
+        test_size=0.2,
+        incremental=True,
+        starmap=train_remote,
+        lag_windows=LAG_WINDOWS,
+        lag_aggregates=LAG_AGGREGATES,
+    )
+
+
+def train_remote(jobs):
+    # The workers only see what was committed to the volumes before they start
+    volume.commit()
+    runs_volume.commit()
+    runs = list(train.starmap(jobs, return_exceptions=True))
+    runs_volume.reload()
+    return runs
+
+
+@app.function(
+    image=image,
+    volumes={"/root/training_snapshots": volume, "/root/training_runs": runs_volume},
+    cpu=4,
+    timeout=3600,
+)
+def train(league, window_size, test_size, incremental, lag_windows, lag_aggregates):
+    # Needs no feature store connection, entry syncs the data and registers the model
+    run = train_combination(
+        league, window_size, test_size, incremental, lag_windows, lag_aggregates
+    )
+    runs_volume.commit()
+    return run
+
+
+@app.function(
+    image=image,
+    secrets=[modal.Secret.from_name("HOPSWORKS_API_KEY")],
+    volumes={"/root/training_snapshots": volume},
+    cpu=8,
+    timeout=3600,
+)
+def walk_forward():
+    trainer = Trainer(
+        league="E0",
+        window_size=4,
+        test_size=0.2,
+        lag_windows=LAG_WINDOWS,
+        lag_aggregates=LAG_AGGREGATES,
+    )
+    trainer.evaluate_walk_forward(workers=8, threads_per_fold=1)
+
+
+@app.function(
+    image=image,
+    secrets=[modal.Secret.from_name("HOPSWORKS_API_KEY")],
+    volumes={"/root/training_snapshots": volume},
+    cpu=8,
+    timeout=3600,
+)
+def search():
+    trainer = Trainer(
+        league="E0",
+        window_size=4,
+        test_size=0.2,
+        lag_windows=LAG_WINDOWS,
+        lag_aggregates=LAG_AGGREGATES,
+    )
+    trainer.search(time_budget=45 * 60, workers=8, threads_per_trial=1)
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("hopsworks")
+
+from football_shared import local_store  # noqa: E402
+from football_shared.lag_features import lag_columns  # noqa: E402
+
+from src.feature_view import feature_view_name, get_feature_view  # noqa: E402
+
+MAIN_FEATURES = [
+    "avgh",
+    "avgd",
+    "avga",
+    "avg_gt_2_5",
+    "avg_lt_2_5",
+    "league_over_percentage",
+    "league_under_percentage",
+]
+
+
+@pytest.fixture
+def fs(tmp_path, monkeypatch):
+    monkeypatch.setenv("FOOTBALL_STORE_BACKEND", "local")
+    fs = local_store.login(str(tmp_path)).get_feature_store()
+
+    keys = pd.DataFrame(
+        {
+            "datetime": pd.date_range("2024-08-01", periods=4, freq="D"),
+            "hometeam": ["a", "b", "c", "d"],
+            "awayteam": ["b", "c", "d", "a"],
+        }
+    )
+    main = keys.assign(ftour=["o", "u"] * 2, **{col: 1.0 for col in MAIN_FEATURES})
+    lags = keys.assign(**{col: 2.0 for col in lag_columns([2, 4], ["mean"])})
+    for name, df in [("football_e0", main), ("football_e0_lags_2_4_mean", lags)]:
+        fs.get_or_create_feature_group(
+            name=name,
+            version=1,
+            primary_key=["datetime", "hometeam", "awayteam"],
+            event_time="datetime",
+        ).insert(df)
+
+    return fs
+
+
+@pytest.mark.parametrize("window_size", [2, 4])
+def test_view_of_one_window_of_the_lags(fs, window_size):
+    view = get_feature_view("E0", window_size, fs, None, [4, 2], ["mean"])
+    assert view.name == f"football_train_view_e0_{window_size}_of_2_4_mean"
+
+    X, y = view.training_data()
+    lags = [col for col in X.columns if "_w" in col]
+    assert lags == lag_columns([2, 4], ["mean"], window=window_size)
+    assert y.iloc[:, 0].tolist() == [1, 0, 1, 0]
+
+
+def test_view_of_the_single_window_lags(fs):
+    assert feature_view_name("E0", 4) == "football_train_view_e0_4"
+    # Only the feature group of the windows 2 and 4 was written
+    with pytest.raises(local_store.LocalStoreError):
+        get_feature_view("E0", 4, fs)
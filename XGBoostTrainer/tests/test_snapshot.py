@@ -0,0 +1,178 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("hsfs")
+
+from football_shared import local_store  # noqa: E402
+
+from src import snapshot  # noqa: E402
+from src.snapshot import TrainingSnapshot  # noqa: E402
+
+
+def matches(days: range, teams: list[str] = ("a", "b")) -> pd.DataFrame:
+    # A home match of every team in `teams` on every day
+    df = pd.DataFrame(
+        [
+            (pd.Timestamp("2024-01-01 15:00") + pd.Timedelta(days=day), team, "z")
+            for day in days
+            for team in teams
+        ],
+        columns=["datetime", "hometeam", "awayteam"],
+    )
+    df["fthg"] = range(len(df))
+    df["ftour"] = ["o", "u"] * (len(df) // 2)
+    return df
+
+
+class Store:
+    # The main and lags feature groups of the local store, joined by the view
+    def __init__(self, root: str):
+        self.fs = local_store.login(root).get_feature_store()
+        self.main_fg = self._fg("football_e0")
+        self.lags_fg = self._fg("football_e0_lags_4")
+        self.fetches = []
+
+    def _fg(self, name: str):
+        return self.fs.get_or_create_feature_group(
+            name=name,
+            version=1,
+            primary_key=["datetime", "hometeam", "awayteam"],
+            event_time="datetime",
+        )
+
+    def insert(self, df: pd.DataFrame, lags: bool = True):
+        self.main_fg.insert(df)
+        if lags:
+            self.lags_fg.insert(
+                df[["datetime", "hometeam", "awayteam"]].assign(
+                    fthg_lags_1=df["fthg"] * 10
+                )
+            )
+
+    def sync(self, snap: TrainingSnapshot, refresh: bool = False) -> list[str]:
+        # Records the start of every window fetched from the view
+        view = self.fs.get_or_create_feature_view(
+            name="view",
+            version=1,
+            query=self.main_fg.select_all().join(self.lags_fg.select(["fthg_lags_1"])),
+            labels=["ftour"],
+        )
+        fetches = self.fetches
+
+        class View:
+            def training_data(self, start_time, **kwargs):
+                fetches.append(start_time)
+                return view.training_data(start_time=start_time, **kwargs)
+
+        return snap.sync(View(), [self.main_fg, self.lags_fg], refresh=refresh)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return Store(str(tmp_path / "store"))
+
+
+@pytest.fixture
+def snap(tmp_path):
+    return TrainingSnapshot(str(tmp_path / "snapshots"), "view", 1, fetch_days=30)
+
+
+def sorted_rows(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(snapshot.PRIMARY_KEY, ignore_index=True)
+
+
+def test_first_sync_fetches_all_rows_in_windows(store, snap):
+    store.insert(matches(range(100)))
+    assert store.sync(snap) == ["ftour"]
+
+    df = snap.read()
+    assert len(df) == 200
+    assert (df["fthg_lags_1"] == df["fthg"] * 10).all()
+    assert len(store.fetches) == 4
+
+
+def test_sync_without_new_rows_fetches_nothing(store, snap):
+    store.insert(matches(range(10)))
+    store.sync(snap)
+    store.fetches.clear()
+
+    assert store.sync(snap) == ["ftour"]
+    assert store.fetches == []
+    assert len(snap.read()) == 20
+
+
+def test_new_rows_are_fetched_from_the_watermark(store, snap):
+    store.insert(matches(range(10)))
+    store.sync(snap)
+    store.fetches.clear()
+
+    store.insert(matches(range(10, 15)))
+    store.sync(snap)
+    assert store.fetches == [pd.Timestamp("2024-01-10 15:00")]
+
+    # The same rows as a snapshot fetched at once
+    full = TrainingSnapshot(snap.path + "_full", "view", 1)
+    store.sync(full)
+    pd.testing.assert_frame_equal(sorted_rows(snap.read()), sorted_rows(full.read()))
+    assert len(snap.read()) == 30
+
+
+def test_rows_older_than_the_watermark_refetch_everything(store, snap):
+    store.insert(matches(range(10, 20)))
+    store.sync(snap)
+    store.fetches.clear()
+
+    # A backfill of older days
+    store.insert(matches(range(10)))
+    store.sync(snap)
+    assert store.fetches[0] == pd.Timestamp("2024-01-01 15:00")
+    assert len(snap.read()) == 40
+
+
+def test_rows_without_lags_are_not_cached(store, snap):
+    store.insert(matches(range(10)))
+    store.insert(matches(range(10, 12)), lags=False)
+    store.sync(snap)
+    assert snap.read()["datetime"].max() == pd.Timestamp("2024-01-10 15:00")
+
+    # Once the lags are written the rows are fetched
+    store.insert(matches(range(10, 12)))
+    store.sync(snap)
+    assert len(snap.read()) == 24
+
+
+def test_refresh_refetches_updated_rows(store, snap):
+    store.insert(matches(range(10)))
+    store.sync(snap)
+
+    # Updated in place, the row counts do not change
+    store.insert(matches(range(5)).assign(fthg=-1))
+    store.sync(snap)
+    assert (snap.read()["fthg"] >= 0).all()
+
+    store.sync(snap, refresh=True)
+    assert (snap.read()["fthg"] == -1).sum() == 10
+
+
+def test_parts_split_between_event_times(store, snap, monkeypatch):
+    monkeypatch.setattr(snapshot, "PART_ROWS", 5)
+    store.insert(matches(range(10)))
+    store.sync(snap)
+    store.insert(matches(range(10, 20)))
+    store.sync(snap)
+
+    parts = [pd.read_parquet(part) for part in snap.parts()]
+    assert len(parts) > 1
+    assert all(len(part) % 2 == 0 for part in parts)
+    ends = [(part["datetime"].min(), part["datetime"].max()) for part in parts]
+    assert all(end < start for (_, end), (start, _) in zip(ends, ends[1:]))
+
+
+def test_split_is_stable_when_rows_are_added():
+    df = matches(range(200))
+    test = snapshot.test_mask(df, 0.2)
+    assert 0.1 < test.mean() < 0.3
+
+    more = pd.concat([matches(range(200, 300)), df], ignore_index=True)
+    assert (snapshot.test_mask(more, 0.2)[100 * 2 :] == test).all()
+    assert not (snapshot.test_mask(df, 0.2, seed=1) == test).all()
@@ -0,0 +1,83 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses that are worth sending the request again for
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """
+    A requests session that keeps up to `pool_size` connections per host
+    open between requests. Requests time out after `timeout` seconds and are
+    sent again up to `retries` times on connection errors, timeouts and
+    429/5xx responses, after a random wait of up to `backoff` * 2^attempt
+    seconds (at most `max_backoff`), or longer if Retry-After asks for it. A
+    response asking for a wait longer than `max_backoff` is returned as is.
+    """
+
+    def __init__(
+        self,
+        timeout: float | tuple[float, float] = (5, 30),
+        retries: int = 4,
+        backoff: float = 0.5,
+        max_backoff: float = 30,
+        pool_size: int = 8,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        # The last response or error is returned or raised when retries run out
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                wait, reason = self._backoff(attempt), type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+
+                wait = max(self._backoff(attempt), retry_after(response))
+                if attempt == self.retries or wait > self.max_backoff:
+                    return response
+                reason = f"status code {response.status_code}"
+                response.close()
+
+            # The url is not printed, it can hold an api key
+            host = urlsplit(url).netloc
+            print(f"Request to {host} failed with {reason}, retrying in {wait:.1f}s")
+            time.sleep(wait)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter, so clients that failed together do not retry together
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+
+def retry_after(response: requests.Response) -> float:
+    # Seconds to wait from a Retry-After header in seconds or as a date, else 0
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return 0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0
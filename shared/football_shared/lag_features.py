@@ -0,0 +1,168 @@
+"""
+Names, columns and window math of the lag features, shared by the ingestor
+that writes them, the trainer and the predictor that read them.
+"""
+
+import numpy as np
+
+# Lag prefix -> source column, per side. The order here is the column order
+# of the lags feature group.
+HOME_LAG_FEATURES = {
+    "hs": "homeshots",
+    "fthg": "fthg",
+    "hthg": "hthg",
+    "hst": "hst",
+}
+AWAY_LAG_FEATURES = {
+    "as": "awayshots",
+    "ftag": "ftag",
+    "htag": "htag",
+    "ast": "ast",
+}
+LAG_SIDES = [("hometeam", HOME_LAG_FEATURES), ("awayteam", AWAY_LAG_FEATURES)]
+AGGREGATES = ["mean", "sum"]
+# The league and window size of the one feature view and model that were
+# named without them, before every league and window size had its own
+LEGACY_TRAINING = ("E0", 4)
+
+
+def lags_feature_group_name(
+    league: str, windows: list[int], aggregates: list[str] = ()
+) -> str:
+    # A single window without aggregates keeps the football_{league}_lags_{window} name
+    return f"football_{league.lower()}_lags_{lag_settings_suffix(windows, aggregates)}"
+
+
+def current_form_feature_group_name(
+    league: str, windows: list[int], aggregates: list[str] = ()
+) -> str:
+    # The latest lags of every team, with the lag columns of the lags feature group
+    suffix = lag_settings_suffix(windows, aggregates)
+    return f"football_{league.lower()}_current_form_{suffix}"
+
+
+def lag_settings_suffix(windows: list[int], aggregates: list[str]) -> str:
+    suffix = "_".join(str(window) for window in sorted(windows))
+    if aggregates:
+        suffix += "_" + "_".join(aggregates)
+    return suffix
+
+
+def lag_columns(
+    windows: int | list[int],
+    aggregates: list[str] = (),
+    window: int = None,
+    sides: list[str] = None,
+) -> list[str]:
+    """
+    Every lag column for the windows, in feature group order. A single window
+    has the columns `<feature>_lags_<i>`, multiple windows have the columns
+    `<feature>_w<window>_lags_<i>`. Aggregates are named `<feature>_w<window>_<aggregate>`.
+    With `window` only the columns of that window are returned, with `sides`
+    ("hometeam", "awayteam") only the columns of the features of those sides.
+    """
+    windows = [windows] if isinstance(windows, int) else sorted(windows)
+    columns = []
+    for side, features in LAG_SIDES:
+        if sides is not None and side not in sides:
+            continue
+        for prefix in features:
+            for w in windows:
+                if window is not None and w != window:
+                    continue
+                name = prefix if len(windows) == 1 else f"{prefix}_w{w}"
+                columns += [f"{name}_lags_{i + 1}" for i in range(w)]
+                columns += [f"{prefix}_w{w}_{agg}" for agg in aggregates]
+    return columns
+
+
+def training_name(
+    prefix: str,
+    league: str,
+    window_size: int,
+    windows: list[int] = None,
+    aggregates: list[str] = (),
+) -> str:
+    """
+    The name of a feature view or model trained on the lags of `window_size`
+    from the lags feature group of `windows` and `aggregates`. Trained on the
+    feature group of only that window it is `<prefix>_<league>_<window_size>`.
+    """
+    name = f"{prefix}_{league.lower()}_{window_size}"
+    windows = sorted(windows) if windows else [window_size]
+    if window_size not in windows:
+        raise ValueError(
+            f"Window size {window_size} is not one of the windows {windows}"
+        )
+    if windows != [window_size] or aggregates:
+        name += f"_of_{lag_settings_suffix(windows, aggregates)}"
+    return name
+
+
+def legacy_training_name(
+    prefix: str,
+    league: str,
+    window_size: int,
+    windows: list[int] = None,
+    aggregates: list[str] = (),
+) -> str | None:
+    # `<prefix>` for the settings of the legacy feature view or model, otherwise None
+    name = training_name(prefix, league, window_size, windows, aggregates)
+    return prefix if name == training_name(prefix, *LEGACY_TRAINING) else None
+
+
+def pack_windows(windows: np.ndarray) -> np.ndarray:
+    # Move NaNs to the end of every window while keeping the order of the values
+    missing = np.isnan(windows)
+
+    # Only windows with a value after a NaN have to be reordered
+    gaps = (missing[..., :-1] & ~missing[..., 1:]).any(axis=-1)
+    if not gaps.any():
+        return windows
+
+    packed = windows.copy()
+    order = np.argsort(missing[gaps], axis=-1, kind="stable")
+    packed[gaps] = np.take_along_axis(windows[gaps], order, axis=-1)
+    return packed
+
+
+def window_features(
+    windows_array: np.ndarray,
+    features: list[str],
+    windows: list[int],
+    aggregates: list[str] = (),
+) -> dict[str, np.ndarray]:
+    """
+    Computes the lag and aggregate columns of every window from an array of
+    the widest window as returned by `team_windows`. A narrower window holds
+    the most recent slots of the widest one, so all windows share one array.
+    """
+    windows = sorted(windows)
+    widest = windows[-1]
+
+    # Sums and counts over the last w slots for every w, newest slot first
+    filled = ~np.isnan(windows_array)
+    sums = np.where(filled, windows_array, 0.0)[..., ::-1].cumsum(axis=-1)
+    counts = filled[..., ::-1].cumsum(axis=-1)
+
+    columns = dict()
+    for window in windows:
+        lags = pack_windows(windows_array[:, :, widest - window :])
+        for i, prefix in enumerate(features):
+            name = prefix if len(windows) == 1 else f"{prefix}_w{window}"
+            for j in range(window):
+                columns[f"{name}_lags_{j + 1}"] = lags[:, i, j]
+
+            count = counts[:, i, window - 1]
+            total = np.where(count > 0, sums[:, i, window - 1], np.nan)
+            for agg in aggregates:
+                if agg == "mean":
+                    columns[f"{prefix}_w{window}_mean"] = total / np.maximum(count, 1)
+                elif agg == "sum":
+                    columns[f"{prefix}_w{window}_sum"] = total
+                else:
+                    raise ValueError(
+                        f"Unknown lag aggregate {agg}, use one of {AGGREGATES}"
+                    )
+
+    return columns
@@ -0,0 +1,1006 @@
+"""
+A file based implementation of the parts of the Hopsworks feature store and
+model registry the components use, so they can run and be benchmarked
+offline. Everything lives in one directory:
+
+    <root>/feature_groups/<name>_<version>/
+        metadata.json       name, keys and features of the feature group
+        part-<n>.parquet    one part per insert
+        _index.parquet      primary key, event time and location of every live row
+    <root>/feature_views/<name>_<version>.json
+    <root>/transformation_functions/<name>_<version>.json
+    <root>/models/<name>/<version>/
+
+Inserts upsert on the primary key like Hopsworks does. Filters on primary
+key and event time features are evaluated on the index, so only the
+matching rows of the parts are read.
+"""
+
+import importlib
+import inspect
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Parts of a feature group are merged into one once there are more than this
+COMPACT_AFTER_PARTS = 16
+# Filtered reads only read the row groups of a part that contain matching rows
+ROW_GROUP_ROWS = 4096
+# Return types transformation functions can have
+RETURN_TYPES = {t.__name__: t for t in [int, float, str, bool]}
+
+
+# Backends the components can use, selected with FOOTBALL_STORE_BACKEND
+BACKENDS = ["hopsworks", "local"]
+
+
+class LocalStoreError(Exception):
+    pass
+
+
+def backend() -> str:
+    # The same environment variables select the store of every component
+    name = os.environ.get("FOOTBALL_STORE_BACKEND", "hopsworks")
+    if name not in BACKENDS:
+        raise LocalStoreError(f"Unknown store backend {name}, use one of {BACKENDS}")
+    return name
+
+
+def login(root: str = None) -> "Project":
+    return Project(root or os.environ.get("FOOTBALL_STORE_DIR", "local_store"))
+
+
+def _write_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _feature_type(dtype) -> str:
+    # Hive types like the ones Hopsworks reports
+    if pd.api.types.is_bool_dtype(dtype):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "bigint"
+    if pd.api.types.is_float_dtype(dtype):
+        return "double"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "timestamp"
+    return "string"
+
+
+def _coerce(column: pd.Series, value):
+    # Filters on timestamps are usually written with date strings
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        if isinstance(value, (list, tuple, set, np.ndarray, pd.Series)):
+            return pd.to_datetime(list(value))
+        return pd.Timestamp(value)
+    return value
+
+
+class Condition:
+    """A filter on features, combined with `&` and `|`."""
+
+    def __init__(self, evaluate, features: list["Feature"]):
+        self._evaluate = evaluate
+        self.features = features
+
+    def __and__(self, other: "Condition") -> "Condition":
+        return Condition(
+            lambda df: self.evaluate(df) & other.evaluate(df),
+            self.features + other.features,
+        )
+
+    def __or__(self, other: "Condition") -> "Condition":
+        return Condition(
+            lambda df: self.evaluate(df) | other.evaluate(df),
+            self.features + other.features,
+        )
+
+    def evaluate(self, df: pd.DataFrame) -> pd.Series:
+        return self._evaluate(df).fillna(False).astype(bool)
+
+
+class Feature:
+    def __init__(
+        self,
+        name: str,
+        type: str = None,
+        description: str = None,
+        primary: bool = False,
+        feature_group: "FeatureGroup" = None,
+    ):
+        self.name = name
+        self.type = type
+        self.description = description
+        self.primary = primary
+        self.feature_group = feature_group
+
+    # Comparisons build filters like hsfs features do
+    __hash__ = object.__hash__
+
+    def _compare(self, op, value) -> Condition:
+        return Condition(
+            lambda df: op(df[self.name], _coerce(df[self.name], value)), [self]
+        )
+
+    def __eq__(self, value):
+        return self._compare(lambda a, b: a == b, value)
+
+    def __ne__(self, value):
+        return self._compare(lambda a, b: a != b, value)
+
+    def __lt__(self, value):
+        return self._compare(lambda a, b: a < b, value)
+
+    def __le__(self, value):
+        return self._compare(lambda a, b: a <= b, value)
+
+    def __gt__(self, value):
+        return self._compare(lambda a, b: a > b, value)
+
+    def __ge__(self, value):
+        return self._compare(lambda a, b: a >= b, value)
+
+    def isin(self, values) -> Condition:
+        return self._compare(lambda a, b: a.isin(b), list(values))
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "type": self.type, "description": self.description}
+
+
+class Query:
+    def __init__(
+        self,
+        feature_group: "FeatureGroup",
+        features: list[str],
+        filter: Condition = None,
+        joins: list[dict] = None,
+    ):
+        self.feature_group = feature_group
+        self.features = features
+        self._filter = filter
+        self._joins = joins or []
+
+    def filter(self, condition: Condition) -> "Query":
+        if self._filter is not None:
+            condition = self._filter & condition
+        return Query(self.feature_group, self.features, condition, self._joins)
+
+    def join(
+        self,
+        sub_query: "Query",
+        on: list[str] = None,
+        left_on: list[str] = None,
+        right_on: list[str] = None,
+        join_type: str = "left",
+        prefix: str = None,
+    ) -> "Query":
+        if not (on or left_on):
+            # Like Hopsworks, join on the primary key of the joined feature group
+            on = sub_query.feature_group.primary_key
+        join = {
+            "query": sub_query,
+            "left_on": list(on or left_on),
+            "right_on": list(on or right_on),
+            "join_type": join_type,
+            "prefix": prefix,
+        }
+        return Query(
+            self.feature_group, self.features, self._filter, self._joins + [join]
+        )
+
+    def read(self, online=False, dataframe_type="default", read_options=None):
+        return self._read()
+
+    def output_columns(self) -> list[str]:
+        columns = list(self.features)
+        for join in self._joins:
+            prefix = join["prefix"] or ""
+            columns += [
+                f"{prefix}{col}"
+                for col in join["query"].output_columns()
+                if not (col in join["right_on"] and col in join["left_on"])
+            ]
+        return list(dict.fromkeys(columns))
+
+    def to_dict(self) -> dict:
+        if self._filter is not None:
+            raise LocalStoreError("Queries with filters can not be saved")
+
+        return {
+            "feature_group": [self.feature_group.name, self.feature_group.version],
+            "features": self.features,
+            "joins": [
+                {**join, "query": join["query"].to_dict()} for join in self._joins
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, fs: "FeatureStore", data: dict) -> "Query":
+        name, version = data["feature_group"]
+        query = cls(fs.get_feature_group(name, version), data["features"])
+        for join in data["joins"]:
+            query = query.join(
+                cls.from_dict(fs, join["query"]),
+                left_on=join["left_on"],
+                right_on=join["right_on"],
+                join_type=join["join_type"],
+                prefix=join["prefix"],
+            )
+        return query
+
+    def _read(self, extra_columns: list[str] = ()) -> pd.DataFrame:
+        fg = self.feature_group
+        filter_columns = (
+            {f.name for f in self._filter.features} if self._filter else set()
+        )
+        columns = [
+            col
+            for col in dict.fromkeys(
+                [
+                    *self.features,
+                    *extra_columns,
+                    *(col for join in self._joins for col in join["left_on"]),
+                    *filter_columns,
+                ]
+            )
+            if col in fg.feature_names
+        ]
+
+        # Filters on indexed features of this feature group only read the matching rows
+        pushdown = self._filter is not None and all(
+            f.feature_group is fg and f.name in fg.index_columns
+            for f in self._filter.features
+        )
+        df = fg._read(columns, self._filter if pushdown else None)
+
+        for join in self._joins:
+            right = join["query"]._read(join["right_on"])
+            right = right[
+                list(dict.fromkeys(join["right_on"] + join["query"].output_columns()))
+            ]
+            if join["prefix"]:
+                right = right.rename(
+                    columns={
+                        col: f"{join['prefix']}{col}"
+                        for col in right.columns
+                        if col not in join["right_on"]
+                    }
+                )
+            df = df.merge(
+                right,
+                how=join["join_type"],
+                left_on=join["left_on"],
+                right_on=join["right_on"],
+                suffixes=("", "_right"),
+            )
+
+        if self._filter is not None and not pushdown:
+            df = df[self._filter.evaluate(df).to_numpy()]
+
+        output = self.output_columns() + [
+            col for col in extra_columns if col not in self.output_columns()
+        ]
+        return df[output].reset_index(drop=True)
+
+
+class FeatureGroup:
+    def __init__(
+        self,
+        fs: "FeatureStore",
+        name: str,
+        version: int,
+        description: str = "",
+        primary_key: list[str] = None,
+        event_time: str = None,
+        online_enabled: bool = False,
+        features: list[dict] = None,
+    ):
+        self._fs = fs
+        self.name = name
+        self.version = version
+        self.description = description
+        self.primary_key = [key.lower() for key in primary_key or []]
+        self.event_time = event_time.lower() if event_time else None
+        self.online_enabled = online_enabled
+        self.features = [
+            Feature(
+                **feature,
+                primary=feature["name"] in self.primary_key,
+                feature_group=self,
+            )
+            for feature in features or []
+        ]
+        self._lock = threading.Lock()
+        self._index = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(
+            self._fs.root, "feature_groups", f"{self.name}_{self.version}"
+        )
+
+    @property
+    def feature_names(self) -> list[str]:
+        return [feature.name for feature in self.features]
+
+    @property
+    def index_columns(self) -> list[str]:
+        return list(
+            dict.fromkeys([*self.primary_key, *filter(None, [self.event_time])])
+        )
+
+    def __getattr__(self, name: str) -> Feature:
+        # fg.<feature> returns the feature like in hsfs
+        if not name.startswith("_"):
+            for feature in self.__dict__.get("features", []):
+                if feature.name == name:
+                    return feature
+        raise AttributeError(name)
+
+    def get_feature(self, name: str) -> Feature:
+        return getattr(self, name)
+
+    def select(self, features: list[str]) -> Query:
+        return Query(self, [feature.lower() for feature in features])
+
+    def select_all(self) -> Query:
+        return Query(self, self.feature_names)
+
+    def select_except(self, features: list[str] = None) -> Query:
+        features = {feature.lower() for feature in features or []}
+        return Query(
+            self, [name for name in self.feature_names if name not in features]
+        )
+
+    def read(self, online=False, dataframe_type="default", read_options=None):
+        return self.select_all().read()
+
+    def insert(
+        self,
+        df: pd.DataFrame,
+        overwrite=False,
+        write_options=None,
+        wait=False,
+        **kwargs,
+    ):
+        """
+        Upserts the rows of `df` on the primary key. Returns `(None, None)`
+        like the job and validation report of a Hopsworks insert.
+        """
+        df = df.rename(columns=str.lower).reset_index(drop=True)
+        # Timestamps are kept in ns, keys in other units would not match when hashed
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col].dtype):
+                df[col] = df[col].dt.as_unit("ns")
+        df = df.drop_duplicates(self.primary_key, keep="last", ignore_index=True)
+
+        with self._lock:
+            if not self.features:
+                self.features = [
+                    Feature(
+                        col,
+                        _feature_type(dtype),
+                        primary=col in self.primary_key,
+                        feature_group=self,
+                    )
+                    for col, dtype in df.dtypes.items()
+                ]
+                self._save_metadata()
+
+            index = self._load_index()
+            part = 0 if index is None else int(self._parts()[-1]) + 1
+            self._write_part(part, df)
+
+            new_index = df[self.index_columns].copy()
+            new_index["_part"] = part
+            new_index["_row"] = np.arange(len(df))
+            if index is not None and not overwrite:
+                replaced = np.isin(self._key_hashes(index), self._key_hashes(new_index))
+                if not replaced.all():
+                    # Concatenating an empty frame would change the index dtypes
+                    new_index = pd.concat(
+                        [index[~replaced], new_index], ignore_index=True
+                    )
+            self._save_index(new_index)
+
+            if len(self._parts()) > COMPACT_AFTER_PARTS:
+                self._compact()
+
+        return None, None
+
+    def update_features(self, features: Feature | list[Feature]):
+        features = features if isinstance(features, list) else [features]
+        descriptions = {feature.name: feature.description for feature in features}
+        with self._lock:
+            for feature in self.features:
+                if feature.name in descriptions:
+                    feature.description = descriptions[feature.name]
+            self._save_metadata()
+
+    def update_feature_description(self, feature_name: str, description: str):
+        self.update_features(Feature(feature_name, description=description))
+
+    def _read(self, columns: list[str], condition: Condition = None) -> pd.DataFrame:
+        with self._lock:
+            index = self._load_index()
+        if index is None:
+            raise LocalStoreError(f"Feature group {self.name} has no data")
+
+        if condition is not None:
+            index = index[condition.evaluate(index).to_numpy()]
+
+        return self._read_rows(index, columns)
+
+    def _read_rows(self, index: pd.DataFrame, columns: list[str] = None):
+        # The rows of the index in insert order
+        frames = [
+            self._read_part(part, np.sort(rows.to_numpy()), columns)
+            for part, rows in index.groupby("_part", sort=True)["_row"]
+        ]
+        if len(frames) == 0:
+            part = self._part_path(self._parts()[0])
+            return pd.read_parquet(part, columns=columns).iloc[:0]
+
+        return pd.concat(frames, ignore_index=True)
+
+    def _read_part(self, part, rows: np.ndarray, columns: list[str] = None):
+        # Only read the row groups that contain the rows
+        file = pq.ParquetFile(self._part_path(part))
+        sizes = [
+            file.metadata.row_group(i).num_rows for i in range(file.num_row_groups)
+        ]
+        starts = np.cumsum([0, *sizes])
+        groups = np.searchsorted(starts, rows, side="right") - 1
+        read_groups = np.unique(groups)
+
+        # Position of the rows in the table of the read row groups
+        read_starts = np.cumsum([0, *np.take(sizes, read_groups)])[:-1]
+        positions = (
+            rows - starts[groups] + read_starts[np.searchsorted(read_groups, groups)]
+        )
+
+        table = file.read_row_groups(read_groups.tolist(), columns=columns)
+        return table.take(positions).to_pandas()
+
+    def _key_hashes(self, df: pd.DataFrame) -> np.ndarray:
+        return pd.util.hash_pandas_object(df[self.primary_key], index=False).to_numpy()
+
+    def _save_metadata(self):
+        _write_json(
+            os.path.join(self.path, "metadata.json"),
+            {
+                "name": self.name,
+                "version": self.version,
+                "description": self.description,
+                "primary_key": self.primary_key,
+                "event_time": self.event_time,
+                "online_enabled": self.online_enabled,
+                "features": [feature.to_dict() for feature in self.features],
+            },
+        )
+
+    def _parts(self) -> list[str]:
+        # Part numbers in insert order
+        if not os.path.exists(self.path):
+            return []
+        return sorted(
+            (
+                name.removeprefix("part-").removesuffix(".parquet")
+                for name in os.listdir(self.path)
+                if name.startswith("part-") and name.endswith(".parquet")
+            ),
+            key=int,
+        )
+
+    def _part_path(self, part) -> str:
+        return os.path.join(self.path, f"part-{int(part)}.parquet")
+
+    def _write_part(self, part: int, df: pd.DataFrame):
+        tmp_path = f"{self._part_path(part)}.tmp"
+        df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp_path, self._part_path(part))
+
+    def _load_index(self) -> pd.DataFrame | None:
+        if self._index is None:
+            path = os.path.join(self.path, "_index.parquet")
+            if not os.path.exists(path):
+                return None
+            self._index = pd.read_parquet(path)
+        return self._index
+
+    def _save_index(self, index: pd.DataFrame):
+        path = os.path.join(self.path, "_index.parquet")
+        index.to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+        self._index = index
+
+    def _compact(self):
+        # Merge the live rows of all parts into one new part
+        parts = self._parts()
+        index = self._load_index()
+        df = self._read_rows(index)
+        part = int(parts[-1]) + 1
+        self._write_part(part, df)
+
+        index = index.sort_values(["_part", "_row"]).reset_index(drop=True)
+        index["_part"] = part
+        index["_row"] = np.arange(len(index))
+        self._save_index(index)
+
+        for old in parts:
+            os.remove(self._part_path(old))
+
+
+class Udf:
+    """
+    A transformation function like the ones created with hsfs' `udf`. Only
+    the module and name of the function are saved and it is imported again
+    when the transformation function is loaded, so it must be defined at the
+    top level of a module.
+    """
+
+    def __init__(
+        self,
+        func,
+        return_type: type,
+        drop: list[str] = None,
+        mode: str = "default",
+        features: list[str] = None,
+    ):
+        self.func = func
+        self.function_name = func.__name__
+        self.return_type = return_type
+        self.drop = [drop] if isinstance(drop, str) else list(drop or [])
+        self.mode = mode
+        self.arguments = list(inspect.signature(func).parameters)
+        self.transformation_features = features or self.arguments
+
+    def __call__(self, *features: str) -> "Udf":
+        return Udf(self.func, self.return_type, self.drop, self.mode, list(features))
+
+    @property
+    def output_column_name(self) -> str:
+        return f"{self.function_name}_{'_'.join(self.transformation_features)}_"
+
+    @property
+    def dropped_features(self) -> list[str]:
+        return [
+            feature
+            for argument, feature in zip(self.arguments, self.transformation_features)
+            if argument in self.drop
+        ]
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        args = [df[feature] for feature in self.transformation_features]
+        if self.mode == "python":
+            values = [self.func(*row) for row in zip(*args)]
+        else:
+            values = self.func(*args)
+
+        df = df.drop(columns=self.dropped_features)
+        df[self.output_column_name] = pd.Series(values, index=df.index)
+        return df
+
+    def reference(self) -> dict:
+        if self.func.__qualname__ != self.func.__name__:
+            raise LocalStoreError(
+                f"Transformation function {self.func.__qualname__} must be defined at the top level of a module"
+            )
+        return {"module": self.func.__module__, "function": self.func.__name__}
+
+    @classmethod
+    def from_reference(cls, module: str, function: str, **kwargs) -> "Udf":
+        func = getattr(importlib.import_module(module), function)
+        # The function may be decorated with udf in its module
+        return cls(func.func if isinstance(func, Udf) else func, **kwargs)
+
+
+def udf(return_type: type, drop: str | list[str] = None, mode: str = "default"):
+    def wrapper(func) -> Udf:
+        return Udf(func, return_type, drop, mode)
+
+    return wrapper
+
+
+class TransformationFunction:
+    def __init__(self, fs: "FeatureStore", udf: Udf, version: int):
+        self._fs = fs
+        self.hopsworks_udf = udf
+        self.name = udf.function_name
+        self.version = version
+
+    def __call__(self, *features: str) -> "TransformationFunction":
+        return TransformationFunction(
+            self._fs, self.hopsworks_udf(*features), self.version
+        )
+
+    def save(self):
+        udf = self.hopsworks_udf
+        _write_json(
+            self._fs._transformation_path(self.name, self.version),
+            {
+                "name": self.name,
+                "version": self.version,
+                **udf.reference(),
+                "return_type": udf.return_type.__name__,
+                "drop": udf.drop,
+                "mode": udf.mode,
+            },
+        )
+
+
+class FeatureView:
+    def __init__(
+        self,
+        fs: "FeatureStore",
+        name: str,
+        version: int,
+        query: Query,
+        labels: list[str] = None,
+        transformation_functions: list[TransformationFunction] = None,
+        description: str = "",
+    ):
+        self._fs = fs
+        self.name = name
+        self.version = version
+        self.query = query
+        self.labels = [label.lower() for label in labels or []]
+        self.transformation_functions = transformation_functions or []
+        self.description = description
+
+    def get_batch_data(self, start_time=None, end_time=None, **kwargs):
+        features, _ = self._read(start_time, end_time, with_labels=False)
+        return features
+
+    def training_data(self, start_time=None, end_time=None, description="", **kwargs):
+        return self._read(start_time, end_time)
+
+    def train_test_split(
+        self,
+        test_size: float = None,
+        train_start=None,
+        train_end=None,
+        test_start=None,
+        test_end=None,
+        description="",
+        seed: int = None,
+        **kwargs,
+    ):
+        """
+        Splits by time if `test_start` is given, otherwise randomly like
+        Hopsworks does.
+        """
+        if test_start is not None:
+            X_train, y_train = self._read(train_start, train_end or test_start)
+            X_test, y_test = self._read(test_start, test_end)
+            return X_train, X_test, y_train, y_test
+
+        X, y = self._read(train_start, test_end)
+        test = np.zeros(len(X), dtype=bool)
+        test[
+            np.random.default_rng(seed).permutation(len(X))[: round(len(X) * test_size)]
+        ] = True
+        return X[~test], X[test], y[~test], y[test]
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "description": self.description,
+            "query": self.query.to_dict(),
+            "labels": self.labels,
+            "transformation_functions": [
+                {
+                    "name": tf.name,
+                    "version": tf.version,
+                    "features": tf.hopsworks_udf.transformation_features,
+                }
+                for tf in self.transformation_functions
+            ],
+        }
+
+    def _read(self, start_time=None, end_time=None, with_labels=True):
+        query = self.query
+        event_time = query.feature_group.get_feature(query.feature_group.event_time)
+        if start_time is not None:
+            query = query.filter(event_time >= start_time)
+        if end_time is not None:
+            query = query.filter(event_time < end_time)
+
+        df = query.read()
+        labels = self.labels
+        for tf in self.transformation_functions:
+            udf = tf.hopsworks_udf
+            df = udf.transform(df)
+            if set(udf.transformation_features) & set(labels):
+                labels = [
+                    label for label in labels if label not in udf.dropped_features
+                ] + [udf.output_column_name]
+
+        features = df.drop(columns=labels)
+        return features, (df[labels] if with_labels else None)
+
+
+class FeatureStore:
+    def __init__(self, root: str):
+        self.root = root
+        self._feature_groups: dict[tuple[str, int], FeatureGroup] = dict()
+        self._lock = threading.Lock()
+
+    def get_or_create_feature_group(
+        self,
+        name: str,
+        version: int = 1,
+        description: str = "",
+        primary_key: list[str] = None,
+        event_time: str = None,
+        online_enabled: bool = False,
+        **kwargs,
+    ) -> FeatureGroup:
+        with self._lock:
+            key = (name, version)
+            if key in self._feature_groups:
+                return self._feature_groups[key]
+
+            metadata_path = os.path.join(
+                self.root, "feature_groups", f"{name}_{version}", "metadata.json"
+            )
+            if os.path.exists(metadata_path):
+                fg = FeatureGroup(self, **_read_json(metadata_path))
+            else:
+                # Like in Hopsworks it is only saved by its first insert
+                fg = FeatureGroup(
+                    self,
+                    name,
+                    version,
+                    description,
+                    primary_key,
+                    event_time,
+                    online_enabled,
+                )
+            self._feature_groups[key] = fg
+            return fg
+
+    def get_feature_group(self, name: str, version: int = 1) -> FeatureGroup:
+        if not os.path.exists(
+            os.path.join(self.root, "feature_groups", f"{name}_{version}")
+        ):
+            raise LocalStoreError(f"Feature group {name} version {version} not found")
+        return self.get_or_create_feature_group(name, version)
+
+    def get_feature_view(self, name: str, version: int = 1) -> FeatureView:
+        path = os.path.join(self.root, "feature_views", f"{name}_{version}.json")
+        if not os.path.exists(path):
+            raise LocalStoreError(f"Feature view {name} version {version} not found")
+
+        data = _read_json(path)
+        return FeatureView(
+            self,
+            data["name"],
+            data["version"],
+            Query.from_dict(self, data["query"]),
+            labels=data["labels"],
+            transformation_functions=[
+                self.get_transformation_function(tf["name"], tf["version"])(
+                    *tf["features"]
+                )
+                for tf in data["transformation_functions"]
+            ],
+            description=data["description"],
+        )
+
+    def create_feature_view(
+        self,
+        name: str,
+        query: Query,
+        version: int = 1,
+        labels: list[str] = None,
+        transformation_functions: list[TransformationFunction] = None,
+        description: str = "",
+        **kwargs,
+    ) -> FeatureView:
+        feature_view = FeatureView(
+            self, name, version, query, labels, transformation_functions, description
+        )
+        _write_json(
+            os.path.join(self.root, "feature_views", f"{name}_{version}.json"),
+            feature_view.to_dict(),
+        )
+        return feature_view
+
+    def get_or_create_feature_view(
+        self, name: str, version: int, query: Query, **kwargs
+    ):
+        try:
+            return self.get_feature_view(name, version)
+        except LocalStoreError:
+            return self.create_feature_view(name, query, version, **kwargs)
+
+    def get_transformation_function(
+        self, name: str, version: int = 1
+    ) -> TransformationFunction:
+        path = self._transformation_path(name, version)
+        if not os.path.exists(path):
+            raise LocalStoreError(
+                f"Transformation function {name} version {version} not found"
+            )
+
+        data = _read_json(path)
+        if "module" not in data:
+            raise LocalStoreError(
+                f"Transformation function {name} version {version} was saved with its source, create it again"
+            )
+        udf = Udf.from_reference(
+            data["module"],
+            data["function"],
+            return_type=RETURN_TYPES[data["return_type"]],
+            drop=data["drop"],
+            mode=data["mode"],
+        )
+        return TransformationFunction(self, udf, version)
+
+    def create_transformation_function(
+        self, transformation_function: Udf, version: int = 1
+    ) -> TransformationFunction:
+        return TransformationFunction(self, transformation_function, version)
+
+    def _transformation_path(self, name: str, version: int) -> str:
+        return os.path.join(
+            self.root, "transformation_functions", f"{name}_{version}.json"
+        )
+
+
+class Model:
+    def __init__(
+        self,
+        registry: "ModelRegistry",
+        name: str,
+        version: int = None,
+        metrics: dict = None,
+        description: str = "",
+        input_example=None,
+        feature_view: dict = None,
+        created: float = None,
+    ):
+        self._registry = registry
+        self.name = name
+        self.version = version
+        self.training_metrics = metrics or dict()
+        self.description = description
+        self.input_example = input_example
+        self.feature_view = feature_view
+        self.created = created
+
+    @property
+    def model_path(self) -> str:
+        return self._registry._model_path(self.name, self.version)
+
+    def save(self, model_path: str, **kwargs) -> "Model":
+        # Copy the files to the next free version of the model
+        with self._registry._lock:
+            self.version = max(self._registry._versions(self.name), default=0) + 1
+            self.created = time.time()
+            shutil.copytree(model_path, self.model_path)
+            _write_json(
+                f"{self.model_path}.json",
+                {
+                    "name": self.name,
+                    "version": self.version,
+                    "metrics": self.training_metrics,
+                    "description": self.description,
+                    "input_example": self.input_example,
+                    "feature_view": self.feature_view,
+                    "created": self.created,
+                },
+            )
+        return self
+
+    def download(self, local_path: str = None) -> str:
+        if local_path is None:
+            return self.model_path
+
+        shutil.copytree(self.model_path, local_path, dirs_exist_ok=True)
+        return local_path
+
+
+class _ModelFactory:
+    def __init__(self, registry: "ModelRegistry"):
+        self._registry = registry
+
+    def create_model(
+        self,
+        name: str,
+        metrics: dict = None,
+        description: str = "",
+        input_example=None,
+        feature_view: FeatureView = None,
+        **kwargs,
+    ) -> Model:
+        if isinstance(input_example, (pd.Series, pd.DataFrame)):
+            input_example = json.loads(input_example.to_json(date_format="iso"))
+        return Model(
+            self._registry,
+            name,
+            metrics={key: float(value) for key, value in (metrics or {}).items()},
+            description=description,
+            input_example=input_example,
+            feature_view=(
+                {"name": feature_view.name, "version": feature_view.version}
+                if feature_view is not None
+                else None
+            ),
+        )
+
+
+class ModelRegistry:
+    def __init__(self, root: str):
+        self.root = os.path.join(root, "models")
+        self._lock = threading.Lock()
+        self.python = self.sklearn = _ModelFactory(self)
+
+    def get_model(self, name: str, version: int = None) -> Model:
+        versions = self._versions(name)
+        if version is None:
+            version = max(versions, default=None)
+        if version not in versions:
+            raise LocalStoreError(f"Model {name} version {version} not found")
+
+        data = _read_json(f"{self._model_path(name, version)}.json")
+        return Model(self, **data)
+
+    def get_models(self, name: str) -> list[Model]:
+        return [self.get_model(name, version) for version in self._versions(name)]
+
+    def get_best_model(self, name: str, metric: str, direction: str) -> Model | None:
+        models = [
+            model for model in self.get_models(name) if metric in model.training_metrics
+        ]
+        if len(models) == 0:
+            return None
+
+        # The newest of equally good models
+        sign = 1 if direction == "max" else -1
+        return max(
+            models,
+            key=lambda model: (sign * model.training_metrics[metric], model.version),
+        )
+
+    def _versions(self, name: str) -> list[int]:
+        model_dir = os.path.join(self.root, name)
+        if not os.path.exists(model_dir):
+            return []
+        return sorted(
+            int(entry.removesuffix(".json"))
+            for entry in os.listdir(model_dir)
+            if entry.endswith(".json")
+        )
+
+    def _model_path(self, name: str, version: int) -> str:
+        return os.path.join(self.root, name, str(version))
+
+
+class Project:
+    def __init__(self, root: str, name: str = "local"):
+        self.root = root
+        self.name = name
+
+    def get_feature_store(self) -> FeatureStore:
+        return FeatureStore(self.root)
+
+    def get_model_registry(self) -> ModelRegistry:
+        return ModelRegistry(self.root)
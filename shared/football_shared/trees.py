@@ -0,0 +1,101 @@
+import json
+
+import numpy as np
+
+# Written next to the native model, read without importing xgboost
+TREES_FILE = "xgboost_trees.npz"
+
+
+def export_trees(booster, path: str):
+    """
+    Flattens the trees of a binary:logistic gbtree booster into arrays of
+    nodes. Leaves point to themselves, so every row can take the same number
+    of steps through every tree.
+    """
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    if learner["objective"]["name"] != "binary:logistic":
+        raise ValueError(f"Cannot export objective {learner['objective']['name']}")
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError(f"Cannot export booster {learner['gradient_booster']['name']}")
+
+    nodes = {
+        key: []
+        for key in ["feature", "threshold", "left", "right", "default_left", "value"]
+    }
+    roots, depth = [], 0
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        if any(tree["split_type"]):
+            raise ValueError("Cannot export categorical splits")
+
+        offset = sum(len(n) for n in nodes["left"])
+        left = np.asarray(tree["left_children"], dtype=np.int32)
+        right = np.asarray(tree["right_children"], dtype=np.int32)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        leaf = left == -1
+        index = np.arange(len(left), dtype=np.int32) + offset
+
+        nodes["feature"].append(np.where(leaf, 0, tree["split_indices"]))
+        nodes["threshold"].append(np.where(leaf, 0, conditions))
+        nodes["left"].append(np.where(leaf, index, left + offset))
+        nodes["right"].append(np.where(leaf, index, right + offset))
+        nodes["default_left"].append(np.asarray(tree["default_left"], dtype=bool))
+        # The split condition of a leaf is its value
+        nodes["value"].append(np.where(leaf, conditions, 0))
+        roots.append(offset)
+
+        # Children always have higher ids than their parent
+        node_depth = np.zeros(len(left), dtype=np.int32)
+        for node in np.flatnonzero(~leaf):
+            node_depth[left[node]] = node_depth[right[node]] = node_depth[node] + 1
+        depth = max(depth, int(node_depth.max()))
+
+    base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+    np.savez(
+        path,
+        feature=np.concatenate(nodes["feature"]).astype(np.int32),
+        threshold=np.concatenate(nodes["threshold"]).astype(np.float32),
+        left=np.concatenate(nodes["left"]).astype(np.int32),
+        right=np.concatenate(nodes["right"]).astype(np.int32),
+        default_left=np.concatenate(nodes["default_left"]),
+        value=np.concatenate(nodes["value"]).astype(np.float32),
+        root=np.asarray(roots, dtype=np.int32),
+        depth=depth,
+        # The base score is a probability, trees add to its log odds
+        base_margin=np.log(base_score / (1 - base_score)),
+        feature_names=np.asarray(learner["feature_names"]),
+    )
+
+
+class TreeEnsemble:
+    """Scores rows with the trees written by `export_trees` using numpy only."""
+
+    def __init__(self, path: str):
+        with np.load(path) as data:
+            self.feature = data["feature"]
+            self.threshold = data["threshold"]
+            self.left = data["left"]
+            self.right = data["right"]
+            self.default_left = data["default_left"]
+            self.value = data["value"]
+            self.root = data["root"]
+            self.depth = int(data["depth"])
+            self.base_margin = float(data["base_margin"])
+            self.feature_names = list(data["feature_names"])
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        # Probability of the positive class, X has the columns in feature_names order
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+
+        # One node per row and tree, all trees take a step at once
+        node = np.broadcast_to(self.root, (len(X), len(self.root)))
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            # Like xgboost, missing values follow the default branch
+            go_left = np.where(
+                np.isnan(x), self.default_left[node], x < self.threshold[node]
+            )
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        margin = self.base_margin + self.value[node].sum(axis=1, dtype=np.float64)
+        return 1 / (1 + np.exp(-margin))
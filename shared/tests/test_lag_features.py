@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from football_shared.lag_features import (
+    lag_columns,
+    lags_feature_group_name,
+    legacy_training_name,
+    training_name,
+    window_features,
+)
+
+
+def test_names_of_one_window_without_aggregates():
+    assert lags_feature_group_name("E0", [4]) == "football_e0_lags_4"
+    assert training_name("football_xgboost", "E0", 4) == "football_xgboost_e0_4"
+    assert training_name("football_xgboost", "E0", 4, [4]) == "football_xgboost_e0_4"
+
+
+def test_names_of_several_windows_and_aggregates():
+    assert (
+        lags_feature_group_name("SC0", [10, 4], ["mean"])
+        == "football_sc0_lags_4_10_mean"
+    )
+    assert (
+        training_name("football_xgboost", "SC0", 4, [10, 4], ["mean"])
+        == "football_xgboost_sc0_4_of_4_10_mean"
+    )
+    with pytest.raises(ValueError):
+        training_name("football_xgboost", "SC0", 5, [4, 10])
+
+
+def test_legacy_name():
+    assert legacy_training_name("football_xgboost", "E0", 4) == "football_xgboost"
+    assert legacy_training_name("football_xgboost", "SC0", 4) is None
+    assert legacy_training_name("football_xgboost", "E0", 4, [4, 10]) is None
+
+
+def test_columns_of_a_window_and_side():
+    all_columns = lag_columns([2, 3], ["sum"])
+    columns = lag_columns([2, 3], ["sum"], window=3, sides=["hometeam"])
+    assert columns[:4] == ["hs_w3_lags_1", "hs_w3_lags_2", "hs_w3_lags_3", "hs_w3_sum"]
+    assert len(columns) == 4 * 4
+    assert set(columns) < set(all_columns)
+    assert lag_columns(2, sides=["awayteam"])[:2] == ["as_lags_1", "as_lags_2"]
+
+
+def test_window_features_pack_missing_values():
+    # One row and feature, the widest window of 3 with the newest match last
+    windows_array = np.array([[[1.0, np.nan, 3.0]]])
+    columns = window_features(windows_array, ["f"], [2, 3], ["mean", "sum"])
+
+    assert np.isnan(columns["f_w2_lags_2"][0]) and columns["f_w2_lags_1"][0] == 3
+    assert [columns[f"f_w3_lags_{i}"][0] for i in [1, 2]] == [1, 3]
+    assert np.isnan(columns["f_w3_lags_3"][0])
+    assert (columns["f_w3_mean"][0], columns["f_w3_sum"][0]) == (2, 4)
+    assert (columns["f_w2_mean"][0], columns["f_w2_sum"][0]) == (3, 3)
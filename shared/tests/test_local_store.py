@@ -0,0 +1,188 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from football_shared import local_store
+from football_shared.local_store import LocalStoreError
+
+
+def matches(days: list[int], goals: list[int], teams: list[str] = None) -> pd.DataFrame:
+    teams = teams or [f"team{i}" for i in range(len(days))]
+    return pd.DataFrame(
+        {
+            "datetime": pd.to_datetime([f"2024-08-{day:02d}" for day in days]),
+            "hometeam": teams,
+            "awayteam": ["away"] * len(days),
+            "fthg": goals,
+        }
+    )
+
+
+@pytest.fixture
+def fs(tmp_path):
+    return local_store.login(str(tmp_path)).get_feature_store()
+
+
+def create_fg(fs, name="football_e0"):
+    return fs.get_or_create_feature_group(
+        name=name,
+        version=1,
+        primary_key=["datetime", "hometeam", "awayteam"],
+        event_time="datetime",
+    )
+
+
+def read_sorted(query) -> pd.DataFrame:
+    return query.read().sort_values("datetime", ignore_index=True)
+
+
+def test_insert_and_read(fs):
+    fg = create_fg(fs)
+    fg.insert(matches([1, 2, 3], [0, 1, 2]))
+
+    # A new store instance reads the same rows from disk
+    fs = local_store.login(fs.root).get_feature_store()
+    df = read_sorted(fs.get_feature_group("football_e0", 1).select_all())
+    pd.testing.assert_frame_equal(df, matches([1, 2, 3], [0, 1, 2]))
+
+
+def test_get_missing_feature_group(fs):
+    with pytest.raises(LocalStoreError):
+        fs.get_feature_group("football_e0", 1)
+
+
+def test_insert_upserts_on_primary_key(fs):
+    fg = create_fg(fs)
+    fg.insert(matches([1, 2, 3], [0, 1, 2]))
+    fg.insert(matches([2, 4], [5, 6], teams=["team1", "team3"]))
+
+    df = read_sorted(fg.select_all())
+    pd.testing.assert_frame_equal(df, matches([1, 2, 3, 4], [0, 5, 2, 6]))
+
+
+def test_insert_upserts_timestamps_of_other_units(fs):
+    create_fg(fs).insert(matches([1, 2], [0, 1]))
+    # The index is read from disk, like in the next run
+    fg = create_fg(local_store.login(fs.root).get_feature_store())
+    df = matches([1, 2], [3, 4]).astype({"datetime": "datetime64[s]"})
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        fg.insert(df)
+
+    df = read_sorted(fg.select_all())
+    pd.testing.assert_frame_equal(df, matches([1, 2], [3, 4]))
+
+
+def test_insert_after_compaction(fs, monkeypatch):
+    monkeypatch.setattr(local_store, "COMPACT_AFTER_PARTS", 2)
+    fg = create_fg(fs)
+    for day in range(1, 6):
+        fg.insert(matches([day], [day]))
+    fg.insert(matches([3], [0], teams=["team0"]))
+
+    df = read_sorted(fg.select_all())
+    pd.testing.assert_frame_equal(
+        df, matches([1, 2, 3, 4, 5], [1, 2, 0, 4, 5], teams=["team0"] * 5)
+    )
+
+
+def test_filter_on_index_and_other_features(fs):
+    fg = create_fg(fs)
+    fg.insert(matches([1, 2, 3, 4], [0, 1, 2, 3]))
+
+    # Pushed down to the index
+    df = read_sorted(fg.select_all().filter(fg.datetime >= "2024-08-03"))
+    pd.testing.assert_frame_equal(df, matches([3, 4], [2, 3], ["team2", "team3"]))
+
+    # Evaluated on the rows
+    query = fg.select(["hometeam", "fthg"]).filter(
+        (fg.fthg == 0) | fg.hometeam.isin(["team3"])
+    )
+    assert sorted(query.read()["hometeam"]) == ["team0", "team3"]
+
+
+def test_join(fs):
+    main_fg = create_fg(fs)
+    main_fg.insert(matches([1, 2], [0, 1]))
+    lags_fg = create_fg(fs, "football_e0_lags_4")
+    lags = matches([1, 2], [7, 8]).rename(columns={"fthg": "fthg_lags_1"})
+    lags_fg.insert(lags)
+
+    query = main_fg.select(["datetime", "hometeam", "awayteam", "fthg"]).join(
+        lags_fg.select_except(["datetime", "hometeam", "awayteam"])
+    )
+    df = read_sorted(query)
+    assert list(df.columns) == [
+        "datetime",
+        "hometeam",
+        "awayteam",
+        "fthg",
+        "fthg_lags_1",
+    ]
+    assert df["fthg_lags_1"].tolist() == [7, 8]
+
+
+def ou_encoder(value: pd.Series) -> pd.Series:
+    return (value == "o").astype(int)
+
+
+def test_feature_view_with_transformation_function(fs):
+    fg = create_fg(fs)
+    df = matches([1, 2, 3], [0, 1, 2])
+    df["ftour"] = ["o", "u", "o"]
+    fg.insert(df)
+
+    encoder = fs.create_transformation_function(
+        local_store.udf(int, drop=["value"], mode="pandas")(ou_encoder), version=1
+    )
+    encoder.save()
+    # Loaded again by importing the function
+    encoder = fs.get_transformation_function("ou_encoder", 1)
+    fs.create_feature_view(
+        name="view",
+        version=1,
+        query=fg.select_all(),
+        labels=["ftour"],
+        transformation_functions=[encoder("ftour")],
+    )
+
+    view = fs.get_feature_view("view", 1)
+    X, y = view.training_data(start_time="2024-08-02")
+    assert "ftour" not in X.columns
+    assert sorted(y.iloc[:, 0].tolist()) == [0, 1]
+
+
+def test_transformation_function_must_be_importable(fs):
+    def nested(value: pd.Series) -> pd.Series:
+        return value
+
+    encoder = fs.create_transformation_function(local_store.udf(int)(nested))
+    with pytest.raises(LocalStoreError):
+        encoder.save()
+
+
+def test_get_best_model_prefers_newest_on_ties(fs, tmp_path):
+    registry = local_store.login(fs.root).get_model_registry()
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    for f1 in [0.5, 0.7, 0.7, 0.6]:
+        registry.python.create_model("model", metrics={"f1": f1}).save(str(model_dir))
+
+    assert registry.get_best_model("model", "f1", "max").version == 3
+    assert registry.get_best_model("model", "f1", "min").version == 1
+    assert registry.get_best_model("other", "f1", "max") is None
+
+
+def test_unknown_backend(monkeypatch):
+    monkeypatch.setenv("FOOTBALL_STORE_BACKEND", "sqlite")
+    with pytest.raises(LocalStoreError):
+        local_store.backend()
+
+
+def test_filter_on_timestamps_with_lists(fs):
+    fg = create_fg(fs)
+    fg.insert(matches([1, 2, 3], [0, 1, 2]))
+    query = fg.select_all().filter(fg.datetime.isin(["2024-08-01", "2024-08-03"]))
+    assert np.array_equal(read_sorted(query)["fthg"], [0, 2])